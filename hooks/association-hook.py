@@ -62,11 +62,13 @@ def main():
         sys.exit(0)
 
     try:
-        # Skip vector search in the hook — model loading takes ~5s on first
-        # call, which exceeds the 5s hook timeout. Keyword+expansion is <50ms
-        # and sufficient for prompt-level associations. Vector search is
-        # available via /agency:enrich for deeper queries.
-        result = search.search_associations(prompt, top_k=8, vector_limit=0)
+        # Never load the model in the hook — that takes ~5s on first call,
+        # which exceeds the 5s hook timeout. Vector search only runs when the
+        # prompt's embedding is already cached, and small stores are scored
+        # without importing numpy. Otherwise keyword+expansion (<50ms) covers
+        # prompt-level associations; /agency:enrich does deeper queries.
+        result = search.search_associations(prompt, top_k=8, vector_limit=3,
+                                            vector_cached_only=True)
         assocs = result.get("results", [])
     except Exception as e:
         print(f"[assoc-hook] search error: {e}", file=sys.stderr)
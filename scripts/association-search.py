@@ -4,7 +4,7 @@
 Takes event text as input, returns scored associations from:
 1. Semantic index keyword expansion (spreading activation with IDF weighting)
 2. Journal full-text search (journal.db)
-3. Vault file matching (semantic-index.json)
+3. Vault file matching (semantic index)
 4. Vector similarity search (vectors.db) — optional, graceful degradation
 
 Pure Python, no LLM, target <50ms per query (vector search may add ~100ms).
@@ -25,7 +25,6 @@ import json
 import math
 import os
 import re
-import sqlite3
 import sys
 import time
 
@@ -34,7 +33,6 @@ import time
 # ---------------------------------------------------------------------------
 
 JOURNAL_DB = os.path.join('memory', 'journal.db')
-SEMANTIC_INDEX = os.path.join('memory', 'meta', 'semantic-index.json')
 VECTORS_DB = os.path.join('memory', 'vectors.db')
 
 # Stopwords for keyword extraction
@@ -58,7 +56,30 @@ STOPWORDS = {
 
 # Cache for semantic index (loaded once per process)
 _semantic_index_cache = None
-_semantic_index_mtime = 0
+
+
+# ---------------------------------------------------------------------------
+# SQLite connections (shared pragmas in vault-db.py, loaded lazily)
+# ---------------------------------------------------------------------------
+
+def _db():
+    """Load scripts/vault-db.py as vault_db (see its docstring)."""
+    if 'vault_db' not in sys.modules:
+        from importlib import util
+        spec = util.spec_from_file_location(
+            'vault_db', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vault-db.py'))
+        spec.loader.exec_module(sys.modules.setdefault('vault_db', util.module_from_spec(spec)))
+    return sys.modules['vault_db']
+
+
+def _connect(path, readonly=False, timeout=10):
+    """Open vectors.db or journal.db in WAL mode with the shared pragmas."""
+    return _db().connect(path, readonly=readonly, timeout=timeout)
+
+
+def _index():
+    """Load scripts/index-vault.py (shared per process, see vault-db.py)."""
+    return _db().load_sibling('index-vault.py')
 
 
 # ---------------------------------------------------------------------------
@@ -81,21 +102,23 @@ def extract_keywords(text, max_keywords=15):
 # ---------------------------------------------------------------------------
 
 def _load_semantic_index():
-    """Load semantic index, caching by file mtime."""
-    global _semantic_index_cache, _semantic_index_mtime
-    if not os.path.exists(SEMANTIC_INDEX):
-        return {}
-    mtime = os.path.getmtime(SEMANTIC_INDEX)
-    if _semantic_index_cache is not None and mtime == _semantic_index_mtime:
-        return _semantic_index_cache
+    """Load the keyword-search view of the semantic index, cached per process.
+
+    Returns the flat structure built by index-vault.py load_search_index;
+    read it through its snapshot_* helpers. Comes from the binary snapshot
+    when it is current, otherwise from memory/semantic-index.db (or a newer
+    JSON export), refreshing the snapshot for the next process.
+    """
+    global _semantic_index_cache
     try:
-        with open(SEMANTIC_INDEX) as f:
-            _semantic_index_cache = json.load(f).get("entries", {})
-        _semantic_index_mtime = mtime
+        stamp = _index()._source_stamp()
+        if _semantic_index_cache is not None and _semantic_index_cache[0] == stamp:
+            return _semantic_index_cache[1]
+        _semantic_index_cache = (stamp, _index().load_search_index())
     except Exception as e:
         sys.stderr.write(f"[assoc] semantic index load error: {e}\n")
-        _semantic_index_cache = {}
-    return _semantic_index_cache
+        _semantic_index_cache = (None, _index()._build_search_index({}))
+    return _semantic_index_cache[1]
 
 
 # ---------------------------------------------------------------------------
@@ -112,22 +135,21 @@ def expand_keywords(keywords, max_expansion=10):
     Uses IDF weighting to penalize ubiquitous terms and boost rare, specific
     terms that actually discriminate.
     """
-    entries = _load_semantic_index()
+    index = _load_semantic_index()
     keyword_set = set(keywords)
     expansion = {}  # candidate -> raw activation count
     doc_freq = {}   # candidate -> number of files containing it
 
-    # First pass: count activations and document frequency
-    for entry in entries.values():
-        entry_keywords = set(k.lower() for k in entry.get("keywords", []))
-        # Count document frequency for all keywords
-        for ek in entry_keywords:
-            doc_freq[ek] = doc_freq.get(ek, 0) + 1
-        # Spreading activation from matching files
-        overlap = keyword_set & entry_keywords
-        if overlap:
-            for ek in entry_keywords - keyword_set:
-                expansion[ek] = expansion.get(ek, 0) + len(overlap)
+    # First pass: spreading activation from files sharing a keyword
+    overlaps = {}
+    for k in keyword_set:
+        for i in _index().snapshot_postings(index, k):
+            overlaps[i] = overlaps.get(i, 0) + 1
+    for i in sorted(overlaps):
+        for ek, df in _index().snapshot_keywords(index, i):
+            if ek not in keyword_set:
+                expansion[ek] = expansion.get(ek, 0) + overlaps[i]
+                doc_freq[ek] = df
 
     # Second pass: IDF-weight the expansion scores
     # score = raw_activation / log(1 + doc_freq) — penalizes common terms
@@ -154,7 +176,7 @@ def search_journal(keywords, limit=10):
 
     results = []
     try:
-        conn = sqlite3.connect(JOURNAL_DB, timeout=5)
+        conn = _connect(JOURNAL_DB, readonly=True, timeout=5)
         rows = conn.execute(
             "SELECT id, category, summary, context, tags, timestamp FROM journal"
         ).fetchall()
@@ -194,34 +216,33 @@ def search_journal(keywords, limit=10):
 # ---------------------------------------------------------------------------
 
 def search_semantic_index(keywords, limit=10):
-    """Search semantic-index.json for vault files matching keywords."""
-    entries = _load_semantic_index()
-    keyword_set = set(keywords)
-    results = []
-
-    for path, entry in entries.items():
-        entry_keywords = set(k.lower() for k in entry.get("keywords", []))
-        summary = entry.get("summary", "").lower()
+    """Search the semantic index for vault files matching keywords."""
+    index = _load_semantic_index()
+    keywords = list(dict.fromkeys(keywords))
+    overlaps = {}         # entry number -> keywords it is tagged with
+    summary_matches = {}  # entry number -> keywords found in its summary
+    for k in keywords:
+        for i in _index().snapshot_postings(index, k):
+            overlaps.setdefault(i, []).append(k)
+        for i in _index().snapshot_summary_hits(index, k):
+            summary_matches.setdefault(i, []).append(k)
 
-        overlap = keyword_set & entry_keywords
-        if not overlap:
-            summary_matches = [k for k in keywords if k in summary]
-            if not summary_matches:
-                continue
-            score = len(summary_matches) * 0.5
-            matched = summary_matches
+    results = []
+    for i in sorted(overlaps.keys() | summary_matches.keys()):
+        if i in overlaps:
+            matched = overlaps[i]
+            score = len(matched)
         else:
-            score = len(overlap)
-            matched = list(overlap)
+            matched = summary_matches[i]
+            score = len(matched) * 0.5
 
         # Connection density bonus
-        related_count = len([r for r in entry.get("related", []) if r])
-        score += min(related_count * 0.1, 0.5)
+        score += min(index["related"][i] * 0.1, 0.5)
 
         results.append({
-            "source": path,
+            "source": index["paths"][i],
             "type": "vault",
-            "summary": entry.get("summary", ""),
+            "summary": index["summaries"][i],
             "score": score,
             "matched_keywords": matched,
         })
@@ -230,13 +251,53 @@ def search_semantic_index(keywords, limit=10):
     return results[:limit]
 
 
+# ---------------------------------------------------------------------------
+# Full-text search (FTS5 over vault sections, kept by index-vault.py)
+# ---------------------------------------------------------------------------
+
+def search_fulltext(keywords, limit=10):
+    """Search vault file content for any of the keywords, best section per file.
+
+    Reads the FTS5 table that `index-vault.py scan`/`fts` maintain; returns
+    [] if it has not been built.
+    """
+    if limit <= 0:
+        return []
+    try:
+        conn = _index().open_index(readonly=True)
+        if conn is None:
+            return []
+        try:
+            hits = _index().search_fts(conn, _index().fts_query(keywords, match_all=False), limit)
+        finally:
+            conn.close()
+    except Exception as e:
+        sys.stderr.write(f"[assoc] full-text search error: {e}\n")
+        return []
+    results = []
+    for h in hits:
+        text = f"{h['heading']} {h['snippet']}".lower()
+        results.append({
+            "source": h["path"],
+            "type": "vault",
+            "summary": f"{h['heading']}: {h['snippet']}" if h["heading"] else h["snippet"],
+            "score": h["score"],
+            "matched_keywords": [k for k in keywords if k in text],
+            "search_method": "fulltext",
+        })
+    return results
+
+
 # ---------------------------------------------------------------------------
 # Vector similarity search
 # ---------------------------------------------------------------------------
 
-def search_vectors(text, limit=10):
+def search_vectors(text, limit=10, cached_only=False):
     """Search vectors.db for semantically similar entries.
 
+    With cached_only=True, only answers if the query embedding is already
+    cached (no model load) — cheap enough for the prompt hook.
+
     Gracefully returns [] if vectors.db or dependencies are unavailable.
     """
     if limit <= 0:
@@ -244,17 +305,8 @@ def search_vectors(text, limit=10):
     if not os.path.exists(VECTORS_DB):
         return []
     try:
-        # Import lazily from sibling script (hyphenated filename needs spec_from_file_location)
-        import importlib.util
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        vs_path = os.path.join(script_dir, "vector-search.py")
-        spec = importlib.util.spec_from_file_location("vector_search", vs_path)
-        if spec is None or spec.loader is None:
-            return []
-        vector_search_mod = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(vector_search_mod)
-        vector_search = vector_search_mod.vector_search
-        raw = vector_search(text, top_k=limit)
+        vector_search = _db().load_sibling('vector-search.py').vector_search
+        raw = vector_search(text, top_k=limit, cached_only=cached_only)
         # Normalize to association-search format
         results = []
         for r in raw:
@@ -276,7 +328,8 @@ def search_vectors(text, limit=10):
 # Combined search with keyword expansion
 # ---------------------------------------------------------------------------
 
-def search_associations(text, top_k=5, journal_limit=10, vault_limit=10, vector_limit=5, sources=None):
+def search_associations(text, top_k=5, journal_limit=10, vault_limit=10, vector_limit=5, sources=None,
+                        vector_cached_only=False, fulltext_limit=10):
     """Run associative search across all sources with keyword expansion.
 
     Args:
@@ -285,8 +338,11 @@ def search_associations(text, top_k=5, journal_limit=10, vault_limit=10, vector_
         journal_limit: Max journal hits to consider
         vault_limit: Max vault hits to consider
         vector_limit: Max vector hits (0 = skip vector search entirely)
-        sources: Optional list of sources to search ("journal", "vault", "vector")
-                 None means search all available sources.
+        sources: Optional list of sources to search ("journal", "vault",
+                 "fulltext", "vector"). None means search all available sources.
+        vector_cached_only: Only run vector search when the query embedding
+                 is cached (never loads the model)
+        fulltext_limit: Max full-text (FTS5 section) hits (0 = skip)
 
     Returns:
         dict with keys: results, timing_ms, sources_used, keywords,
@@ -295,7 +351,7 @@ def search_associations(text, top_k=5, journal_limit=10, vault_limit=10, vector_
     Flow:
     1. Extract keywords from event text
     2. Expand via semantic index (spreading activation)
-    3. Search journal, vault, and vector store
+    3. Search journal, vault index, vault full text, and vector store
     4. Merge, deduplicate, normalize, rank, return top-K with metrics
     """
     metrics = {}
@@ -305,6 +361,7 @@ def search_associations(text, top_k=5, journal_limit=10, vault_limit=10, vector_
     # Determine which sources to search
     search_journal_flag = sources is None or "journal" in sources
     search_vault_flag = sources is None or "vault" in sources
+    search_fulltext_flag = (sources is None or "fulltext" in sources) and fulltext_limit > 0
     search_vector_flag = (sources is None or "vector" in sources) and vector_limit > 0
 
     # Phase 1: Keyword extraction
@@ -335,6 +392,7 @@ def search_associations(text, top_k=5, journal_limit=10, vault_limit=10, vector_
     # Phase 3: Search each source
     journal_results = []
     vault_results = []
+    fulltext_results = []
     vector_results = []
 
     if search_journal_flag:
@@ -353,9 +411,18 @@ def search_associations(text, top_k=5, journal_limit=10, vault_limit=10, vector_
         if vault_results:
             sources_used.append("vault")
 
+    if search_fulltext_flag:
+        t_fulltext = time.time()
+        # Raw keywords only: expansions are index-vocabulary guesses
+        fulltext_results = search_fulltext(raw_keywords, limit=fulltext_limit)
+        metrics["fulltext_search_ms"] = round((time.time() - t_fulltext) * 1000, 2)
+        metrics["fulltext_hits"] = len(fulltext_results)
+        if fulltext_results:
+            sources_used.append("fulltext")
+
     if search_vector_flag:
         t_vector = time.time()
-        vector_results = search_vectors(text, limit=vector_limit)
+        vector_results = search_vectors(text, limit=vector_limit, cached_only=vector_cached_only)
         metrics["vector_search_ms"] = round((time.time() - t_vector) * 1000, 2)
         metrics["vector_hits"] = len(vector_results)
         if vector_results:
@@ -376,11 +443,12 @@ def search_associations(text, top_k=5, journal_limit=10, vault_limit=10, vector_
 
     journal_results = normalize(journal_results)
     vault_results = normalize(vault_results)
+    fulltext_results = normalize(fulltext_results)
     vector_results = normalize(vector_results)
 
     # Merge all results, deduplicating by source (keep highest score)
     seen = {}
-    for r in journal_results + vault_results + vector_results:
+    for r in journal_results + vault_results + fulltext_results + vector_results:
         src = r["source"]
         if src not in seen or r.get("normalized_score", 0) > seen[src].get("normalized_score", 0):
             seen[src] = r
@@ -487,6 +555,8 @@ def main():
             hit_parts.append(f"{m['journal_hits']} journal")
         if "vault_hits" in m:
             hit_parts.append(f"{m['vault_hits']} vault")
+        if "fulltext_hits" in m:
+            hit_parts.append(f"{m['fulltext_hits']} fulltext")
         if "vector_hits" in m:
             hit_parts.append(f"{m['vector_hits']} vector")
         print(f"Found: {' + '.join(hit_parts)} hits")
@@ -498,6 +568,8 @@ def main():
             timing_parts.append(f"journal:{m['journal_search_ms']}ms")
         if "vault_search_ms" in m:
             timing_parts.append(f"vault:{m['vault_search_ms']}ms")
+        if "fulltext_search_ms" in m:
+            timing_parts.append(f"fulltext:{m['fulltext_search_ms']}ms")
         if "vector_search_ms" in m:
             timing_parts.append(f"vector:{m['vector_search_ms']}ms")
         print(f"Timing: {' '.join(timing_parts)}")
@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""Near-duplicate detection across vault files and journal entries.
+
+Computes MinHash signatures over word shingles, buckets them with
+locality-sensitive hashing (LSH) and reports clusters of near-identical
+content. Candidate pairs come only from shared LSH buckets, so the cost is
+roughly linear in corpus size rather than quadratic.
+
+Signatures are cached in memory/vectors.db keyed by content_hash, so
+repeated runs only shingle and hash content that changed.
+
+Pure Python, no dependencies.
+
+Usage:
+  python3 scripts/dedup.py                       # Report duplicate clusters
+  python3 scripts/dedup.py --threshold 0.9       # Stricter similarity cutoff
+  python3 scripts/dedup.py --json                # Machine-readable output
+  python3 scripts/dedup.py --vault-only          # Vault files only
+  python3 scripts/dedup.py --journal-only        # Journal entries only
+  python3 scripts/dedup.py merge                 # Show what merge would do
+  python3 scripts/dedup.py merge --apply         # Remove duplicate vault files
+
+Merging keeps the longest file of each vault cluster. Identical copies are
+removed; near-copies are re-checked exactly against the kept file and, if
+still above the threshold, have their extra paragraphs appended to it
+before removal; anything else is left in place and reported. Removed files
+lose their vectors and index entries (`related` links point at the kept
+file). The journal is append-only, so journal duplicates are reported but
+never merged.
+"""
+
+import array
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+
+# All paths relative to CWD (the agent's project root)
+VAULT_DIR = 'memory'
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.8
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _vectors_db():
+    return os.path.join(VAULT_DIR, 'vectors.db')
+
+
+def _journal_db():
+    return os.path.join(VAULT_DIR, 'journal.db')
+
+
+def content_hash(text):
+    """Short SHA-256 hash for change detection."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+# ---------------------------------------------------------------------------
+# MinHash
+# ---------------------------------------------------------------------------
+
+def _permutations():
+    """Deterministic (a, b) pairs for the universal hash family."""
+    perms = []
+    for i in range(NUM_PERM):
+        digest = hashlib.sha256(f'minhash-{i}'.encode()).digest()
+        a = int.from_bytes(digest[:8], 'little') % (_MERSENNE - 1) + 1
+        b = int.from_bytes(digest[8:16], 'little') % _MERSENNE
+        perms.append((a, b))
+    return perms
+
+
+_PERMS = _permutations()
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Word n-gram shingles, hashed to 32-bit ints."""
+    words = re.findall(r'\w+', text.lower())
+    if len(words) < size:
+        grams = [' '.join(words)] if words else []
+    else:
+        grams = [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return {
+        int.from_bytes(hashlib.blake2b(g.encode(), digest_size=4).digest(), 'little')
+        for g in grams
+    }
+
+
+def minhash(text):
+    """MinHash signature (list of NUM_PERM ints) for a text."""
+    sh = shingles(text)
+    if not sh:
+        return [_MAX_HASH] * NUM_PERM
+    sig = []
+    for a, b in _PERMS:
+        sig.append(min(((a * x + b) % _MERSENNE) & _MAX_HASH for x in sh))
+    return sig
+
+
+def estimate_similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity from two signatures."""
+    same = sum(1 for x, y in zip(sig_a, sig_b) if x == y)
+    return same / NUM_PERM
+
+
+def _sig_to_blob(sig):
+    return array.array('I', sig).tobytes()
+
+
+def _blob_to_sig(blob):
+    sig = array.array('I')
+    sig.frombytes(blob)
+    return sig
+
+
+# ---------------------------------------------------------------------------
+# SQLite connections (shared pragmas in vault-db.py, loaded lazily)
+# ---------------------------------------------------------------------------
+
+def _db():
+    """Load scripts/vault-db.py as vault_db (see its docstring)."""
+    if 'vault_db' not in sys.modules:
+        from importlib import util
+        spec = util.spec_from_file_location(
+            'vault_db', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vault-db.py'))
+        spec.loader.exec_module(sys.modules.setdefault('vault_db', util.module_from_spec(spec)))
+    return sys.modules['vault_db']
+
+
+def _connect(path, readonly=False, timeout=10):
+    """Open vectors.db or journal.db in WAL mode with the shared pragmas."""
+    return _db().connect(path, readonly=readonly, timeout=timeout)
+
+
+def _index():
+    """Load scripts/index-vault.py (shared per process, see vault-db.py)."""
+    return _db().load_sibling('index-vault.py')
+
+
+# ---------------------------------------------------------------------------
+# Signature cache (keyed by content_hash)
+# ---------------------------------------------------------------------------
+
+def init_db(conn):
+    """Create the signature cache table if it doesn't exist."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS minhash_signatures (
+            content_hash TEXT PRIMARY KEY,
+            signature BLOB NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def signatures(items, prune=True):
+    """Return {key: signature} for {key: text}, reusing cached signatures.
+
+    With prune=True, signatures for content hashes no longer present are
+    removed — only do this when items covers the whole corpus.
+    """
+    os.makedirs(VAULT_DIR, exist_ok=True)
+    conn = _connect(_vectors_db())
+    init_db(conn)
+    now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+    cached = {
+        h: blob for h, blob in
+        conn.execute('SELECT content_hash, signature FROM minhash_signatures').fetchall()
+    }
+
+    result = {}
+    fresh = {}
+    for key, text in items.items():
+        h = content_hash(text)
+        if h in cached:
+            result[key] = _blob_to_sig(cached[h])
+        else:
+            if h not in fresh:
+                fresh[h] = minhash(text)
+            result[key] = fresh[h]
+
+    if fresh:
+        conn.executemany(
+            'INSERT OR REPLACE INTO minhash_signatures '
+            '(content_hash, signature, updated_at) VALUES (?, ?, ?)',
+            [(h, _sig_to_blob(sig), now) for h, sig in fresh.items()]
+        )
+    live = {content_hash(t) for t in items.values()}
+    stale = set(cached) - live if prune else set()
+    if stale:
+        conn.executemany('DELETE FROM minhash_signatures WHERE content_hash = ?',
+                         [(h,) for h in stale])
+    conn.commit()
+    conn.close()
+    return result, len(fresh)
+
+
+# ---------------------------------------------------------------------------
+# Corpus collection
+# ---------------------------------------------------------------------------
+
+def collect_vault_files():
+    """Return {relative_path: text} for non-empty markdown files.
+
+    Uses index-vault.py's listing, which leaves out the generated TOC.
+    """
+    files = {}
+    for full in _index().vault_files():
+        try:
+            with open(full, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+            if text.strip():
+                files[full] = text
+        except Exception:
+            pass
+    return files
+
+
+def collect_journal_entries():
+    """Return {'j:N': text} for non-empty journal entries."""
+    jdb = _journal_db()
+    if not os.path.exists(jdb):
+        return {}
+    entries = {}
+    try:
+        conn = _connect(jdb, readonly=True, timeout=5)
+        rows = conn.execute('SELECT id, summary, context FROM journal').fetchall()
+        conn.close()
+        for jid, summary, context in rows:
+            text = f'{summary or ""}\n{context or ""}'.strip()
+            if text:
+                entries[f'j:{jid}'] = text
+    except Exception as e:
+        sys.stderr.write(f'[dedup] journal read error: {e}\n')
+    return entries
+
+
+# ---------------------------------------------------------------------------
+# LSH clustering
+# ---------------------------------------------------------------------------
+
+def find_clusters(sigs, threshold=DEFAULT_THRESHOLD):
+    """Group keys whose signatures are estimated at >= threshold similarity.
+
+    Returns list of clusters, each a dict with sorted `members` and the
+    lowest pairwise `similarity` among the verified pairs that joined it.
+    """
+    buckets = {}
+    for key, sig in sigs.items():
+        for band in range(BANDS):
+            chunk = tuple(sig[band * ROWS:(band + 1) * ROWS])
+            buckets.setdefault((band, chunk), []).append(key)
+
+    parent = {}
+
+    def find(x):
+        while parent.get(x, x) != x:
+            x = parent[x]
+        return x
+
+    checked = set()
+    pair_scores = {}
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        for i in range(len(members)):
+            for j in range(i + 1, len(members)):
+                a, b = sorted((members[i], members[j]))
+                if (a, b) in checked:
+                    continue
+                checked.add((a, b))
+                sim = estimate_similarity(sigs[a], sigs[b])
+                if sim >= threshold:
+                    pair_scores[(a, b)] = sim
+                    ra, rb = find(a), find(b)
+                    if ra != rb:
+                        parent[rb] = ra
+
+    groups = {}
+    for a, b in pair_scores:
+        groups.setdefault(find(a), set()).update((a, b))
+    min_scores = {}
+    for (a, b), sim in pair_scores.items():
+        root = find(a)
+        min_scores[root] = min(min_scores.get(root, 1.0), sim)
+
+    clusters = [
+        {'members': sorted(members), 'similarity': round(min_scores[root], 3)}
+        for root, members in groups.items()
+    ]
+    clusters.sort(key=lambda c: (-len(c['members']), c['members'][0]))
+    return clusters, len(checked)
+
+
+def find_duplicates(threshold=DEFAULT_THRESHOLD, vault=True, journal=True):
+    """Collect the corpus, update signatures and return (clusters, items, stats)."""
+    items = {}
+    if vault:
+        items.update(collect_vault_files())
+    if journal:
+        items.update(collect_journal_entries())
+    sigs, computed = signatures(items, prune=vault and journal)
+    clusters, compared = find_clusters(sigs, threshold)
+    stats = {
+        'items': len(items),
+        'signatures_computed': computed,
+        'pairs_compared': compared,
+        'clusters': len(clusters),
+        'duplicates': sum(len(c['members']) - 1 for c in clusters),
+    }
+    return clusters, items, stats
+
+
+# ---------------------------------------------------------------------------
+# Merge (vault files only)
+# ---------------------------------------------------------------------------
+
+def _tombstone_segments(paths):
+    """Hide removed vault files in the packed vector segments, if present."""
+    try:
+        _db().load_sibling('vector-segments.py').append_delta([], paths)
+    except Exception as e:
+        sys.stderr.write(f'[dedup] segment store update failed: {e}\n')
+
+
+def _canonical(members, items):
+    """Pick the member to keep: longest content, then shortest path."""
+    return min(members, key=lambda m: (-len(items[m]), len(m), m))
+
+
+def exact_similarity(text_a, text_b):
+    """Exact Jaccard similarity of two texts' shingle sets."""
+    a, b = shingles(text_a), shingles(text_b)
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _paragraphs(text):
+    return [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
+
+
+def _missing_paragraphs(text, into):
+    """Paragraphs of text that do not appear in into (whitespace-insensitive)."""
+    have = {' '.join(p.split()) for p in _paragraphs(into)}
+    return [p for p in _paragraphs(text) if ' '.join(p.split()) not in have]
+
+
+def merge_vault_duplicates(clusters, items, apply=False, threshold=DEFAULT_THRESHOLD):
+    """Fold redundant vault files of each cluster into the kept one.
+
+    Clusters are transitive and built from estimated similarity, so each
+    member is checked against the kept file itself: byte-identical copies
+    are removed; members with exact Jaccard >= threshold are removed after
+    their paragraphs missing from the kept file are appended to it; the
+    rest are left in place and reported. Journal members are left alone.
+    With apply=False, only prints the plan. Returns {removed_path: kept_path}.
+    """
+    plan, additions, skipped = {}, {}, []
+    for cluster in clusters:
+        vault_members = [m for m in cluster['members'] if not m.startswith('j:')]
+        if len(vault_members) < 2:
+            continue
+        keep = _canonical(vault_members, items)
+        for m in vault_members:
+            if m == keep:
+                continue
+            if content_hash(items[m]) == content_hash(items[keep]):
+                plan[m] = keep
+                continue
+            sim = exact_similarity(items[m], items[keep])
+            if sim < threshold:
+                skipped.append((m, keep, sim))
+                continue
+            missing = _missing_paragraphs(items[m], items[keep])
+            if missing:
+                additions.setdefault(keep, []).append((m, missing))
+            plan[m] = keep
+
+    for m, keep, sim in sorted(skipped):
+        print(f'  leave: {m}  (similarity {sim:.2f} to {keep}, below {threshold}; review by hand)')
+
+    if not plan:
+        print('No duplicate vault files to merge.')
+        return plan
+
+    merged_from = {m: len(paras) for parts in additions.values() for m, paras in parts}
+    for removed, kept in sorted(plan.items()):
+        note = f', {merged_from[removed]} paragraph(s) appended to it' if removed in merged_from else ''
+        print(f'  {"remove" if apply else "would remove"}: {removed}  (keep {kept}{note})')
+    if not apply:
+        print(f'\n{len(plan)} file(s) would be removed. Re-run with --apply to merge.')
+        return plan
+
+    # Save the unique text before deleting anything
+    for keep, parts in additions.items():
+        text = items[keep].rstrip('\n')
+        for m, paras in parts:
+            text += f'\n\n<!-- merged from {m} -->\n\n' + '\n\n'.join(paras)
+        with open(keep, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+    for removed in plan:
+        try:
+            os.remove(removed)
+        except FileNotFoundError:
+            pass
+
+    if os.path.exists(_vectors_db()):
+        conn = _connect(_vectors_db())
+        for table in ('vault_vectors', 'vault_chunks', 'vault_related'):
+            try:
+                conn.executemany(f'DELETE FROM {table} WHERE path = ?',
+                                 [(p,) for p in plan])
+            except sqlite3.OperationalError:
+                pass
+        conn.commit()
+        conn.close()
+        _tombstone_segments(list(plan))
+
+    conn = _index().open_existing()
+    if conn is not None:
+        _index().delete_entries(conn, list(plan))
+        _index().rewrite_related(conn, plan)
+        _index().export_json(conn)
+        conn.close()
+
+    print(f'\nMerged: removed {len(plan)} duplicate vault file(s)')
+    if additions:
+        print(f'{len(additions)} kept file(s) gained text; re-run index-vault.py scan '
+              'and vectorize.py to refresh them.')
+    return plan
+
+
+# ---------------------------------------------------------------------------
+# CLI entry point
+# ---------------------------------------------------------------------------
+
+USAGE = """\
+Usage: dedup.py [command] [options]
+
+Commands:
+  (default)            Report near-duplicate clusters
+  merge                Show which duplicate vault files would be removed
+  merge --apply        Remove them, keeping the longest file per cluster:
+                       identical copies are deleted, near-copies (exact
+                       similarity >= threshold) have their extra paragraphs
+                       appended to the kept file first, the rest are left
+
+Options:
+  --threshold T        Minimum estimated similarity (default: 0.8)
+  --json               Machine-readable JSON output
+  --vault-only         Only consider vault files
+  --journal-only       Only consider journal entries
+"""
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+
+    if '--help' in args or '-h' in args:
+        print(USAGE)
+        sys.exit(0)
+
+    threshold = DEFAULT_THRESHOLD
+    if '--threshold' in args:
+        idx = args.index('--threshold')
+        if idx + 1 >= len(args):
+            print('Error: --threshold requires a number')
+            sys.exit(1)
+        threshold = float(args[idx + 1])
+        args = args[:idx] + args[idx + 2:]
+
+    json_output = '--json' in args
+    vault_only = '--vault-only' in args
+    journal_only = '--journal-only' in args
+    apply = '--apply' in args
+    positional = [a for a in args if not a.startswith('--')]
+
+    if positional and positional[0] != 'merge':
+        print(f'Unknown command: {positional[0]}')
+        print(USAGE)
+        sys.exit(1)
+    merge = bool(positional)
+
+    t0 = time.time()
+    clusters, items, stats = find_duplicates(
+        threshold, vault=not journal_only or merge, journal=not vault_only and not merge
+    )
+    stats['elapsed_ms'] = round((time.time() - t0) * 1000, 1)
+
+    if merge:
+        merge_vault_duplicates(clusters, items, apply=apply, threshold=threshold)
+        sys.exit(0)
+
+    if json_output:
+        print(json.dumps({'stats': stats, 'clusters': clusters}, indent=2))
+        sys.exit(0)
+
+    print(f'Scanned {stats["items"]} items '
+          f'({stats["signatures_computed"]} new signatures, '
+          f'{stats["pairs_compared"]} candidate pairs) in {stats["elapsed_ms"]}ms')
+    if not clusters:
+        print('No near-duplicates found.')
+        sys.exit(0)
+    print(f'{stats["clusters"]} cluster(s), {stats["duplicates"]} redundant item(s):\n')
+    for c in clusters:
+        print(f'  [{c["similarity"]:.2f}] {len(c["members"])} items')
+        for m in c['members']:
+            print(f'        {m}')
+        print()
@@ -2,16 +2,25 @@
 """Semantic index for an agent's memory vault.
 
 Builds a keyword-based semantic index of all markdown files in memory/.
-Designed to be driven by a model subagent that generates summaries and
-keywords for each file, then updates the index via the `update` command.
+`auto-index` extracts keywords (TF-IDF against the vault, RAKE phrases,
+headings and tag lines) and a heuristic summary locally; a model subagent
+can refine entries through the `update` command.
 
-The index lives at memory/meta/semantic-index.json and supports search
-by keyword overlap, structured JSON output for reranking, and miss
-logging for evaluation.
+The index lives in memory/semantic-index.db (SQLite, WAL): one row per
+file, keyword and summary-word postings, related links, and an FTS5
+full-text table with one row per heading section. Each update
+is a single-entry transaction, so parallel indexing subagents can write
+concurrently without losing entries. memory/meta/semantic-index.json is
+kept as a text export for compatibility (`export`), and is imported into
+the database when it changes on disk (fresh clone, git pull).
+
+Supports search by keyword overlap, structured JSON output for reranking,
+and miss logging for evaluation.
 
 Usage:
   # Scan vault — print files that need indexing
   python3 scripts/index-vault.py scan
+  python3 scripts/index-vault.py scan --json      # Machine-readable
 
   # Print a single file's content + hash (for the subagent to summarize)
   python3 scripts/index-vault.py file memory/some/note.md
@@ -19,6 +28,16 @@ Usage:
   # Update index entry after subagent generates summary + keywords
   python3 scripts/index-vault.py update <path> <summary> <keywords-csv> [related-csv]
 
+  # Update many entries at once from JSONL (one object per line)
+  python3 scripts/index-vault.py update-batch [file.jsonl]   # default: stdin
+
+  # Split files needing indexing into balanced batches for parallel subagents
+  python3 scripts/index-vault.py plan --workers 4
+  python3 scripts/index-vault.py plan --status
+
+  # Index changed files locally (TF-IDF + RAKE keywords, heuristic summary)
+  python3 scripts/index-vault.py auto-index [--all] [--workers N] [--jsonl]
+
   # Search by keyword overlap
   python3 scripts/index-vault.py search <query>
 
@@ -31,22 +50,49 @@ Usage:
   # Show miss log
   python3 scripts/index-vault.py misses
 
+  # Replay logged misses through every search path; recall@k, MRR, latency
+  python3 scripts/index-vault.py bench [--k 10] [--queries curated.jsonl]
+  python3 scripts/index-vault.py bench --history
+
+  # Table of contents (title + tag line per file, grouped by directory)
+  python3 scripts/index-vault.py toc [--max-per-dir N] [--dir memory/sub]
+
+  # Full-text search over vault sections (FTS5), with snippets
+  python3 scripts/index-vault.py fts <query> [--limit N] [--files]
+
   # Show index stats
   python3 scripts/index-vault.py stats
+
+  # Write memory/meta/semantic-index.json from the database
+  python3 scripts/index-vault.py export
 """
 
+import bisect
 import glob
 import hashlib
 import json
+import marshal
+import math
 import os
+import re
+import sqlite3
 import sys
+import time
+from collections import Counter
+from itertools import chain
 from datetime import datetime, timezone
 
 # All paths are relative to the project root (where memory/ lives),
 # not relative to this script or the plugin directory.
 VAULT_DIR = 'memory'
+INDEX_DB = os.path.join(VAULT_DIR, 'semantic-index.db')
 INDEX_FILE = os.path.join(VAULT_DIR, 'meta', 'semantic-index.json')
+SNAPSHOT_FILE = os.path.join(VAULT_DIR, 'semantic-index.snap')
 MISS_LOG_FILE = os.path.join(VAULT_DIR, 'meta', 'miss-log.json')
+TOC_FILE = os.path.join(VAULT_DIR, 'meta', 'toc.md')
+PLAN_FILE = os.path.join(VAULT_DIR, 'meta', 'index-plan.jsonl')
+BENCH_HISTORY_FILE = os.path.join(VAULT_DIR, 'meta', 'bench-history.jsonl')
+VECTORS_DB = os.path.join(VAULT_DIR, 'vectors.db')
 
 
 def content_hash(text):
@@ -54,49 +100,865 @@ def content_hash(text):
     return hashlib.sha256(text.encode()).hexdigest()[:16]
 
 
-def load_index():
-    """Load index from disk, or return empty structure."""
+# ---------------------------------------------------------------------------
+# Index storage (SQLite; shared pragmas in vault-db.py, loaded lazily)
+# ---------------------------------------------------------------------------
+
+def _db():
+    """Load scripts/vault-db.py as vault_db (see its docstring)."""
+    if 'vault_db' not in sys.modules:
+        from importlib import util
+        spec = util.spec_from_file_location(
+            'vault_db', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vault-db.py'))
+        spec.loader.exec_module(sys.modules.setdefault('vault_db', util.module_from_spec(spec)))
+    return sys.modules['vault_db']
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    keywords TEXT NOT NULL,         -- JSON list, as written by the indexer
+    updated_at TEXT NOT NULL
+);
+
+-- Search terms per entry: field 'k' = keyword (compounds also split into
+-- words), 's' = summary word
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    field TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (term, field, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_path ON postings(path);
+
+CREATE TABLE IF NOT EXISTS related (
+    path TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    PRIMARY KEY (path, rank)
+);
+CREATE INDEX IF NOT EXISTS related_target ON related(target);
+
+-- Stat-based vault manifest shared with vectorize.py: a file is re-read
+-- and re-hashed only when its size, mtime or inode changed
+CREATE TABLE IF NOT EXISTS manifest (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    racy INTEGER NOT NULL DEFAULT 0
+);
+
+-- Header table of contents (title and tag line per file), refreshed from
+-- the manifest when a file's content hash changes
+CREATE TABLE IF NOT EXISTS toc (
+    path TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    title TEXT NOT NULL,
+    tags TEXT NOT NULL
+);
+
+-- Distinct body terms per file (space-separated) for auto-index document
+-- frequencies, so an incremental run reads only changed files
+CREATE TABLE IF NOT EXISTS doc_terms (
+    path TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    terms TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS index_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _get_state(conn, key, default=None):
+    row = conn.execute('SELECT value FROM index_state WHERE key = ?', (key,)).fetchone()
+    return json.loads(row[0]) if row else default
+
+
+def _set_state(conn, key, value):
+    conn.execute('INSERT OR REPLACE INTO index_state (key, value) VALUES (?, ?)',
+                 (key, json.dumps(value)))
+
+
+def _json_mtime():
+    try:
+        return os.stat(INDEX_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+
+def open_index(readonly=False):
+    """Open the index database, creating it (and importing the JSON) if needed.
+
+    Writers re-import semantic-index.json whenever it changed on disk since
+    the database last wrote or read it, unless the database holds changes
+    that were never exported (those would be lost): then the JSON is left
+    alone with a warning. Readers get None if there is no database yet.
+    """
+    if readonly:
+        if not os.path.exists(INDEX_DB):
+            return None
+        return _db().connect(INDEX_DB, readonly=True, timeout=5)
+    os.makedirs(os.path.dirname(INDEX_DB) or '.', exist_ok=True)
+    conn = _db().connect(INDEX_DB)
+    conn.executescript(SCHEMA)
+    mtime = _json_mtime()
+    if mtime is not None and mtime != _get_state(conn, 'json_mtime'):
+        with _db().transaction(conn):
+            # Recheck under the write lock: another writer may have imported
+            if mtime != _get_state(conn, 'json_mtime'):
+                if _get_state(conn, 'exported', True):
+                    _import_json(conn)
+                    _set_state(conn, 'json_mtime', mtime)
+                else:
+                    sys.stderr.write(
+                        f'[index-vault] {INDEX_FILE} changed on disk, but the database has '
+                        f'unexported updates; not importing it. Run "index-vault.py export" '
+                        f'to overwrite the JSON with the database.\n')
+    return conn
+
+
+def _import_json(conn):
+    """Replace the database contents with semantic-index.json (in a transaction)."""
     try:
         with open(INDEX_FILE, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+            entries = json.load(f).get('entries', {})
+    except (OSError, json.JSONDecodeError) as e:
+        sys.stderr.write(f'[index-vault] could not import {INDEX_FILE}: {e}\n')
+        return
+    for table in ('entries', 'postings', 'related'):
+        conn.execute(f'DELETE FROM {table}')
+    for fpath, entry in entries.items():
+        _write_entry(conn, fpath, entry.get('content_hash', ''), entry.get('summary', ''),
+                     entry.get('keywords', []), entry.get('related', []))
+    _set_state(conn, 'exported', True)
+
+
+def _write_entry(conn, fpath, h, summary, keywords, related):
+    """Replace one entry with its postings and related links (no commit)."""
+    now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    conn.execute(
+        'INSERT OR REPLACE INTO entries (path, content_hash, summary, keywords, updated_at) '
+        'VALUES (?, ?, ?, ?, ?)', (fpath, h, summary, json.dumps(keywords), now))
+    conn.execute('DELETE FROM postings WHERE path = ?', (fpath,))
+    conn.executemany(
+        'INSERT OR IGNORE INTO postings (term, field, path) VALUES (?, ?, ?)',
+        [(t, 'k', fpath) for t in _expand_keywords(keywords)]
+        + [(t, 's', fpath) for t in set(summary.lower().split())])
+    _write_related(conn, fpath, related)
+
+
+def _write_related(conn, fpath, related):
+    conn.execute('DELETE FROM related WHERE path = ?', (fpath,))
+    conn.executemany('INSERT INTO related (path, rank, target) VALUES (?, ?, ?)',
+                     [(fpath, i, r) for i, r in enumerate(related) if r])
+
+
+def upsert_entry(conn, fpath, h, summary, keywords, related=None):
+    """Write one index entry in its own IMMEDIATE transaction.
+
+    Returns the path of a stale entry it took over (see _adopt_moved), or None.
+    """
+    with _db().transaction(conn):
+        moved_from = _adopt_moved(conn, fpath, h)
+        _write_entry(conn, fpath, h, summary, keywords, related or [])
+        _set_state(conn, 'exported', False)
+    return moved_from
+
+
+def delete_entries(conn, paths):
+    """Remove entries (with postings and related links) for paths."""
+    rows = [(p,) for p in paths]
+    with _db().transaction(conn):
+        for table in ('entries', 'postings', 'related'):
+            conn.executemany(f'DELETE FROM {table} WHERE path = ?', rows)
+        _set_state(conn, 'exported', False)
+
+
+def set_related(conn, related):
+    """Replace the related links of existing entries. related: {path: [paths]}.
+
+    Returns the number of entries updated; paths without an entry are skipped.
+    """
+    updated = 0
+    with _db().transaction(conn):
+        for fpath, targets in related.items():
+            if conn.execute('SELECT 1 FROM entries WHERE path = ?', (fpath,)).fetchone():
+                _write_related(conn, fpath, targets)
+                updated += 1
+        _set_state(conn, 'exported', False)
+    return updated
+
+
+def _rewrite_related(conn, mapping):
+    """Point related links at mapping[target]; None drops the link (no commit)."""
+    olds = list(mapping)
+    sources = set()
+    for i in range(0, len(olds), 500):
+        part = olds[i:i + 500]
+        sources.update(r[0] for r in conn.execute(
+            f'SELECT DISTINCT path FROM related WHERE target IN ({",".join("?" * len(part))})',
+            part))
+    for fpath in sorted(sources):
+        targets = []
+        for (r,) in conn.execute('SELECT target FROM related WHERE path = ? ORDER BY rank',
+                                 (fpath,)).fetchall():
+            r = mapping.get(r, r)
+            if r and r != fpath and r not in targets:
+                targets.append(r)
+        _write_related(conn, fpath, targets)
+    return len(sources)
+
+
+def rewrite_related(conn, mapping):
+    """Repoint related links after files were merged, moved or removed.
+
+    mapping: {old path: new path or None}. Returns the number of entries
+    whose links changed.
+    """
+    with _db().transaction(conn):
+        n = _rewrite_related(conn, mapping)
+        if n:
+            _set_state(conn, 'exported', False)
+    return n
+
+
+def _rekey_entry(conn, old, new):
+    """Move old's entry, postings, related list and full-text rows to new (no commit).
+
+    Whatever new already had is replaced. Links from other entries are not
+    touched; see _rewrite_related.
+    """
+    tables = ['entries', 'postings', 'related']
+    if _has_fts(conn):
+        tables += ['vault_fts', 'fts_files']
+    for table in tables:
+        conn.execute(f'DELETE FROM {table} WHERE path = ?', (new,))
+        conn.execute(f'UPDATE {table} SET path = ? WHERE path = ?', (new, old))
+
+
+def find_moves(indexed, manifest):
+    """Match files lacking a current entry to entries with identical content.
+
+    indexed: {path: content_hash} of entries; manifest: {path: content_hash}
+    of vault files. An entry whose file is gone is a move source (a stale
+    entry with the same file name is preferred); otherwise a live entry with
+    the same hash is copied. Returns ({old: new} moves, {new: source} copies).
+    """
+    gone, live = {}, {}
+    for fpath, h in sorted(indexed.items()):
+        if fpath not in manifest:
+            gone.setdefault(h, []).append(fpath)
+        elif manifest[fpath] == h:
+            live.setdefault(h, fpath)
+    moves, copies = {}, {}
+    for new in sorted(p for p in manifest if indexed.get(p) != manifest[p]):
+        olds = gone.get(manifest[new])
+        if olds:
+            name = os.path.basename(new)
+            i = next((i for i, o in enumerate(olds) if os.path.basename(o) == name), 0)
+            moves[olds.pop(i)] = new
+        elif manifest[new] in live:
+            copies[new] = live[manifest[new]]
+    return moves, copies
+
+
+def reconcile_moves(conn, manifest):
+    """Re-key entries of moved or renamed files, copy entries of duplicates.
+
+    Related links pointing at a moved file are repointed. Nothing is read
+    or summarized: the content hash proves the entry still describes the
+    file. Returns (moves, copies) as from find_moves().
+    """
+    moves, copies = find_moves(indexed_hashes(conn), manifest)
+    if not moves and not copies:
+        return moves, copies
+    sources = read_entries(conn, set(copies.values()))
+    with _db().transaction(conn):
+        for old, new in moves.items():
+            _rekey_entry(conn, old, new)
+        _rewrite_related(conn, moves)
+        for new, src in copies.items():
+            entry = sources[src]
+            _write_entry(conn, new, manifest[new], entry['summary'], entry['keywords'], [])
+        _set_state(conn, 'exported', False)
+    export_json(conn)
+    return moves, copies
+
+
+def _adopt_moved(conn, fpath, h):
+    """Before writing fpath's entry: take over a stale entry with the same hash.
+
+    Covers `update` on a moved file that was never scanned: the old entry
+    is re-keyed (so links to it follow) instead of left stale. No commit.
+    """
+    for (old,) in conn.execute('SELECT path FROM entries WHERE content_hash = ? AND path != ? '
+                               'ORDER BY path', (h, fpath)).fetchall():
+        if not os.path.exists(old):
+            _rekey_entry(conn, old, fpath)
+            _rewrite_related(conn, {old: fpath})
+            return old
+    return None
+
+
+def read_entries(conn, paths=None):
+    """Return {path: entry dict} in the JSON export's shape."""
+    if paths is None:
+        rows = conn.execute(
+            'SELECT path, content_hash, summary, keywords FROM entries ORDER BY path').fetchall()
+        links = conn.execute('SELECT path, target FROM related ORDER BY path, rank').fetchall()
+    else:
+        paths = list(paths)
+        rows, links = [], []
+        for i in range(0, len(paths), 500):
+            part = paths[i:i + 500]
+            marks = ','.join('?' * len(part))
+            rows += conn.execute(
+                f'SELECT path, content_hash, summary, keywords FROM entries '
+                f'WHERE path IN ({marks})', part).fetchall()
+            links += conn.execute(
+                f'SELECT path, target FROM related WHERE path IN ({marks}) '
+                f'ORDER BY path, rank', part).fetchall()
+    entries = {
+        fpath: {
+            'source_path': fpath,
+            'content_hash': h,
+            'summary': summary,
+            'keywords': json.loads(keywords),
+            'related': [],
+        }
+        for fpath, h, summary, keywords in rows
+    }
+    for fpath, target in links:
+        if fpath in entries:
+            entries[fpath]['related'].append(target)
+    return entries
+
+
+def open_existing():
+    """Open the index for a command, or None if nothing has been indexed yet."""
+    if not (os.path.exists(INDEX_DB) or os.path.exists(INDEX_FILE)):
+        return None
+    return open_index()
+
+
+def load_index():
+    """Load the whole index as {'version': 1, 'entries': {path: entry}}."""
+    conn = open_existing()
+    if conn is None:
         return {'version': 1, 'entries': {}}
+    try:
+        return {'version': 1, 'entries': read_entries(conn)}
+    finally:
+        conn.close()
+
+
+def indexed_hashes(conn):
+    """Return {path: content_hash} for every entry."""
+    if conn is None:
+        return {}
+    return dict(conn.execute('SELECT path, content_hash FROM entries').fetchall())
+
+
+def export_json(conn, force=False):
+    """Write semantic-index.json from the database if it changed since the last export.
+
+    Written under the write lock (so no update can slip in between reading
+    and marking the export current) to a temp file that is then renamed, so
+    readers never see a partial file. Returns True if the file was written.
+    """
+    with _db().transaction(conn):
+        if not force and _get_state(conn, 'exported', False) and _json_mtime() is not None:
+            return False
+        index = {'version': 1, 'entries': read_entries(conn)}
+        os.makedirs(os.path.dirname(INDEX_FILE), exist_ok=True)
+        tmp = INDEX_FILE + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, INDEX_FILE)
+        _set_state(conn, 'json_mtime', _json_mtime())
+        _set_state(conn, 'exported', True)
+    load_search_index()  # refresh the hook's snapshot
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Search snapshot (fast cold load for the association hook)
+# ---------------------------------------------------------------------------
+
+# Bump when the snapshot layout changes; older snapshots are rebuilt
+SNAPSHOT_VERSION = 1
+# Terms per postings block; a lookup bisects to a block, then scans it
+SNAPSHOT_BLOCK = 64
+_SEPARATORS = {'\t', '\n'}
+
+
+def _source_stamp():
+    """(mtime_ns, size) of every file the index can be read from."""
+    stamp = []
+    for path in (INDEX_DB, INDEX_DB + '-wal', INDEX_FILE):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def _read_source_entries(stamp):
+    """Entries from the database, or from the JSON when it is newer (pulled, not imported)."""
+    db, wal, js = stamp
+    db_mtime = max(db[0] if db else 0, wal[0] if wal else 0)
+    if db and db_mtime >= (js[0] if js else 0):
+        conn = open_index(readonly=True)
+        try:
+            return read_entries(conn)
+        finally:
+            conn.close()
+    if js:
+        with open(INDEX_FILE, 'r') as f:
+            return json.load(f).get('entries', {})
+    return {}
+
+
+def _build_search_index(entries):
+    """Flatten entries into the few large objects the snapshot stores.
+
+    Unmarshalling cost is per object, so the layout avoids one object per
+    keyword or per posting:
+
+      paths, summaries, related      one item per entry (related is a count)
+      keywords                       per entry, "term\\tdoc_freq" lines
+      summary_text, summary_starts   lowercased summaries joined by NUL
+      block_keys, blocks             postings, "\\nterm\\tidx,idx..." lines in
+                                     sorted blocks of SNAPSHOT_BLOCK terms
+    """
+    paths = list(entries)
+    # Search terms are single tokens; a keyword with a tab or newline could never match
+    kw_sets = [sorted({k.lower() for k in entries[p].get('keywords', []) if not _SEPARATORS & set(k)})
+               for p in paths]
+    postings = {}
+    for i, kws in enumerate(kw_sets):
+        for k in kws:
+            postings.setdefault(k, []).append(i)
+
+    summaries, starts, offset = [], [], 0
+    for p in paths:
+        starts.append(offset)
+        summaries.append(entries[p].get('summary', ''))
+        offset += len(summaries[-1]) + 1
+
+    terms = sorted(postings)
+    block_keys, blocks = [], []
+    for b in range(0, len(terms), SNAPSHOT_BLOCK):
+        chunk = terms[b:b + SNAPSHOT_BLOCK]
+        block_keys.append(chunk[0])
+        blocks.append(''.join(f'\n{t}\t' + ','.join(map(str, postings[t])) for t in chunk) + '\n')
+
+    return {
+        'paths': tuple(paths),
+        'summaries': tuple(summaries),
+        'related': tuple(sum(1 for r in entries[p].get('related', []) if r) for p in paths),
+        'keywords': tuple('\n'.join(f'{k}\t{len(postings[k])}' for k in kws) for kws in kw_sets),
+        'summary_text': '\0'.join(s.lower() for s in summaries),
+        'summary_starts': tuple(starts),
+        'block_keys': tuple(block_keys),
+        'blocks': tuple(blocks),
+    }
 
 
-def save_index(index):
-    """Write index to disk, creating directories as needed."""
-    os.makedirs(os.path.dirname(INDEX_FILE), exist_ok=True)
-    with open(INDEX_FILE, 'w') as f:
-        json.dump(index, f, indent=2)
+def snapshot_postings(index, term):
+    """Entry numbers whose keywords include term (lowercase)."""
+    b = bisect.bisect_right(index['block_keys'], term) - 1
+    if b < 0:
+        return []
+    block = index['blocks'][b]
+    at = block.find(f'\n{term}\t')
+    if at < 0:
+        return []
+    start = at + len(term) + 2
+    return [int(i) for i in block[start:block.index('\n', start)].split(',')]
+
+
+def snapshot_keywords(index, i):
+    """[(keyword, doc_freq)] for entry number i."""
+    out = []
+    for line in index['keywords'][i].split('\n'):
+        if line:
+            term, df = line.split('\t')
+            out.append((term, int(df)))
+    return out
+
+
+def snapshot_summary_hits(index, term):
+    """Entry numbers whose lowercased summary contains term."""
+    text, starts = index['summary_text'], index['summary_starts']
+    hits = []
+    at = text.find(term)
+    while at >= 0:
+        i = bisect.bisect_right(starts, at) - 1
+        hits.append(i)
+        # Resume at the next summary; each one counts once per term
+        if i + 1 == len(starts):
+            break
+        at = text.find(term, starts[i + 1])
+    return hits
+
+
+def load_search_index():
+    """Return the keyword-search structures, from the snapshot when it is current.
+
+    The snapshot (memory/semantic-index.snap) is a marshal dump stamped with
+    the stat of the database, its WAL and the JSON export. When any of them
+    changed it is rebuilt from the source and rewritten (best effort), so
+    only the first process after a write pays for the slow load.
+    """
+    stamp = _source_stamp()
+    if stamp == (None, None, None):
+        return _build_search_index({})
+    try:
+        with open(SNAPSHOT_FILE, 'rb') as f:
+            version, snap_stamp, data = marshal.loads(f.read())
+        if version == SNAPSHOT_VERSION and snap_stamp == stamp:
+            return data
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    data = _build_search_index(_read_source_entries(stamp))
+    # Only persist if nothing was written while we were reading
+    if _source_stamp() == stamp:
+        try:
+            tmp = f'{SNAPSHOT_FILE}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                marshal.dump((SNAPSHOT_VERSION, stamp, data), f)
+            os.replace(tmp, SNAPSHOT_FILE)
+        except OSError as e:
+            sys.stderr.write(f'[index-vault] could not write snapshot: {e}\n')
+    return data
 
 
 def vault_files():
-    """Find all markdown files in the vault."""
-    return sorted(glob.glob(os.path.join(VAULT_DIR, '**', '*.md'), recursive=True))
+    """Find all markdown files in the vault (the generated TOC excluded)."""
+    return sorted(p for p in glob.glob(os.path.join(VAULT_DIR, '**', '*.md'), recursive=True)
+                  if p != TOC_FILE)
+
+
+# File reads overlap on a thread pool; hashing releases the GIL for large texts
+HASH_WORKERS = 8
+
+
+def _hash_file(fpath):
+    try:
+        with open(fpath, 'r', encoding='utf-8', errors='replace') as f:
+            return fpath, content_hash(f.read())
+    except OSError:
+        return fpath, None
+
+
+def file_hashes(paths, workers=HASH_WORKERS):
+    """Return {path: content_hash} for the readable files among paths."""
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return {p: h for p, h in pool.map(_hash_file, paths) if h is not None}
 
 
 # ---------------------------------------------------------------------------
 # Commands
 # ---------------------------------------------------------------------------
 
-def cmd_scan():
-    """Find files needing indexing. Prints info for a subagent to process."""
-    index = load_index()
-    files = vault_files()
-    needs_indexing = []
+def _preview(fpath, n=5):
+    """First n lines of a file, without reading the rest."""
+    lines = []
+    try:
+        with open(fpath, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                lines.append(line.rstrip('\n'))
+                if len(lines) >= n:
+                    break
+    except OSError:
+        pass
+    return lines
+
+
+# ---------------------------------------------------------------------------
+# Table of contents
+# ---------------------------------------------------------------------------
+
+_TAG_LINE = re.compile(r'^#[^\s#]')
 
-    for fpath in files:
-        with open(fpath, 'r') as f:
-            text = f.read()
-        h = content_hash(text)
-        entry = index['entries'].get(fpath)
-        if entry and entry.get('content_hash') == h:
+
+def _header(fpath):
+    """(title, tag line) from a file's first lines.
+
+    Convention: line 1 is `# Title`, line 3 is `#tags #for #searching`; the
+    tag line is taken from any of the first 5 lines.
+    """
+    lines = _preview(fpath)
+    title = next((l.strip() for l in lines if l.strip()), '')
+    if title.startswith('#') and not _TAG_LINE.match(title):
+        title = title.lstrip('#').strip()
+    tags = next((l.strip() for l in lines[1:] if _TAG_LINE.match(l.strip())), '')
+    return title, tags
+
+
+def refresh_toc(conn, manifest):
+    """Re-read headers of files whose content changed; rewrite toc.md if anything did.
+
+    manifest is refresh_manifest()'s {path: content_hash}. Returns True if
+    the TOC changed.
+    """
+    stored = dict(conn.execute('SELECT path, content_hash FROM toc').fetchall())
+    changed = [p for p in manifest if stored.get(p) != manifest[p]]
+    removed = [p for p in stored if p not in manifest]
+    if changed or removed:
+        rows = [(p, manifest[p], *_header(p)) for p in changed]
+        with _db().transaction(conn):
+            conn.executemany('INSERT OR REPLACE INTO toc (path, content_hash, title, tags) '
+                             'VALUES (?, ?, ?, ?)', rows)
+            conn.executemany('DELETE FROM toc WHERE path = ?', [(p,) for p in removed])
+    if changed or removed or not os.path.exists(TOC_FILE):
+        tmp = TOC_FILE + '.tmp'
+        os.makedirs(os.path.dirname(TOC_FILE), exist_ok=True)
+        with open(tmp, 'w') as f:
+            f.write('\n'.join(render_toc(conn)) + '\n')
+        os.replace(tmp, TOC_FILE)
+        return True
+    return False
+
+
+def _toc_rows(conn, directory=None):
+    """{directory: [(name, title, tags, size, mtime_ns)]} in path order."""
+    rows = conn.execute(
+        'SELECT t.path, t.title, t.tags, m.size, m.mtime_ns FROM toc t '
+        'JOIN manifest m ON m.path = t.path ORDER BY t.path').fetchall()
+    groups = {}
+    for fpath, title, tags, size, mtime_ns in rows:
+        d, name = os.path.split(fpath)
+        if directory and os.path.normpath(d) != os.path.normpath(directory):
             continue
-        needs_indexing.append(fpath)
+        groups.setdefault(d + '/', []).append((name, title, tags, size, mtime_ns))
+    return groups
+
+
+def render_toc(conn, max_per_dir=None, directory=None):
+    """TOC lines grouped by directory, optionally truncated per directory."""
+    lines = []
+    for d, files in _toc_rows(conn, directory).items():
+        lines.append(f'=== {d} ({len(files)} file{"s" if len(files) != 1 else ""}) ===')
+        shown = files if not max_per_dir else files[:max_per_dir]
+        for name, title, tags, size, mtime_ns in shown:
+            date = datetime.fromtimestamp(mtime_ns / 1e9, timezone.utc).strftime('%Y-%m-%d')
+            line = f'  {name} — {title}' if title else f'  {name}'
+            if tags:
+                line += f'  {tags}'
+            lines.append(f'{line}  ({size / 1024:.1f} KB, {date})')
+        if len(shown) < len(files):
+            lines.append(f'  … {len(files) - len(shown)} more')
+        lines.append('')
+    return lines
+
+
+def cmd_toc(max_per_dir=None, directory=None, as_json=False):
+    """Print the vault's table of contents, refreshing changed files first."""
+    conn = open_index()
+    refresh_toc(conn, refresh_manifest(conn))
+    if as_json:
+        print(json.dumps({
+            d: [{'name': n, 'title': t, 'tags': g, 'size': s, 'mtime_ns': m}
+                for n, t, g, s, m in files]
+            for d, files in _toc_rows(conn, directory).items()
+        }, indent=2))
+    else:
+        print('\n'.join(render_toc(conn, max_per_dir, directory)).rstrip())
+    conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Full-text index (FTS5, one row per heading section)
+# ---------------------------------------------------------------------------
+
+# Created outside SCHEMA: SQLite builds without FTS5 still get the rest
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS vault_fts USING fts5(
+    path UNINDEXED, heading, body, start_line UNINDEXED, end_line UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS fts_files (
+    path TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL
+);
+"""
+# bm25 column weights (path, heading, body, start_line, end_line)
+FTS_WEIGHTS = (0.0, 3.0, 1.0, 0.0, 0.0)
+# One row per heading section; never split further by length
+_FTS_SECTION_WORDS = 10**9
+
+
+def _has_fts(conn, create=False):
+    """True if the FTS tables exist (creating them when asked and possible)."""
+    if create:
+        try:
+            conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            sys.stderr.write(f'[index-vault] full-text index unavailable: {e}\n')
+            return False
+        return True
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'vault_fts'").fetchone() is not None
+
+
+def refresh_fts(conn, manifest):
+    """Re-index the sections of files whose content hash changed.
+
+    manifest is refresh_manifest()'s {path: content_hash}. Sections come
+    from vectorize.py's heading splitter. Returns the number of files
+    (re)indexed or removed, or None without FTS5.
+    """
+    if not _has_fts(conn, create=True):
+        return None
+    stored = dict(conn.execute('SELECT path, content_hash FROM fts_files').fetchall())
+    changed = [p for p in sorted(manifest) if stored.get(p) != manifest[p]]
+    removed = [p for p in stored if p not in manifest]
+    if not changed and not removed:
+        return 0
+    split_chunks = _db().load_sibling('vectorize.py').split_chunks
+    with _db().transaction(conn):
+        for fpath in removed + changed:
+            conn.execute('DELETE FROM vault_fts WHERE path = ?', (fpath,))
+            conn.execute('DELETE FROM fts_files WHERE path = ?', (fpath,))
+        for fpath in changed:
+            try:
+                with open(fpath, 'r', encoding='utf-8', errors='replace') as f:
+                    text = f.read()
+            except OSError:
+                continue
+            rows = []
+            for chunk in split_chunks(text, max_words=_FTS_SECTION_WORDS):
+                body = chunk['text']
+                if chunk['heading']:
+                    body = body[len(chunk['heading']) + 1:]
+                rows.append((fpath, chunk['heading'], body, chunk['start_line'], chunk['end_line']))
+            conn.executemany('INSERT INTO vault_fts (path, heading, body, start_line, end_line) '
+                             'VALUES (?, ?, ?, ?, ?)', rows)
+            conn.execute('INSERT INTO fts_files (path, content_hash) VALUES (?, ?)',
+                         (fpath, manifest[fpath]))
+    return len(changed) + len(removed)
+
+
+def fts_query(terms, match_all=True):
+    """FTS5 MATCH expression for plain terms: each quoted, joined by AND/OR."""
+    words = [w for w in re.findall(r'[\w-]+', ' '.join(terms).lower()) if w.strip('-')]
+    return f' {"AND" if match_all else "OR"} '.join(f'"{w}"' for w in words)
+
+
+def search_fts(conn, match, limit=20, per_file=1):
+    """Rank sections for an FTS5 MATCH expression.
+
+    Returns [{path, heading, start_line, end_line, snippet, score}], best
+    first, with at most per_file sections per file (0 = no limit). score is
+    the negated bm25, so higher is better. Returns [] without an FTS table
+    or for an empty or malformed query.
+    """
+    if not match or not _has_fts(conn):
+        return []
+    weights = ', '.join(map(str, FTS_WEIGHTS))
+    try:
+        # Rank everything first (cheap), then build snippets for the winners only
+        ranked = conn.execute(
+            f'SELECT rowid, path, bm25(vault_fts, {weights}) AS rank FROM vault_fts '
+            f'WHERE vault_fts MATCH ? ORDER BY rank', (match,))
+        chosen, per_path = {}, {}
+        for rowid, fpath, rank in ranked:
+            if per_file and per_path.get(fpath, 0) >= per_file:
+                continue
+            per_path[fpath] = per_path.get(fpath, 0) + 1
+            chosen[rowid] = -rank
+            if len(chosen) >= limit:
+                break
+        rows = conn.execute(
+            f"SELECT rowid, path, heading, start_line, end_line, snippet(vault_fts, 2, '[', ']', '…', 12) "
+            f'FROM vault_fts WHERE vault_fts MATCH ? AND rowid IN ({",".join("?" * len(chosen))})',
+            (match, *chosen)).fetchall() if chosen else []
+    except sqlite3.OperationalError as e:
+        sys.stderr.write(f'[index-vault] full-text query failed: {e}\n')
+        return []
+    results = [{'path': fpath, 'heading': heading, 'start_line': start, 'end_line': end,
+                'snippet': ' '.join(snippet.split()), 'score': chosen[rowid]}
+               for rowid, fpath, heading, start, end, snippet in rows]
+    results.sort(key=lambda r: -r['score'])
+    return results
+
+
+def cmd_fts(query, limit=20, match_all=True, raw=False, files_only=False, as_json=False):
+    """Full-text search over vault sections, refreshing changed files first."""
+    conn = open_index()
+    if refresh_fts(conn, refresh_manifest(conn)) is None:
+        conn.close()
+        print('Full-text search needs SQLite with FTS5.')
+        return []
+    match = query if raw else fts_query([query], match_all)
+    results = search_fts(conn, match, limit, per_file=1 if files_only else 0)
+    conn.close()
+    if as_json:
+        print(json.dumps(results, indent=2))
+    elif files_only:
+        for r in results:
+            print(r['path'])
+    elif not results:
+        print(f'No full-text matches for: {query}')
+    else:
+        for r in results:
+            where = f"{r['path']}:{r['start_line']}-{r['end_line']}"
+            print(f"  [{r['score']:.1f}] {where}" + (f"  ({r['heading']})" if r['heading'] else ''))
+            print(f"        {r['snippet']}")
+    return results
+
+
+def cmd_scan(as_json=False):
+    """Find files needing indexing. Prints info for a subagent to process.
+
+    Uses the stat manifest, so only files changed since the last scan (by
+    this script or vectorize.py) are read.
+    """
+    conn = open_index()
+    manifest = refresh_manifest(conn)
+    moves, copies = reconcile_moves(conn, manifest)
+    refresh_toc(conn, manifest)
+    refresh_fts(conn, manifest)
+    indexed = indexed_hashes(conn)
+    conn.close()
+    needs_indexing = [p for p in sorted(manifest) if indexed.get(p) != manifest[p]]
+
+    if as_json:
+        print(json.dumps({
+            'total': len(manifest),
+            'up_to_date': len(manifest) - len(needs_indexing),
+            'needs_index': [{'path': p, 'hash': manifest[p], 'preview': _preview(p)}
+                            for p in needs_indexing],
+            'stale': sorted(p for p in indexed if p not in manifest),
+            'moved': [{'from': old, 'to': new} for old, new in sorted(moves.items())],
+            'copied': [{'from': src, 'to': new} for new, src in sorted(copies.items())],
+        }, indent=2))
+        return needs_indexing
+
+    for old, new in sorted(moves.items()):
+        print(f'MOVED: {old} -> {new}')
+    for new, src in sorted(copies.items()):
+        print(f'COPIED: {src} -> {new}')
+    if moves or copies:
+        print(f'{len(moves) + len(copies)} entr{"y" if len(moves) + len(copies) == 1 else "ies"} '
+              f'reused by content hash (no indexing needed).\n')
+
+    for fpath in needs_indexing:
         print(f'NEEDS_INDEX: {fpath}')
-        print(f'  hash: {h}')
+        print(f'  hash: {manifest[fpath]}')
         # Preview first 5 lines for context
-        for line in text.split('\n')[:5]:
+        for line in _preview(fpath):
             print(f'  | {line}')
         print()
 
@@ -124,18 +986,580 @@ def cmd_update(fpath, summary, keywords, related=None):
     if not os.path.isfile(fpath):
         print(f'Error: file not found: {fpath}')
         sys.exit(1)
-    index = load_index()
     with open(fpath, 'r') as f:
         text = f.read()
-    index['entries'][fpath] = {
-        'source_path': fpath,
-        'content_hash': content_hash(text),
-        'summary': summary,
-        'keywords': keywords,
-        'related': related or [],
+    conn = open_index()
+    moved_from = upsert_entry(conn, fpath, content_hash(text), summary, keywords, related)
+    conn.close()
+    print(f'Indexed: {fpath} ({len(keywords)} keywords)'
+          + (f', moved from {moved_from}' if moved_from else ''))
+
+
+def _as_list(value):
+    """Accept a list or a comma-separated string (JSONL batch fields)."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(v).strip() for v in value if str(v).strip() and str(v).strip() != 'none']
+
+
+def cmd_update_batch(source='-'):
+    """Apply index entries from JSONL in one transaction.
+
+    Each line is an object with path, summary, keywords and optional
+    related (lists or comma-separated strings). File hashes are computed
+    on a thread pool; the JSON export is written once at the end. Returns
+    the number of lines that could not be applied.
+    """
+    records = []
+    failed = 0
+    try:
+        f = sys.stdin if source == '-' else open(source, 'r')
+    except OSError as e:
+        print(f'Error: cannot read {source}: {e.strerror}')
+        print('Usage: index-vault.py update-batch [file.jsonl]  (stdin if omitted)')
+        sys.exit(1)
+    try:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+                records.append((rec['path'], str(rec['summary']),
+                                _as_list(rec['keywords']), _as_list(rec.get('related'))))
+            except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+                print(f'  line {n}: skipped ({type(e).__name__}: {e})')
+                failed += 1
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+    hashes = file_hashes(sorted({r[0] for r in records}))
+    missing = [r for r in records if r[0] not in hashes]
+    for fpath, *_ in missing:
+        print(f'  {fpath}: skipped (file not found)')
+    records = [r for r in records if r[0] in hashes]
+
+    if records:
+        conn = open_index()
+        with _db().transaction(conn):
+            for fpath, summary, keywords, related in records:
+                _adopt_moved(conn, fpath, hashes[fpath])
+                _write_entry(conn, fpath, hashes[fpath], summary, keywords, related)
+            _set_state(conn, 'exported', False)
+        export_json(conn)
+        conn.close()
+    print(f'Indexed {len(records)} entries'
+          + (f' ({failed + len(missing)} skipped)' if failed or missing else ''))
+    return failed + len(missing)
+
+
+# A file written within this long of being hashed could change again without
+# its mtime moving (coarse filesystem timestamps); such rows are re-hashed
+# on the next refresh instead of trusted
+RACY_WINDOW_NS = 2 * 10**9
+
+
+def refresh_manifest(conn=None, workers=HASH_WORKERS):
+    """Bring the stat manifest up to date and return {path: content_hash}.
+
+    Every vault file is stat()ed; only files whose (size, mtime_ns, inode)
+    differ from the stored row, or whose row was recorded racily, are read
+    and hashed (on a thread pool). Rows of deleted files are dropped.
+    """
+    own = conn is None
+    if own:
+        conn = open_index()
+    try:
+        stored = {r[0]: r[1:] for r in conn.execute(
+            'SELECT path, size, mtime_ns, inode, content_hash, racy FROM manifest')}
+        manifest, stats = {}, {}
+        for fpath in vault_files():
+            try:
+                st = os.stat(fpath)
+            except OSError:
+                continue
+            sig = (st.st_size, st.st_mtime_ns, st.st_ino)
+            old = stored.get(fpath)
+            if old and old[:3] == sig and not old[4]:
+                manifest[fpath] = old[3]
+            else:
+                stats[fpath] = sig
+        if stats:
+            now_ns = time.time_ns()
+            hashes = file_hashes(sorted(stats), workers)
+            manifest.update(hashes)
+            rows = [(p, *stats[p], h, int(now_ns - stats[p][1] < RACY_WINDOW_NS))
+                    for p, h in hashes.items()]
+        else:
+            rows = []
+        removed = [p for p in stored if p not in manifest]
+        if rows or removed:
+            with _db().transaction(conn):
+                conn.executemany(
+                    'INSERT OR REPLACE INTO manifest '
+                    '(path, size, mtime_ns, inode, content_hash, racy) VALUES (?, ?, ?, ?, ?, ?)',
+                    rows)
+                conn.executemany('DELETE FROM manifest WHERE path = ?', [(p,) for p in removed])
+        return manifest
+    finally:
+        if own:
+            conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Work plans for parallel indexing subagents
+# ---------------------------------------------------------------------------
+
+# Rough English average; only relative batch sizes matter
+BYTES_PER_TOKEN = 4
+# Per-file cost on top of the content: prompt, summary and keyword output
+PLAN_FILE_TOKENS = 300
+PLAN_WORKERS = 4
+
+
+def _plan_pending(conn):
+    """(manifest, {path: estimated tokens} of files needing an index entry)."""
+    manifest = refresh_manifest(conn)
+    reconcile_moves(conn, manifest)
+    indexed = indexed_hashes(conn)
+    sizes = dict(conn.execute('SELECT path, size FROM manifest').fetchall())
+    return manifest, {p: sizes.get(p, 0) // BYTES_PER_TOKEN
+                      for p in manifest if indexed.get(p) != manifest[p]}
+
+
+def pack_batches(costs, workers):
+    """Split {item: cost} into at most `workers` batches of similar total cost.
+
+    Longest-processing-time greedy: items in descending cost order, each
+    into the currently lightest batch. A single item larger than the
+    average gets a batch of its own. Returns [[item, ...]], heaviest first.
+    """
+    import heapq
+    heap = [(0, i) for i in range(max(1, workers))]
+    batches = [[] for _ in heap]
+    for item in sorted(costs, key=lambda k: (-costs[k], k)):
+        load, i = heapq.heappop(heap)
+        batches[i].append(item)
+        heapq.heappush(heap, (load + costs[item], i))
+    batches = [b for b in batches if b]
+    batches.sort(key=lambda b: -sum(costs[x] for x in b))
+    return batches
+
+
+def _read_plan():
+    try:
+        with open(PLAN_FILE, 'r') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except (OSError, json.JSONDecodeError):
+        return []
+
+
+def _plan_lines(numbered, manifest, tokens):
+    """Plan file objects for [(batch number, [path, ...])]; empty batches dropped."""
+    return [{
+        'batch': n,
+        'tokens': sum(tokens[p] + PLAN_FILE_TOKENS for p in files),
+        'files': [{'path': p, 'hash': manifest[p], 'tokens': tokens[p]} for p in files],
+    } for n, files in numbered if files]
+
+
+def plan_work(workers=PLAN_WORKERS, new=False):
+    """Return (batches, resumed, unplanned) for the files needing indexing.
+
+    An unfinished saved plan (memory/meta/index-plan.jsonl) is resumed:
+    its batches come back with finished files (entry hash == current file
+    hash) dropped, so each subagent picks up where its batch stopped.
+    Otherwise, or with new, pending files are packed into `workers`
+    batches by estimated tokens and the plan is saved. unplanned is the
+    number of pending files a resumed plan does not cover.
+    """
+    conn = open_index()
+    try:
+        manifest, tokens = _plan_pending(conn)
+    finally:
+        conn.close()
+    if not new:
+        saved = _read_plan()
+        planned = {f['path'] for b in saved for f in b['files']}
+        # Saved batch numbers are kept so subagents can be matched up
+        lines = _plan_lines([(b['batch'], [f['path'] for f in b['files'] if f['path'] in tokens])
+                             for b in saved], manifest, tokens)
+        if lines:
+            return lines, True, len(set(tokens) - planned)
+
+    costs = {p: t + PLAN_FILE_TOKENS for p, t in tokens.items()}
+    lines = _plan_lines(enumerate(pack_batches(costs, workers), 1), manifest, tokens) if costs else []
+    os.makedirs(os.path.dirname(PLAN_FILE), exist_ok=True)
+    tmp = PLAN_FILE + '.tmp'
+    with open(tmp, 'w') as f:
+        f.writelines(json.dumps(line) + '\n' for line in lines)
+    os.replace(tmp, PLAN_FILE)
+    return lines, False, 0
+
+
+def cmd_plan(workers=PLAN_WORKERS, new=False, status=False):
+    """Print the work plan as JSONL (one batch per line) on stdout.
+
+    Notes go to stderr so the output can be piped. With status, prints
+    per-batch progress of the saved plan instead.
+    """
+    if status:
+        saved = _read_plan()
+        if not saved:
+            print('No saved plan.')
+            return saved
+        conn = open_index()
+        try:
+            manifest, tokens = _plan_pending(conn)
+        finally:
+            conn.close()
+        total = done = 0
+        for b in saved:
+            left = [f for f in b['files'] if f['path'] in tokens]
+            total += len(b['files'])
+            done += len(b['files']) - len(left)
+            print(f"  batch {b['batch']}: {len(b['files']) - len(left)}/{len(b['files'])} done"
+                  + (f", ~{sum(tokens[f['path']] for f in left)} tokens left" if left else ''))
+        unplanned = len(set(tokens) - {f['path'] for b in saved for f in b['files']})
+        print(f'Plan: {done}/{total} files done'
+              + (f'; {unplanned} pending file(s) not in the plan (plan --new)' if unplanned else ''))
+        return saved
+
+    lines, resumed, unplanned = plan_work(workers, new)
+    for line in lines:
+        print(json.dumps(line))
+    if not lines:
+        sys.stderr.write('All files indexed and up to date.\n')
+    elif resumed:
+        sys.stderr.write(f'Resumed saved plan: {sum(len(l["files"]) for l in lines)} file(s) left '
+                         f'in {len(lines)} batch(es)'
+                         + (f'; {unplanned} newer pending file(s) not included (plan --new)'
+                            if unplanned else '') + '\n')
+    else:
+        loads = [l['tokens'] for l in lines]
+        sys.stderr.write(f'Planned {sum(len(l["files"]) for l in lines)} file(s) in {len(lines)} '
+                         f'batch(es), ~{min(loads)}-{max(loads)} tokens each\n')
+    return lines
+
+
+# ---------------------------------------------------------------------------
+# Local extraction (auto-index): keywords and summary without a model
+# ---------------------------------------------------------------------------
+
+AUTO_KEYWORDS = 20
+# Below this many files the process pool costs more than it saves
+AUTO_POOL_MIN = 64
+SUMMARY_MAX = 200
+
+# Lowercase tokens, single letters and numbers included so they break RAKE runs
+_TOKEN = re.compile(r'[a-z0-9][a-z0-9_-]*[a-z0-9]|[a-z0-9]')
+# Tokens plus the punctuation and line breaks that also end a phrase
+_RAKE_TOKEN = re.compile(r'[a-z0-9][a-z0-9_-]*[a-z0-9]|[a-z0-9]|[^\w\s-]|\n|(?<!\w)-+|-+(?!\w)')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"(\[])')
+_LIST_MARK = re.compile(r'^\s*(?:[-*+>]|\d+[.)])\s+')
+_MD_NOISE = re.compile(r'`|\*\*|__|\[\[|\]\]|\[([^\]]*)\]\([^)]*\)')
+_HASHTAG = re.compile(r'#([\w/-]+)')
+
+# On top of association-search's STOPWORDS: words too generic to index
+_EXTRA_STOPWORDS = {
+    'any', 'etc', 'via', 'uses', 'using', 'one', 'two', 'new', 'see', 'let',
+    'now', 'well', 'way', 'yes', 'many', 'per', 'say', 'says', 'said', 'want',
+    'wants', 'http', 'https', 'www', 'com', 'don', 'doesn', 'isn', 'across',
+    'since', 'until', 'within', 'without', 'first', 'last', 'keep', 'keeps',
+    'show', 'shows', 'found', 'find', 'finds', 'take', 'takes', 'put', 'run',
+    'runs', 'read', 'reads', 'set', 'sets', 'gets', 'makes', 'made', 'goes',
+    'come', 'comes', 'still', 'yet', 'already', 'always', 'never', 'often',
+    'instead', 'rather', 'maybe', 'perhaps', 'probably',
+}
+
+_stopword_set = None
+
+
+def _stopwords():
+    global _stopword_set
+    if _stopword_set is None:
+        assoc = _db().load_sibling('association-search.py')
+        _stopword_set = set(assoc.STOPWORDS) | _EXTRA_STOPWORDS
+    return _stopword_set
+
+
+def _is_term(word, stop):
+    return len(word) > 2 and word[0].isalpha() and word not in stop
+
+
+def _clean(line):
+    """Strip list markers, emphasis and link targets from a markdown line."""
+    line = _LIST_MARK.sub('', line)
+    return _MD_NOISE.sub(lambda m: m.group(1) or '', line).strip()
+
+
+def _analyze_file(fpath):
+    """Parse one file for auto-index (runs in pool workers).
+
+    Returns None if unreadable, else a dict with the content hash, title,
+    tags, headings, body term counts, RAKE phrase candidates
+    {phrase: [count, score]} and candidate summary sentences.
+    """
+    try:
+        with open(fpath, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+    except OSError:
+        return None
+    stop = _stopwords()
+    title, tags, headings, prose = '', [], [], []
+    in_code = in_front = False
+    for n, raw in enumerate(text.split('\n')):
+        line = raw.strip()
+        if n == 0 and line == '---':
+            in_front = True
+            continue
+        if in_front:
+            if line == '---':
+                in_front = False
+            elif line.lower().startswith(('tags:', 'keywords:')):
+                tags += [t.strip(' #"\'') for t in re.split(r'[,\[\]]', line.split(':', 1)[1])]
+            continue
+        if line.startswith('```') or line.startswith('~~~'):
+            in_code = not in_code
+            continue
+        if in_code or not line or line.startswith('|'):
+            continue
+        if _TAG_LINE.match(line):
+            tags += _HASHTAG.findall(line)
+        elif line.startswith('#'):
+            heading = _clean(line.lstrip('#'))
+            if not title and line.startswith('# '):
+                title = heading
+            elif heading:
+                headings.append(heading)
+        else:
+            prose.append(_clean(line))
+
+    tokens = _RAKE_TOKEN.findall('\n'.join(prose + headings).lower())
+    counts = {t: n for t, n in Counter(tokens).items() if _is_term(t, stop)}
+
+    # RAKE: candidate phrases are runs of content words between stopwords,
+    # short tokens, numbers, punctuation and line breaks; a word's score is
+    # its degree / frequency
+    runs, run = [], []
+    for t in tokens:
+        if t in counts:
+            run.append(t)
+            continue
+        if len(run) > 1:
+            runs.append(run)
+        run = []
+    if len(run) > 1:
+        runs.append(run)
+    freq = Counter(chain.from_iterable(runs))
+    degree = dict.fromkeys(freq, 0)
+    for run in runs:
+        n = len(run)
+        for word in run:
+            degree[word] += n
+    phrases = {}
+    for run in runs:
+        # A run of up to 3 words is a candidate itself; word pairs inside
+        # longer runs are candidates too, so a repeated pair surfaces
+        grams = [run] if len(run) <= 3 else []
+        if len(run) > 2:
+            grams += [run[i:i + 2] for i in range(len(run) - 1)]
+        for words in grams:
+            if len(set(words)) < len(words):
+                continue
+            phrase = ' '.join(words)
+            entry = phrases.get(phrase)
+            if entry is None:
+                entry = phrases[phrase] = [0, sum(degree[w] / freq[w] for w in words)]
+            entry[0] += 1
+
+    sentences = []
+    for paragraph in prose:
+        sentences += [x for x in _SENTENCE_END.split(paragraph)
+                      if len(x) <= SUMMARY_MAX * 2 and len(x.split()) >= 4]
+        if len(sentences) >= 30:
+            break
+
+    return {
+        'hash': content_hash(text),
+        'title': title,
+        'tags': [t.lower() for t in tags if t],
+        'headings': headings,
+        'counts': counts,
+        'phrases': phrases,
+        'sentences': sentences,
     }
-    save_index(index)
-    print(f'Indexed: {fpath} ({len(keywords)} keywords)')
+
+
+def _summarize(info, idf):
+    """Title plus the most informative early sentence, capped at SUMMARY_MAX."""
+    stop = _stopwords()
+    best, best_score = '', 0.0
+    for pos, sentence in enumerate(info['sentences']):
+        terms = {w for w in _TOKEN.findall(sentence.lower()) if _is_term(w, stop)}
+        if not terms:
+            continue
+        score = sum(idf.get(t, 1.0) for t in terms) / math.sqrt(len(terms))
+        score *= 1.5 if pos == 0 else 1.0 / (1 + 0.05 * pos)
+        if score > best_score:
+            best, best_score = sentence, score
+    title = info['title']
+    summary = f'{title}: {best}' if title and best else (title or best)
+    if not summary and info['headings']:
+        summary = info['headings'][0]
+    if len(summary) > SUMMARY_MAX:
+        summary = summary[:SUMMARY_MAX].rsplit(' ', 1)[0].rstrip(',;:') + '…'
+    return summary
+
+
+def _extract_keywords(info, idf, limit=AUTO_KEYWORDS):
+    """Rank keyword candidates for one file.
+
+    Tags always come first. Body words are scored by TF-IDF against the
+    vault, multi-word RAKE phrases by their mean IDF scaled by the root of
+    their RAKE word score (kept when repeated or used in a heading), and words
+    or short phrases from the title and headings get a boost.
+    """
+    stop = _stopwords()
+    scores = {}
+    for word, tf in info['counts'].items():
+        scores[word] = (1 + math.log(tf)) * idf.get(word, 1.0)
+
+    heading_text = ' '.join(info['headings']).lower()
+    for phrase, (tf, rake) in info['phrases'].items():
+        words = phrase.split()
+        if tf < 2 and phrase not in heading_text:
+            continue
+        mean_idf = sum(idf.get(w, 1.0) for w in words) / len(words)
+        # Square root: long runs of content words would otherwise swamp single words
+        scores[phrase] = max(scores.get(phrase, 0),
+                             (1 + math.log(tf)) * mean_idf * math.sqrt(rake / len(words)))
+
+    boosted = set()
+    for boost, text in [(3.0, info['title'])] + [(2.0, h) for h in info['headings']]:
+        words = [w for w in _TOKEN.findall(text.lower()) if _is_term(w, stop)]
+        for word in words:
+            if word not in boosted:
+                boosted.add(word)
+                scores[word] = scores.get(word, idf.get(word, 1.0)) * boost
+        if 1 < len(words) <= 4:
+            phrase = ' '.join(words)
+            scores[phrase] = max(scores.get(phrase, 0),
+                                 boost * sum(idf.get(w, 1.0) for w in words) / len(words))
+
+    keywords = list(dict.fromkeys(info['tags']))
+    for term, _ in sorted(scores.items(), key=lambda x: (-x[1], x[0])):
+        if len(keywords) >= limit:
+            break
+        if term not in keywords:
+            keywords.append(term)
+    return keywords
+
+
+def _analyze_all(paths, workers):
+    """{path: analysis} for paths, on a process pool when there are enough.
+
+    Workers are spawned (as in vectorize.py), so each loads the stopword
+    list once in its initializer instead of relying on fork.
+    """
+    if workers > 1 and len(paths) >= AUTO_POOL_MIN:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers, initializer=_stopwords,
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = pool.map(_analyze_file, paths, chunksize=max(1, len(paths) // (workers * 8)))
+            return {p: r for p, r in zip(paths, results) if r is not None}
+    return {p: r for p in paths if (r := _analyze_file(p)) is not None}
+
+
+def auto_index(reindex_all=False, workers=None, limit=AUTO_KEYWORDS):
+    """Build entries for changed (or, with reindex_all, all) files locally.
+
+    Document frequencies come from the doc_terms table, so an incremental
+    run only parses files whose content changed. Existing related links are
+    kept. Returns (records, seconds) where records are update-batch style
+    dicts in path order.
+    """
+    t0 = time.time()
+    workers = workers or os.cpu_count() or 1
+    conn = open_index()
+    try:
+        manifest = refresh_manifest(conn)
+        reconcile_moves(conn, manifest)
+        indexed = indexed_hashes(conn)
+        targets = [p for p in sorted(manifest) if reindex_all or indexed.get(p) != manifest[p]]
+        cached = {p: (h, t) for p, h, t in conn.execute(
+            'SELECT path, content_hash, terms FROM doc_terms')}
+        stale_terms = [p for p in sorted(manifest) if cached.get(p, ('',))[0] != manifest[p]]
+        analyses = _analyze_all(sorted(set(targets) | set(stale_terms)), workers)
+
+        doc_freq = {}
+        for p in manifest:
+            if p in analyses:
+                terms = analyses[p]['counts']
+            elif p in cached:
+                terms = cached[p][1].split()
+            else:
+                continue
+            for t in terms:
+                doc_freq[t] = doc_freq.get(t, 0) + 1
+        n_docs = len(manifest)
+        idf = {t: math.log((1 + n_docs) / (1 + df)) + 1 for t, df in doc_freq.items()}
+
+        related = read_entries(conn, [p for p in targets if p in indexed])
+        records = []
+        for p in targets:
+            info = analyses.get(p)
+            if info is None:
+                continue
+            records.append({
+                'path': p,
+                'hash': info['hash'],
+                'summary': _summarize(info, idf),
+                'keywords': _extract_keywords(info, idf, limit),
+                'related': related.get(p, {}).get('related', []),
+            })
+
+        term_rows = [(p, analyses[p]['hash'], ' '.join(sorted(analyses[p]['counts'])))
+                     for p in stale_terms if p in analyses]
+        removed = [p for p in cached if p not in manifest]
+        if term_rows or removed:
+            with _db().transaction(conn):
+                conn.executemany('INSERT OR REPLACE INTO doc_terms (path, content_hash, terms) '
+                                 'VALUES (?, ?, ?)', term_rows)
+                conn.executemany('DELETE FROM doc_terms WHERE path = ?', [(p,) for p in removed])
+    finally:
+        conn.close()
+    return records, time.time() - t0
+
+
+def cmd_auto_index(reindex_all=False, workers=None, limit=AUTO_KEYWORDS, as_jsonl=False):
+    """Index changed files with locally extracted keywords and summaries.
+
+    With as_jsonl, prints the entries as update-batch JSONL instead of
+    writing them (for review or model refinement before update-batch).
+    """
+    records, elapsed = auto_index(reindex_all, workers, limit)
+    if as_jsonl:
+        for rec in records:
+            print(json.dumps({k: rec[k] for k in ('path', 'summary', 'keywords', 'related')}))
+        return records
+    if records:
+        conn = open_index()
+        with _db().transaction(conn):
+            for rec in records:
+                _write_entry(conn, rec['path'], rec['hash'], rec['summary'],
+                             rec['keywords'], rec['related'])
+            _set_state(conn, 'exported', False)
+        export_json(conn)
+        conn.close()
+        print(f'Auto-indexed {len(records)} file(s) in {elapsed:.1f}s')
+    else:
+        print('All files indexed and up to date.')
+    return records
 
 
 def _expand_keywords(keywords):
@@ -153,18 +1577,7 @@ def _expand_keywords(keywords):
     return terms
 
 
-def cmd_search(query, expanded_terms=None):
-    """Search by keyword overlap with query terms. Prints ranked results.
-
-    If expanded_terms is provided (comma-separated string or list), those
-    terms are included as additional query terms at reduced weight (0.6x).
-    This enables Haiku-powered query expansion without changing the core
-    scoring logic.
-    """
-    index = load_index()
-    query_terms = set(query.lower().split())
-
-    # Parse expanded terms if provided
+def _parse_expansion(expanded_terms, query_terms):
     expansion = set()
     if expanded_terms:
         if isinstance(expanded_terms, str):
@@ -172,23 +1585,53 @@ def cmd_search(query, expanded_terms=None):
         else:
             expansion = {t.lower() for t in expanded_terms}
         expansion -= query_terms  # Don't double-count original terms
+    return expansion
 
-    results = []
 
-    for fpath, entry in index['entries'].items():
-        entry_terms = _expand_keywords(entry.get('keywords', []))
-        summary_terms = set(entry.get('summary', '').lower().split())
-        # Original query terms: full weight for keywords, half for summary
-        kw_overlap = len(query_terms & entry_terms)
-        summary_overlap = len(query_terms & summary_terms) * 0.5
-        # Expanded terms: reduced weight (0.6 for keywords, 0.3 for summary)
-        exp_kw_overlap = len(expansion & entry_terms) * 0.6 if expansion else 0
-        exp_summary_overlap = len(expansion & summary_terms) * 0.3 if expansion else 0
-        score = kw_overlap + summary_overlap + exp_kw_overlap + exp_summary_overlap
-        if score > 0:
-            results.append((score, fpath, entry))
+# Posting weights: (query term?, field) — keywords count fully, summary
+# words half; expanded terms at 0.6x
+_WEIGHTS = {(True, 'k'): 1.0, (True, 's'): 0.5, (False, 'k'): 0.6, (False, 's'): 0.3}
 
-    results.sort(key=lambda x: -x[0])
+
+def _score_entries(query_terms, expansion):
+    """Rank entries by weighted keyword/summary overlap via the postings table.
+
+    Returns [(score, path, entry)] sorted by descending score.
+    """
+    conn = open_existing()
+    if conn is None:
+        return []
+    try:
+        terms = sorted(query_terms | expansion)
+        scores = {}
+        for i in range(0, len(terms), 500):
+            part = terms[i:i + 500]
+            rows = conn.execute(
+                f'SELECT term, field, path FROM postings '
+                f'WHERE term IN ({",".join("?" * len(part))})', part).fetchall()
+            for term, field, fpath in rows:
+                w = _WEIGHTS[(term in query_terms, field)]
+                scores[fpath] = scores.get(fpath, 0) + w
+        entries = read_entries(conn, scores)
+    finally:
+        conn.close()
+    results = [(score, fpath, entries[fpath]) for fpath, score in scores.items()
+               if fpath in entries]
+    results.sort(key=lambda x: (-x[0], x[1]))
+    return results
+
+
+def cmd_search(query, expanded_terms=None):
+    """Search by keyword overlap with query terms. Prints ranked results.
+
+    If expanded_terms is provided (comma-separated string or list), those
+    terms are included as additional query terms at reduced weight (0.6x).
+    This enables Haiku-powered query expansion without changing the core
+    scoring logic.
+    """
+    query_terms = set(query.lower().split())
+    expansion = _parse_expansion(expanded_terms, query_terms)
+    results = _score_entries(query_terms, expansion)
 
     if not results:
         print(f'No matches for: {query}')
@@ -217,31 +1660,9 @@ def cmd_search(query, expanded_terms=None):
 
 def cmd_search_json(query, top_n=10, expanded_terms=None):
     """Search and return structured JSON for subagent reranking."""
-    index = load_index()
     query_terms = set(query.lower().split())
-
-    expansion = set()
-    if expanded_terms:
-        if isinstance(expanded_terms, str):
-            expansion = {t.strip().lower() for t in expanded_terms.split(',') if t.strip()}
-        else:
-            expansion = {t.lower() for t in expanded_terms}
-        expansion -= query_terms
-
-    results = []
-
-    for fpath, entry in index['entries'].items():
-        entry_terms = _expand_keywords(entry.get('keywords', []))
-        summary_terms = set(entry.get('summary', '').lower().split())
-        kw_overlap = len(query_terms & entry_terms)
-        summary_overlap = len(query_terms & summary_terms) * 0.5
-        exp_kw_overlap = len(expansion & entry_terms) * 0.6 if expansion else 0
-        exp_summary_overlap = len(expansion & summary_terms) * 0.3 if expansion else 0
-        score = kw_overlap + summary_overlap + exp_kw_overlap + exp_summary_overlap
-        if score > 0:
-            results.append((score, fpath, entry))
-
-    results.sort(key=lambda x: -x[0])
+    expansion = _parse_expansion(expanded_terms, query_terms)
+    results = _score_entries(query_terms, expansion)
 
     candidates = []
     for score, fpath, entry in results[:top_n]:
@@ -306,19 +1727,202 @@ def cmd_misses():
         print()
 
 
+# ---------------------------------------------------------------------------
+# Retrieval benchmark (replays the miss log)
+# ---------------------------------------------------------------------------
+
+def _normalize_source(source):
+    """Compare vault paths and journal ids across result formats."""
+    if source.startswith('j:'):
+        return 'journal:' + source[2:]
+    if source.startswith('journal:'):
+        return source
+    return os.path.normpath(source)
+
+
+def _bench_queries(queries_file=None):
+    """Return [(query, {expected sources}, origin)] from the miss log and a curated set.
+
+    Curated files are JSONL: {"query": ..., "expected": path or [paths]}.
+    """
+    queries = []
+    try:
+        with open(MISS_LOG_FILE, 'r') as f:
+            for entry in json.load(f):
+                queries.append((entry['query'], {_normalize_source(entry['expected_path'])},
+                                'miss-log'))
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    if queries_file:
+        with open(queries_file, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                rec = json.loads(line)
+                expected = rec['expected']
+                if isinstance(expected, str):
+                    expected = [expected]
+                queries.append((rec['query'], {_normalize_source(e) for e in expected}, 'curated'))
+    return queries
+
+
+def _bench_modes(k):
+    """Search paths to compare: {name: fn(query) -> [source, ...] ranked}."""
+    assoc = _db().load_sibling('association-search.py')
+
+    def associations(**kwargs):
+        def run(query):
+            out = assoc.search_associations(query, top_k=k, vault_limit=k, journal_limit=k, **kwargs)
+            return [r['source'] for r in out['results']]
+        return run
+
+    def fulltext(query):
+        conn = open_index(readonly=True)
+        if conn is None:
+            return []
+        try:
+            return [r['path'] for r in search_fts(conn, fts_query([query], match_all=False), k)]
+        finally:
+            conn.close()
+
+    modes = {
+        'index-search': lambda q: [p for _, p, _ in _score_entries(set(q.lower().split()), set())[:k]],
+        'assoc-keyword': associations(vector_limit=0),
+        'assoc-hook': associations(vector_limit=k, vector_cached_only=True),
+        'fulltext': fulltext,
+    }
+    if os.path.exists(VECTORS_DB):
+        vs = _db().load_sibling('vector-search.py')
+        modes['assoc-full'] = associations(vector_limit=k)
+        modes['vector'] = lambda q: [r['source'] for r in vs.vector_search(q, top_k=k)]
+    return modes
+
+
+def _percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def run_bench(k=10, queries_file=None):
+    """Replay the benchmark queries through every search mode.
+
+    Returns {mode: {recall, mrr, p50_ms, p95_ms, max_ms, cold_ms}} plus
+    query counts; the first call of each mode (model and index loads) is
+    reported as cold_ms and left out of the percentiles.
+    """
+    queries = _bench_queries(queries_file)
+    results = {}
+    for name, search in _bench_modes(k).items():
+        t0 = time.perf_counter()
+        try:
+            search(queries[0][0] if queries else 'warm up')
+        except Exception as e:
+            sys.stderr.write(f'[index-vault] bench mode {name} failed: {e}\n')
+            continue
+        cold_ms = (time.perf_counter() - t0) * 1000
+        recall = rr = 0.0
+        latencies = []
+        for query, expected, _ in queries:
+            t0 = time.perf_counter()
+            ranked = [_normalize_source(src) for src in search(query)]
+            latencies.append((time.perf_counter() - t0) * 1000)
+            hits = [i for i, src in enumerate(ranked) if src in expected]
+            recall += len(expected & set(ranked)) / len(expected)
+            rr += 1 / (hits[0] + 1) if hits else 0
+        n = max(len(queries), 1)
+        results[name] = {
+            'recall': round(recall / n, 4),
+            'mrr': round(rr / n, 4),
+            'p50_ms': round(_percentile(latencies, 50), 2) if latencies else None,
+            'p95_ms': round(_percentile(latencies, 95), 2) if latencies else None,
+            'max_ms': round(max(latencies), 2) if latencies else None,
+            'cold_ms': round(cold_ms, 2),
+        }
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'k': k,
+        'queries': len(queries),
+        'miss_log_queries': sum(1 for q in queries if q[2] == 'miss-log'),
+        'modes': results,
+    }
+
+
+def _read_bench_history():
+    try:
+        with open(BENCH_HISTORY_FILE, 'r') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def cmd_bench(k=10, queries_file=None, as_json=False, save=True):
+    """Run the retrieval benchmark, print it, and append it to the history."""
+    history = _read_bench_history()
+    run = run_bench(k, queries_file)
+    if not run['queries']:
+        print('No benchmark queries — log misses with `index-vault.py miss` '
+              'or pass --queries <file.jsonl>.')
+        return run
+    if save:
+        os.makedirs(os.path.dirname(BENCH_HISTORY_FILE), exist_ok=True)
+        with open(BENCH_HISTORY_FILE, 'a') as f:
+            f.write(json.dumps(run) + '\n')
+    if as_json:
+        print(json.dumps(run, indent=2))
+        return run
+
+    # Compare against the last run with the same k
+    previous = next((h for h in reversed(history) if h.get('k') == k), None)
+    print(f'Retrieval benchmark: {run["queries"]} queries '
+          f'({run["miss_log_queries"]} from miss log), k={k}\n')
+    print(f'  {"mode":14} {"recall@" + str(k):>10} {"MRR":>7} {"p50 ms":>8} '
+          f'{"p95 ms":>8} {"max ms":>8} {"cold ms":>8}')
+    for name, m in run['modes'].items():
+        line = (f'  {name:14} {m["recall"]:>10.3f} {m["mrr"]:>7.3f} {m["p50_ms"]:>8.1f} '
+                f'{m["p95_ms"]:>8.1f} {m["max_ms"]:>8.1f} {m["cold_ms"]:>8.1f}')
+        prev = previous['modes'].get(name) if previous else None
+        if prev:
+            line += (f'   (recall {m["recall"] - prev["recall"]:+.3f}, '
+                     f'MRR {m["mrr"] - prev["mrr"]:+.3f}, '
+                     f'p50 {m["p50_ms"] - prev["p50_ms"]:+.1f}ms)')
+        print(line)
+    if previous:
+        print(f'\n  Changes vs previous run ({previous["timestamp"][:19]}, '
+              f'{previous["queries"]} queries)')
+    return run
+
+
+def cmd_bench_history():
+    """Print recall/MRR/p50 per mode for every stored benchmark run."""
+    history = _read_bench_history()
+    if not history:
+        print('No benchmark runs yet.')
+        return
+    for run in history:
+        modes = '  '.join(f'{name} {m["recall"]:.2f}/{m["mrr"]:.2f}/{m["p50_ms"]:.0f}ms'
+                          for name, m in run['modes'].items())
+        print(f'  [{run["timestamp"][:16]}] k={run["k"]} n={run["queries"]}  {modes}')
+    print('\n  (recall@k / MRR / p50 latency per mode)')
+
+
 def cmd_stats():
     """Print index statistics."""
-    index = load_index()
-    entries = index.get('entries', {})
+    conn = open_existing()
     total_files = len(vault_files())
-    indexed = len(entries)
+    paths = list(indexed_hashes(conn))
+    indexed = len(paths)
 
     all_keywords = set()
-    for entry in entries.values():
-        all_keywords.update(k.lower() for k in entry.get('keywords', []))
+    if conn is not None:
+        for (keywords,) in conn.execute('SELECT keywords FROM entries'):
+            all_keywords.update(k.lower() for k in json.loads(keywords))
+        exported = _get_state(conn, 'exported', False)
+        conn.close()
 
     # Check for stale entries (files that were deleted)
-    stale = [p for p in entries if not os.path.isfile(p)]
+    stale = [p for p in paths if not os.path.isfile(p)]
 
     print(f'Vault files:      {total_files}')
     print(f'Indexed:          {indexed}')
@@ -328,6 +1932,8 @@ def cmd_stats():
     if all_keywords:
         sample = sorted(all_keywords)[:20]
         print(f'Sample keywords:  {", ".join(sample)}')
+    if indexed and not exported:
+        print('JSON export:      out of date (run: index-vault.py export)')
 
     # Miss log stats
     try:
@@ -338,6 +1944,18 @@ def cmd_stats():
         pass
 
 
+def cmd_export():
+    """Write semantic-index.json from the database."""
+    conn = open_existing()
+    if conn is None:
+        print('Nothing indexed yet.')
+        return
+    n = conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+    export_json(conn, force=True)
+    conn.close()
+    print(f'Exported {n} entries to {INDEX_FILE}')
+
+
 # ---------------------------------------------------------------------------
 # CLI entry point
 # ---------------------------------------------------------------------------
@@ -346,16 +1964,38 @@ USAGE = """\
 Usage: index-vault.py <command> [args]
 
 Commands:
-  scan                              Find files needing indexing
+  scan [--json]                     Find files needing indexing
   file <path>                       Print file content + hash
   search <query>                    Search by keyword overlap
   search <query> --expand <terms>   Search with expanded terms (reduced weight)
   search-json <query>               Search with JSON output for reranking
   search-json <query> --expand <t>  JSON search with expanded terms
   update <path> <summary> <kw-csv>  Update index entry
+  update-batch [file.jsonl]         Update entries from JSONL (stdin by default):
+                                    {"path", "summary", "keywords", "related"}
+  plan [--workers N] [--new] | --status
+                                    Pack files needing indexing into N batches
+                                    of similar estimated tokens (JSONL, one
+                                    batch per line); resumes a saved plan
+  auto-index [--all] [--workers N] [--keywords N] [--jsonl]
+                                    Index changed files with local TF-IDF/RAKE
+                                    keywords and a heuristic summary (no model)
   miss <query> <expected> [reason]  Log a search miss
   misses                            Show miss log
+  bench [--k N] [--queries F] [--json] [--no-save]
+                                    Replay logged misses (plus a curated JSONL
+                                    set) through every search mode; report
+                                    recall@k, MRR and latency, keep history
+  bench --history                   Show stored benchmark runs
+  toc [--max-per-dir N] [--dir D] [--json]
+                                    Title and tag line of every file, grouped
+                                    by directory (also in memory/meta/toc.md)
+  fts <query> [--limit N] [--any] [--raw] [--files] [--json]
+                                    Full-text search of vault sections (FTS5)
+                                    with snippets; all terms must match unless
+                                    --any; --raw passes FTS5 query syntax
   stats                             Show index statistics
+  export                            Write semantic-index.json from the database
 """
 
 if __name__ == '__main__':
@@ -366,7 +2006,7 @@ if __name__ == '__main__':
     cmd = sys.argv[1]
 
     if cmd == 'scan':
-        cmd_scan()
+        cmd_scan(as_json='--json' in sys.argv[2:])
     elif cmd == 'file':
         if len(sys.argv) < 3:
             print('Usage: index-vault.py file <path>')
@@ -401,6 +2041,33 @@ if __name__ == '__main__':
         keywords = [k.strip() for k in sys.argv[4].split(',')]
         related = [r.strip() for r in sys.argv[5].split(',')] if len(sys.argv) > 5 else []
         cmd_update(fpath, summary, keywords, related)
+    elif cmd == 'update-batch':
+        failed = cmd_update_batch(sys.argv[2] if len(sys.argv) > 2 else '-')
+        sys.exit(1 if failed else 0)
+    elif cmd == 'plan':
+        args = sys.argv[2:]
+        workers = PLAN_WORKERS
+        if '--workers' in args:
+            idx = args.index('--workers')
+            if idx + 1 >= len(args):
+                print('Usage: index-vault.py plan [--workers N] [--new] | --status')
+                sys.exit(1)
+            workers = int(args[idx + 1])
+        cmd_plan(workers, new='--new' in args, status='--status' in args)
+    elif cmd == 'auto-index':
+        args = sys.argv[2:]
+        workers, limit = None, AUTO_KEYWORDS
+        for opt in ('--workers', '--keywords'):
+            if opt in args:
+                idx = args.index(opt)
+                if idx + 1 >= len(args):
+                    print('Usage: index-vault.py auto-index [--all] [--workers N] [--keywords N] [--jsonl]')
+                    sys.exit(1)
+                if opt == '--workers':
+                    workers = int(args[idx + 1])
+                else:
+                    limit = int(args[idx + 1])
+        cmd_auto_index('--all' in args, workers, limit, as_jsonl='--jsonl' in args)
     elif cmd == 'miss':
         if len(sys.argv) < 4:
             print('Usage: index-vault.py miss <query> <expected-path> [reason]')
@@ -408,8 +2075,58 @@ if __name__ == '__main__':
         cmd_miss(sys.argv[2], sys.argv[3], sys.argv[4] if len(sys.argv) > 4 else '')
     elif cmd == 'misses':
         cmd_misses()
+    elif cmd == 'bench':
+        args = sys.argv[2:]
+        if '--history' in args:
+            cmd_bench_history()
+            sys.exit(0)
+        k, queries_file = 10, None
+        for opt in ('--k', '--queries'):
+            if opt in args:
+                idx = args.index(opt)
+                if idx + 1 >= len(args):
+                    print('Usage: index-vault.py bench [--k N] [--queries <file.jsonl>] [--json]')
+                    sys.exit(1)
+                if opt == '--k':
+                    k = int(args[idx + 1])
+                else:
+                    queries_file = args[idx + 1]
+        cmd_bench(k, queries_file, as_json='--json' in args, save='--no-save' not in args)
+    elif cmd == 'toc':
+        args = sys.argv[2:]
+        max_per_dir = directory = None
+        for opt in ('--max-per-dir', '--dir'):
+            if opt in args:
+                idx = args.index(opt)
+                if idx + 1 >= len(args):
+                    print('Usage: index-vault.py toc [--max-per-dir N] [--dir <dir>] [--json]')
+                    sys.exit(1)
+                if opt == '--max-per-dir':
+                    max_per_dir = int(args[idx + 1])
+                else:
+                    directory = args[idx + 1]
+        cmd_toc(max_per_dir, directory, as_json='--json' in args)
+    elif cmd == 'fts':
+        args = sys.argv[2:]
+        limit = 20
+        if '--limit' in args:
+            idx = args.index('--limit')
+            if idx + 1 >= len(args):
+                print('Usage: index-vault.py fts <query> [--limit N] [--any] [--raw] [--files] [--json]')
+                sys.exit(1)
+            limit = int(args[idx + 1])
+            args = args[:idx] + args[idx + 2:]
+        flags = {'--any', '--raw', '--files', '--json'}
+        query = ' '.join(a for a in args if a not in flags)
+        if not query:
+            print('Usage: index-vault.py fts <query> [--limit N] [--any] [--raw] [--files] [--json]')
+            sys.exit(1)
+        cmd_fts(query, limit, match_all='--any' not in args, raw='--raw' in args,
+                files_only='--files' in args, as_json='--json' in args)
     elif cmd == 'stats':
         cmd_stats()
+    elif cmd == 'export':
+        cmd_export()
     else:
         print(f'Unknown command: {cmd}')
         print(USAGE)
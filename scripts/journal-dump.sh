@@ -10,9 +10,21 @@ MARKER="memory/.journal-last-dump"
 # Skip if no journal database exists
 [ -f "$DB" ] || exit 0
 
+# Latest mtime of the db and its WAL file (WAL mode commits land in -wal
+# until a checkpoint, leaving journal.db's own mtime unchanged)
+db_mtime() {
+    local latest=0 f m
+    for f in "$DB" "$DB-wal"; do
+        [ -f "$f" ] || continue
+        m=$(stat -f %m "$f" 2>/dev/null || stat -c %Y "$f" 2>/dev/null)
+        [ "$m" -gt "$latest" ] && latest=$m
+    done
+    echo "$latest"
+}
+
 # Check if db has changed since last dump (compare mtime)
 if [ -f "$MARKER" ]; then
-    db_mtime=$(stat -f %m "$DB" 2>/dev/null || stat -c %Y "$DB" 2>/dev/null)
+    db_mtime=$(db_mtime)
     last_dump=$(cat "$MARKER" 2>/dev/null)
     if [ "$db_mtime" = "$last_dump" ]; then
         exit 0  # No changes since last dump
@@ -24,7 +36,7 @@ sqlite3 "$DB" .dump > "$DUMP"
 git add "$DUMP"
 
 # Record current mtime
-db_mtime=$(stat -f %m "$DB" 2>/dev/null || stat -c %Y "$DB" 2>/dev/null)
+db_mtime=$(db_mtime)
 echo "$db_mtime" > "$MARKER"
 
 echo "journal: dumped $DB → $DUMP"
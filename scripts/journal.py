@@ -72,17 +72,56 @@ CREATE TRIGGER IF NOT EXISTS journal_au AFTER UPDATE ON journal BEGIN
     INSERT INTO journal_fts(rowid, summary, context, tags)
     VALUES (new.id, new.summary, new.context, new.tags);
 END;
+
+-- Log of edits and deletes to existing entries. New entries need no log:
+-- vectorize.py picks them up from its id watermark.
+CREATE TABLE IF NOT EXISTS journal_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id INTEGER NOT NULL,
+    changed_at TEXT NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS journal_changes_au AFTER UPDATE OF summary, context ON journal BEGIN
+    INSERT INTO journal_changes(id, changed_at)
+    VALUES (new.id, strftime('%Y-%m-%dT%H:%M:%SZ', 'now'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS journal_changes_ad AFTER DELETE ON journal BEGIN
+    INSERT INTO journal_changes(id, changed_at)
+    VALUES (old.id, strftime('%Y-%m-%dT%H:%M:%SZ', 'now'));
+END;
 """
 
 
+def _db():
+    """Load scripts/vault-db.py as vault_db (see its docstring)."""
+    if 'vault_db' not in sys.modules:
+        from importlib import util
+        spec = util.spec_from_file_location(
+            'vault_db', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vault-db.py'))
+        spec.loader.exec_module(sys.modules.setdefault('vault_db', util.module_from_spec(spec)))
+    return sys.modules['vault_db']
+
+
 def get_db():
-    """Open or create the journal database."""
+    """Open or create the journal database (WAL, so writes never block readers)."""
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+    conn = _db().connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
 
+def _checkpoint():
+    """Fold the WAL into journal.db so a plain file copy is complete."""
+    conn = sqlite3.connect(DB_PATH, timeout=10)
+    try:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    except sqlite3.OperationalError:
+        pass
+    finally:
+        conn.close()
+
+
 def format_entry(row):
     """Format a journal entry for display."""
     lines = [f'j:{row["id"]}  [{row["timestamp"][:10]}]  {row["category"] or "—"}']
@@ -417,12 +456,12 @@ def cmd_rebuild(sql_file=None, force=False):
 
     # Back up existing DB before deletion
     if os.path.exists(DB_PATH):
+        _checkpoint()
         backup_path = DB_PATH + '.bak'
         shutil.copy2(DB_PATH, backup_path)
 
-    # Remove existing db to rebuild clean
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
+    # Remove existing db (and any WAL files) to rebuild clean
+    _db().remove_db(DB_PATH)
 
     conn = sqlite3.connect(DB_PATH)
     conn.executescript(sql)
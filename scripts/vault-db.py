@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Shared SQLite connection settings for vectors.db and journal.db.
+
+Also the one place that names the default embedding model; the model a
+vectors.db was actually built with is recorded in its vector_state table
+(see active_model()), so search and vectorize never disagree after a
+`vectorize.py migrate`.
+
+Several agent processes share one vault: the association hook and /enrich
+read while vectorize.py, dedup.py and journal.py write. Under SQLite's
+default rollback journal a writer locks readers out, which can push the
+hook past its 5s timeout. Connections opened here use WAL, where readers
+never wait on a writer.
+
+  connect(path)                  writer: switches the file to WAL once
+  connect(path, readonly=True)   reader: query_only, leaves the mode alone
+  with transaction(conn): ...    BEGIN IMMEDIATE ... COMMIT for bulk writes
+
+A hyphenated name cannot be imported, so each sibling script carries a
+small _db() that loads this file from its path and registers it in
+sys.modules as vault_db; the first caller in a process runs it and the
+rest share that module. Scripts load each other through load_sibling().
+
+Usage:
+  python3 scripts/vault-db.py <db>     # Show journal mode and pragmas
+"""
+
+import contextlib
+import json
+import os
+import sqlite3
+import sys
+
+# Model for vectors.db files that do not record one (built before migrations)
+DEFAULT_MODEL = 'all-MiniLM-L6-v2'
+DEFAULT_DIM = 384
+
+# NORMAL is durable across application crashes in WAL mode; only an OS
+# crash or power loss can drop the last transactions
+SYNCHRONOUS = 'NORMAL'
+# Vectors are read as BLOBs; mapping the file avoids a copy per page read
+MMAP_SIZE = 256 * 1024 * 1024
+# Negative cache_size is in KiB
+CACHE_SIZE_KB = 16 * 1024
+
+
+def connect(path, readonly=False, timeout=10):
+    """Open path with the shared pragmas applied.
+
+    Writers switch the database to WAL (persistent, so it happens once per
+    file). Readers never change the journal mode — that would need a lock
+    they might wait for — and are opened query_only.
+    """
+    conn = sqlite3.connect(path, timeout=timeout)
+    conn.execute(f'PRAGMA busy_timeout = {int(timeout * 1000)}')
+    if not readonly:
+        try:
+            conn.execute('PRAGMA journal_mode = WAL')
+        except sqlite3.OperationalError as e:
+            # Another process holds a lock; the next writer will retry
+            sys.stderr.write(f'[vault-db] could not enable WAL on {path}: {e}\n')
+    conn.execute(f'PRAGMA synchronous = {SYNCHRONOUS}')
+    conn.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+    conn.execute(f'PRAGMA cache_size = -{CACHE_SIZE_KB}')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    if readonly:
+        conn.execute('PRAGMA query_only = ON')
+    return conn
+
+
+@contextlib.contextmanager
+def transaction(conn):
+    """Run a block of writes as one IMMEDIATE transaction.
+
+    Taking the write lock up front means two writers queue on busy_timeout
+    instead of deadlocking when both try to upgrade a read lock. Any
+    implicit transaction already open is committed first.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def active_model(conn):
+    """Return (model name, dim) that the vectors in a vectors.db were made with."""
+    try:
+        row = conn.execute("SELECT value FROM vector_state WHERE key = 'model'").fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    if row:
+        model = json.loads(row[0])
+        return model['name'], model['dim']
+    return DEFAULT_MODEL, DEFAULT_DIM
+
+
+def remove_db(path):
+    """Delete a database file together with its -wal and -shm files."""
+    for suffix in ('', '-wal', '-shm'):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def db_mtime(path):
+    """Latest modification time of a database, including its WAL file.
+
+    Committed writes land in the -wal file until a checkpoint, so the main
+    file's mtime alone can miss them.
+    """
+    mtime = 0.0
+    for suffix in ('', '-wal'):
+        try:
+            mtime = max(mtime, os.path.getmtime(path + suffix))
+        except OSError:
+            pass
+    return mtime
+
+
+def load_sibling(filename):
+    """Load a sibling script such as 'index-vault.py', once per process.
+
+    Hyphenated names cannot be imported, so the file is loaded from a spec
+    and registered in sys.modules (index-vault.py as index_vault); every
+    script that asks for it then shares one module and its caches.
+    """
+    name = filename[:-3].replace('-', '_')
+    mod = sys.modules.get(name)
+    if mod is None:
+        import importlib.util
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+        spec = importlib.util.spec_from_file_location(name, path)
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[name] = mod  # before running it, so import cycles resolve
+        try:
+            spec.loader.exec_module(mod)
+        except BaseException:
+            del sys.modules[name]
+            raise
+    return mod
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2 or not os.path.exists(sys.argv[1]):
+        print('Usage: vault-db.py <db>')
+        sys.exit(1)
+    conn = connect(sys.argv[1], readonly=True)
+    for pragma in ('journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'busy_timeout'):
+        print(f'  {pragma + ":":15} {conn.execute(f"PRAGMA {pragma}").fetchone()[0]}')
+    conn.close()
@@ -1,33 +1,63 @@
 #!/usr/bin/env python3
 """Semantic vector search over an agent's memory vault.
 
-Loads a query, embeds it with all-MiniLM-L6-v2, and finds the most similar
-vault files and journal entries by cosine similarity.
+Loads a query, embeds it with the store's active model (all-MiniLM-L6-v2
+unless it was migrated), and finds the most similar vault files and journal
+entries by cosine similarity.
 
 Dependencies: sentence-transformers, numpy (lazy-loaded).
 Install:  pip install sentence-transformers
 
+Query embeddings are cached in vectors.db, and small stores are scored in
+pure Python, so a repeated query or a --like lookup never imports numpy or
+loads the model.
+
 CLI:
   python3 scripts/vector-search.py "what is the bleaching?"
   python3 scripts/vector-search.py --top 10 "lossy compression"
   python3 scripts/vector-search.py --json "identity persistence"
   python3 scripts/vector-search.py --vault-only "vault architecture"
   python3 scripts/vector-search.py --journal-only "decision log"
+  python3 scripts/vector-search.py --probe 2 "boot sequence"   # Route via topic tree
+  python3 scripts/vector-search.py --like memory/identity.md  # More like this file
+  python3 scripts/vector-search.py --like j:42                # More like this entry
+  python3 scripts/vector-search.py --bench      # stdlib vs numpy scoring crossover
 
 Library:
   from importlib.machinery import SourceFileLoader
   vs = SourceFileLoader('vector_search', 'scripts/vector-search.py').load_module()
   results = vs.vector_search("query", top_k=5)
+  results = vs.similar_to("memory/identity.md", top_k=5)   # no model load
 """
 
+import array
+import hashlib
 import json
+import operator
 import os
 import sqlite3
 import sys
+import time
 
 # All paths relative to CWD (the agent's project root)
 VAULT_DIR = 'memory'
-MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Vaults at least this large route queries through the topic tree
+# (vectorize.py topics) instead of scoring every vault vector.
+ROUTE_MIN_VECTORS = 5000
+ROUTE_PROBE = 3
+
+# At or below this many candidate vectors, score in pure Python instead of
+# importing numpy — the import costs more than the arithmetic. Measured with
+# `vector-search.py --bench` (crossover ~4000-8000 at 384 dims).
+STDLIB_MAX_VECTORS = 4000
+
+# Query embeddings kept in vectors.db so repeated queries skip the model
+# (least recently used evicted first).
+QUERY_CACHE_SIZE = 1000
+# Cache hits are appended here (readers never write vectors.db) and applied
+# to last_used by the next query cache write; ignored past this size
+QUERY_HITS_MAX_BYTES = 256 * 1024
 
 
 def _vectors_db():
@@ -38,6 +68,10 @@ def _journal_db():
     return os.path.join(VAULT_DIR, 'journal.db')
 
 
+def _query_hits_file():
+    return os.path.join(VAULT_DIR, 'meta', 'query-hits.log')
+
+
 # ---------------------------------------------------------------------------
 # Blob conversion helpers
 # ---------------------------------------------------------------------------
@@ -61,17 +95,175 @@ def blob_to_vector(blob):
     return np.frombuffer(blob, dtype=np.float32)
 
 
+def blob_to_floats(blob):
+    """Convert SQLite BLOB to a stdlib float32 array (no numpy import)."""
+    vec = array.array('f')
+    vec.frombytes(blob)
+    return vec
+
+
+def _dot(a, b):
+    """Pure-Python dot product of two equal-length float sequences."""
+    return sum(map(operator.mul, a, b))
+
+
+# ---------------------------------------------------------------------------
+# SQLite connections (shared pragmas in vault-db.py, loaded lazily)
+# ---------------------------------------------------------------------------
+
+def _db():
+    """Load scripts/vault-db.py as vault_db (see its docstring)."""
+    if 'vault_db' not in sys.modules:
+        from importlib import util
+        spec = util.spec_from_file_location(
+            'vault_db', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vault-db.py'))
+        spec.loader.exec_module(sys.modules.setdefault('vault_db', util.module_from_spec(spec)))
+    return sys.modules['vault_db']
+
+
+def _connect(path, readonly=False, timeout=10):
+    """Open vectors.db or journal.db in WAL mode with the shared pragmas."""
+    return _db().connect(path, readonly=readonly, timeout=timeout)
+
+
+def _active_model():
+    """(model name, dim) that vectors.db was built with (see vectorize.py migrate)."""
+    vdb = _vectors_db()
+    if os.path.exists(vdb):
+        try:
+            conn = _connect(vdb, readonly=True, timeout=5)
+            try:
+                return _db().active_model(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+    return _db().DEFAULT_MODEL, _db().DEFAULT_DIM
+
+
+# ---------------------------------------------------------------------------
+# Query embedding cache
+# ---------------------------------------------------------------------------
+
+def _query_key(query, model_name):
+    normalized = ' '.join(query.split())
+    return hashlib.sha256(f'{model_name}\0{normalized}'.encode('utf-8')).hexdigest()[:16]
+
+
+def cached_query_vector(query):
+    """Return the cached embedding for query as a float32 array, or None.
+
+    Keys include the active model, so a model switch never serves a query
+    vector from the old embedding space. A hit is logged so the next cache
+    write bumps its last_used, and eviction drops the least recently used.
+    """
+    vdb = _vectors_db()
+    if not os.path.exists(vdb):
+        return None
+    try:
+        conn = _connect(vdb, readonly=True, timeout=5)
+    except sqlite3.OperationalError:
+        return None
+    try:
+        key = _query_key(query, _db().active_model(conn)[0])
+        row = conn.execute(
+            'SELECT embedding, last_used FROM query_vectors WHERE query_hash = ?', (key,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    if row[1] != now:
+        _log_query_hit(key, now)
+    return blob_to_floats(row[0])
+
+
+def _log_query_hit(key, now):
+    """Append a cache hit for the next writer to apply (best effort)."""
+    path = _query_hits_file()
+    try:
+        if os.path.getsize(path) > QUERY_HITS_MAX_BYTES:
+            return
+    except OSError:
+        pass
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as f:
+            f.write(f'{key}\t{now}\n')
+    except OSError:
+        pass
+
+
+def _apply_query_hits(conn):
+    """Bump last_used for logged cache hits (no commit)."""
+    path = _query_hits_file()
+    taken = path + '.applying'
+    try:
+        os.replace(path, taken)  # later hits start a new log
+        with open(taken, 'r') as f:
+            hits = [line.rstrip('\n').split('\t') for line in f]
+        os.remove(taken)
+    except OSError:
+        return
+    conn.executemany(
+        'UPDATE query_vectors SET last_used = MAX(last_used, ?) WHERE query_hash = ?',
+        [(h[1], h[0]) for h in hits if len(h) == 2])
+
+
+def _cache_query_vector(query, vec, model_name):
+    """Store a query embedding, keeping the QUERY_CACHE_SIZE most recent."""
+    now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    conn = None
+    try:
+        conn = _connect(_vectors_db(), timeout=5)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS query_vectors (
+                query_hash TEXT PRIMARY KEY,
+                embedding BLOB NOT NULL,
+                last_used TEXT NOT NULL
+            )
+        """)
+        conn.execute(
+            'INSERT OR REPLACE INTO query_vectors (query_hash, embedding, last_used) '
+            'VALUES (?, ?, ?)',
+            (_query_key(query, model_name), array.array('f', vec).tobytes(), now)
+        )
+        _apply_query_hits(conn)
+        conn.execute(
+            'DELETE FROM query_vectors WHERE query_hash NOT IN ('
+            'SELECT query_hash FROM query_vectors ORDER BY last_used DESC LIMIT ?)',
+            (QUERY_CACHE_SIZE,)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        sys.stderr.write(f'[vector-search] query cache write failed: {e}\n')
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Segment store (sibling script, loaded lazily)
+# ---------------------------------------------------------------------------
+
+def _segments():
+    """Load scripts/vector-segments.py (shared per process, see vault-db.py)."""
+    return _db().load_sibling('vector-segments.py')
+
+
 # ---------------------------------------------------------------------------
 # Model loading (lazy, cached)
 # ---------------------------------------------------------------------------
 
-_model_cache = None
+_model_cache = {}
 
 
-def _get_model():
-    """Load sentence-transformers model, caching for reuse."""
-    global _model_cache
-    if _model_cache is None:
+def _get_model(model_name):
+    """Load a sentence-transformers model, caching for reuse."""
+    if model_name not in _model_cache:
         try:
             from sentence_transformers import SentenceTransformer
         except ImportError:
@@ -80,8 +272,8 @@ def _get_model():
                 'Run: pip install sentence-transformers\n'
             )
             sys.exit(1)
-        _model_cache = SentenceTransformer(MODEL_NAME)
-    return _model_cache
+        _model_cache[model_name] = SentenceTransformer(model_name)
+    return _model_cache[model_name]
 
 
 # ---------------------------------------------------------------------------
@@ -94,7 +286,7 @@ def _get_journal_summaries(jids):
     if not jids or not os.path.exists(jdb):
         return {}
     try:
-        conn = sqlite3.connect(jdb, timeout=5)
+        conn = _connect(jdb, readonly=True, timeout=5)
         placeholders = ','.join('?' * len(jids))
         rows = conn.execute(
             f'SELECT id, summary FROM journal WHERE id IN ({placeholders})', jids
@@ -106,43 +298,94 @@ def _get_journal_summaries(jids):
 
 
 # ---------------------------------------------------------------------------
-# Vector search
+# Topic tree routing
 # ---------------------------------------------------------------------------
 
-def vector_search(query, top_k=5, vault_only=False, journal_only=False):
-    """Search the vector store for entries most similar to query.
-
-    Args:
-        query: Search text to embed and compare.
-        top_k: Number of results to return.
-        vault_only: Only search vault file vectors.
-        journal_only: Only search journal entry vectors.
+def _route_leaves(conn, query_vec, probe):
+    """Beam-search the topic tree, keeping the `probe` best nodes per level.
 
-    Returns list of dicts:
-        [{"source": "memory/...", "type": "vault"|"journal",
-          "score": 0.85, "summary": "..."}]
+    Returns the list of leaf node ids reached, or None if there is no tree.
     """
     np = _np()
-    vdb = _vectors_db()
-    if not os.path.exists(vdb):
-        return []
+    try:
+        nodes = conn.execute('SELECT id, parent_id, centroid FROM topic_nodes').fetchall()
+    except sqlite3.OperationalError:
+        return None
+    if not nodes:
+        return None
+
+    children = {}
+    centroids = {}
+    for nid, pid, blob in nodes:
+        children.setdefault(pid, []).append(nid)
+        centroids[nid] = blob_to_vector(blob)
+
+    frontier = children.get(None, [])
+    leaves = []
+    while frontier:
+        expanded = []
+        for nid in frontier:
+            if children.get(nid):
+                expanded.extend(children[nid])
+            else:
+                leaves.append(nid)
+        expanded.sort(key=lambda n: -float(np.dot(query_vec, centroids[n])))
+        frontier = expanded[:probe]
+    return leaves
+
+
+def _vault_rows(conn, query_vec, probe):
+    """Fetch (path, embedding) rows to score, routed through topics if enabled.
+
+    probe=None routes automatically for vaults of ROUTE_MIN_VECTORS or more;
+    probe=0 always scores every vector. Vectors not yet placed in the tree
+    are always included.
+    """
+    if probe is None:
+        count = conn.execute('SELECT COUNT(*) FROM vault_vectors').fetchone()[0]
+        probe = ROUTE_PROBE if count >= ROUTE_MIN_VECTORS else 0
+    leaves = _route_leaves(conn, query_vec, probe) if probe else None
+    if not leaves:
+        return conn.execute('SELECT path, embedding FROM vault_vectors').fetchall()
+    placeholders = ','.join('?' * len(leaves))
+    return conn.execute(
+        'SELECT v.path, v.embedding FROM vault_vectors v '
+        'JOIN topic_members m ON m.path = v.path '
+        f'WHERE m.node_id IN ({placeholders}) '
+        'UNION ALL '
+        'SELECT path, embedding FROM vault_vectors '
+        'WHERE path NOT IN (SELECT path FROM topic_members)',
+        leaves
+    ).fetchall()
 
-    model = _get_model()
-    query_vec = model.encode(query, normalize_embeddings=True)
 
-    conn = sqlite3.connect(vdb, timeout=5)
+# ---------------------------------------------------------------------------
+# Vector search
+# ---------------------------------------------------------------------------
+
+def _candidate_count(conn, vault_only, journal_only):
+    count = 0
+    if not journal_only:
+        count += conn.execute('SELECT COUNT(*) FROM vault_vectors').fetchone()[0]
+    if not vault_only:
+        count += conn.execute('SELECT COUNT(*) FROM journal_vectors').fetchone()[0]
+    return count
+
+
+def _row_results(conn, query_vec, to_vec, dot, vault_only, journal_only, probe, exclude):
+    """Score vectors row by row from vectors.db."""
     results = []
 
     # Vault vectors
     if not journal_only:
-        vault_rows = conn.execute('SELECT path, embedding FROM vault_vectors').fetchall()
+        vault_rows = _vault_rows(conn, query_vec, probe)
         for path, blob in vault_rows:
-            vec = blob_to_vector(blob)
-            score = float(np.dot(query_vec, vec))
+            if path == exclude:
+                continue
             results.append({
                 'source': path,
                 'type': 'vault',
-                'score': score,
+                'score': dot(query_vec, to_vec(blob)),
                 'summary': '',
             })
 
@@ -151,29 +394,296 @@ def vector_search(query, top_k=5, vault_only=False, journal_only=False):
         journal_rows = conn.execute(
             'SELECT journal_id, embedding FROM journal_vectors'
         ).fetchall()
-        journal_scores = []
         for jid, blob in journal_rows:
-            vec = blob_to_vector(blob)
-            score = float(np.dot(query_vec, vec))
-            journal_scores.append((jid, score))
-
-        # Look up journal summaries
-        if journal_scores:
-            jids = [j[0] for j in journal_scores]
-            summaries = _get_journal_summaries(jids)
-            for jid, score in journal_scores:
-                results.append({
-                    'source': f'j:{jid}',
-                    'type': 'journal',
-                    'score': score,
-                    'summary': summaries.get(jid, ''),
-                })
+            if f'j:{jid}' == exclude:
+                continue
+            results.append({
+                'source': f'j:{jid}',
+                'type': 'journal',
+                'score': dot(query_vec, to_vec(blob)),
+                'summary': '',
+                '_jid': jid,
+            })
+    return results
 
-    conn.close()
 
-    # Sort by score descending
+def _segment_results(conn, query_vec, vault_only, journal_only, exclude):
+    """Score the packed segment store with matrix products.
+
+    Returns None (so the caller falls back to vectors.db) if there is no
+    segment store or it is out of sync with vectors.db.
+    """
+    np = _np()
+    try:
+        segs = _segments()
+        manifest = segs.read_manifest()
+        if manifest is None:
+            return None
+        if manifest.get('model', _db().DEFAULT_MODEL) != _db().active_model(conn)[0]:
+            # Built before a model switch; vectorize rebuilds it right after
+            return None
+        parts = segs.live_parts(np, manifest)
+        if parts is None:
+            return None
+        expected = _candidate_count(conn, False, False)
+        if (manifest.get('db_seq') != segs.db_seq(conn)
+                or segs.live_count(parts) != expected):
+            sys.stderr.write('[vector-search] segment store out of sync with vectors.db '
+                             '— run: vector-segments.py rebuild\n')
+            return None
+        scored = segs.score(query_vec, np, parts)
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f'[vector-search] segment store unreadable: {e}\n')
+        return None
+
+    results = []
+    for key, score in scored:
+        if key == exclude:
+            continue
+        if key.startswith('j:'):
+            if vault_only:
+                continue
+            results.append({'source': key, 'type': 'journal', 'score': score,
+                            'summary': '', '_jid': int(key[2:])})
+        elif not journal_only:
+            results.append({'source': key, 'type': 'vault', 'score': score,
+                            'summary': ''})
+    return results
+
+
+def _locate_chunks(conn, query_vec, to_vec, dot, results):
+    """Attach each vault result's best-matching chunk as location data.
+
+    Ranking stays on the file scores, which every candidate (journal ones
+    included) shares; the chunk only tells the caller where in the file to
+    look. Vault results gain a "chunk" dict (heading, start_line, end_line).
+    """
+    paths = [r['source'] for r in results if r['type'] == 'vault']
+    if not paths:
+        return
+    placeholders = ','.join('?' * len(paths))
+    try:
+        rows = conn.execute(
+            'SELECT path, heading, start_line, end_line, embedding FROM vault_chunks '
+            f'WHERE path IN ({placeholders})', paths
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return
+    best = {}
+    for path, heading, start, end, blob in rows:
+        score = dot(query_vec, to_vec(blob))
+        if path not in best or score > best[path][0]:
+            best[path] = (score, heading, start, end)
+    for r in results:
+        if r['type'] == 'vault' and r['source'] in best:
+            _, heading, start, end = best[r['source']]
+            r['chunk'] = {'heading': heading, 'start_line': start, 'end_line': end}
+
+
+def search_by_vector(query_vec, top_k=5, vault_only=False, journal_only=False,
+                     probe=None, exclude=None):
+    """Rank stored vectors by cosine similarity to an already-computed vector.
+
+    Takes the same options as vector_search(); `exclude` is a source
+    ("memory/..." or "j:N") to leave out of the results. query_vec may be a
+    numpy array or any float sequence.
+
+    With STDLIB_MAX_VECTORS or fewer candidates (and no topic routing),
+    scoring runs in pure Python and numpy is never imported. Larger stores
+    are scored from the packed segment files (vector-segments.py) when they
+    exist, unless an explicit probe asks for topic routing.
+    """
+    vdb = _vectors_db()
+    if not os.path.exists(vdb):
+        return []
+
+    conn = _connect(vdb, readonly=True, timeout=5)
+    use_stdlib = (
+        not probe
+        and _candidate_count(conn, vault_only, journal_only) <= STDLIB_MAX_VECTORS
+    )
+    if use_stdlib:
+        query_vec = array.array('f', query_vec)
+        to_vec = blob_to_floats
+        dot = _dot
+    else:
+        np = _np()
+        query_vec = np.asarray(query_vec, dtype=np.float32)
+        to_vec = blob_to_vector
+        dot = lambda a, b: float(np.dot(a, b))  # noqa: E731
+    results = None
+    if not use_stdlib and not probe:
+        results = _segment_results(conn, query_vec, vault_only, journal_only, exclude)
+    if results is None:
+        results = _row_results(conn, query_vec, to_vec, dot, vault_only, journal_only,
+                               0 if use_stdlib else probe, exclude)
+
+    # Sort by score descending, then locate chunks and look up journal
+    # summaries for the survivors only
     results.sort(key=lambda x: -x['score'])
-    return results[:top_k]
+    results = results[:top_k]
+    if not journal_only:
+        _locate_chunks(conn, query_vec, to_vec, dot, results)
+    conn.close()
+    summaries = _get_journal_summaries([r['_jid'] for r in results if '_jid' in r])
+    for r in results:
+        jid = r.pop('_jid', None)
+        if jid is not None:
+            r['summary'] = summaries.get(jid, '')
+    return results
+
+
+def vector_search(query, top_k=5, vault_only=False, journal_only=False, probe=None,
+                  cached_only=False):
+    """Search the vector store for entries most similar to query.
+
+    Args:
+        query: Search text to embed and compare.
+        top_k: Number of results to return.
+        vault_only: Only search vault file vectors.
+        journal_only: Only search journal entry vectors.
+        probe: Topic-tree beam width for vault vectors. None routes
+            automatically on large vaults, 0 disables routing.
+        cached_only: Only answer from the query embedding cache; return []
+            rather than loading the model on a cache miss.
+
+    Returns list of dicts:
+        [{"source": "memory/...", "type": "vault"|"journal",
+          "score": 0.85, "summary": "..."}]
+    Vault results carry the best-matching section when chunks exist:
+        "chunk": {"heading": "Title > Section", "start_line": 12, "end_line": 30}
+    """
+    if not os.path.exists(_vectors_db()):
+        return []
+
+    query_vec = cached_query_vector(query)
+    if query_vec is None:
+        if cached_only:
+            return []
+        model_name = _active_model()[0]
+        query_vec = _get_model(model_name).encode(query, normalize_embeddings=True)
+        _cache_query_vector(query, query_vec, model_name)
+    return search_by_vector(query_vec, top_k=top_k, vault_only=vault_only,
+                            journal_only=journal_only, probe=probe)
+
+
+# ---------------------------------------------------------------------------
+# "More like this": search by a stored vector (no model load)
+# ---------------------------------------------------------------------------
+
+def stored_vector(source):
+    """Return the stored embedding (float32 array) for a vault path or "j:N"."""
+    vdb = _vectors_db()
+    if not os.path.exists(vdb):
+        return None
+    conn = _connect(vdb, readonly=True, timeout=5)
+    try:
+        if source.startswith(('j:', 'journal:')):
+            jid = int(source.split(':', 1)[1])
+            row = conn.execute(
+                'SELECT embedding FROM journal_vectors WHERE journal_id = ?', (jid,)
+            ).fetchone()
+        else:
+            row = conn.execute(
+                'SELECT embedding FROM vault_vectors WHERE path = ?',
+                (os.path.normpath(source),)
+            ).fetchone()
+    except ValueError:
+        row = None
+    finally:
+        conn.close()
+    return blob_to_floats(row[0]) if row else None
+
+
+def similar_to(source, top_k=5, vault_only=False, journal_only=False, probe=None):
+    """Find entries most similar to an already-vectorized vault file or journal entry.
+
+    Uses the stored embedding as the query vector, so the sentence-transformers
+    model is never loaded. Returns the same format as vector_search(), minus
+    the source itself, or [] if the source has no stored vector.
+    """
+    vec = stored_vector(source)
+    if vec is None:
+        return []
+    if source.startswith('journal:'):
+        source = 'j:' + source.split(':', 1)[1]
+    elif not source.startswith('j:'):
+        source = os.path.normpath(source)
+    return search_by_vector(vec, top_k=top_k, vault_only=vault_only,
+                            journal_only=journal_only, probe=probe, exclude=source)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark: pure-Python vs numpy scoring crossover
+# ---------------------------------------------------------------------------
+
+BENCH_SIZES = (50, 100, 250, 500, 1000, 2000, 4000, 8000)
+
+
+def _cold_import_ms(module, runs=3):
+    """Median wall time to import a module in a fresh interpreter, in ms."""
+    import subprocess
+    timings = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, '-c', f'import {module}'], check=True)
+        with_import = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        baseline = time.perf_counter() - t0
+        timings.append(max(with_import - baseline, 0) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def benchmark_scoring(sizes=BENCH_SIZES, dim=384):
+    """Compare cold-process scoring cost of the stdlib and numpy paths.
+
+    The stdlib path pays only per-vector arithmetic; the numpy path pays the
+    one-off import plus faster per-vector work. Prints a table and returns
+    the smallest size at which numpy wins (None if stdlib always wins).
+    """
+    import random
+
+    rng = random.Random(0)
+    np = _np()
+    import_ms = _cold_import_ms('numpy')
+    query = [rng.uniform(-1, 1) for _ in range(dim)]
+    max_n = max(sizes)
+    blobs = [
+        array.array('f', [rng.uniform(-1, 1) for _ in range(dim)]).tobytes()
+        for _ in range(max_n)
+    ]
+
+    print(f'numpy cold import: {import_ms:.1f}ms  (dim={dim})\n')
+    print(f'  {"vectors":>8}  {"stdlib ms":>10}  {"numpy ms":>10}  {"numpy+import":>13}')
+    crossover = None
+    for n in sizes:
+        q = array.array('f', query)
+        t0 = time.perf_counter()
+        for blob in blobs[:n]:
+            _dot(q, blob_to_floats(blob))
+        stdlib_ms = (time.perf_counter() - t0) * 1000
+
+        qn = np.asarray(query, dtype=np.float32)
+        t0 = time.perf_counter()
+        for blob in blobs[:n]:
+            float(np.dot(qn, blob_to_vector(blob)))
+        numpy_ms = (time.perf_counter() - t0) * 1000
+
+        total_ms = numpy_ms + import_ms
+        marker = ''
+        if crossover is None and total_ms < stdlib_ms:
+            crossover = n
+            marker = '  <- numpy wins'
+        print(f'  {n:>8}  {stdlib_ms:>10.1f}  {numpy_ms:>10.1f}  {total_ms:>13.1f}{marker}')
+
+    print()
+    if crossover is None:
+        print(f'stdlib scoring wins at every size up to {max_n} vectors')
+    else:
+        print(f'crossover: numpy wins from ~{crossover} vectors '
+              f'(STDLIB_MAX_VECTORS = {STDLIB_MAX_VECTORS})')
+    return crossover
 
 
 # ---------------------------------------------------------------------------
@@ -182,17 +692,28 @@ def vector_search(query, top_k=5, vault_only=False, journal_only=False):
 
 USAGE = """\
 Usage: vector-search.py [options] <query>
+       vector-search.py [options] --like <path|j:N>
+       vector-search.py --bench
 
 Options:
+  --like SOURCE     Find entries similar to a stored vault file or journal
+                    entry, using its stored vector (no model load)
   --top N           Number of results (default: 5)
   --json            Machine-readable JSON output
   --vault-only      Only search vault file vectors
   --journal-only    Only search journal entry vectors
+  --probe N         Route vault search through the N nearest topic clusters
+                    per level (0 = score every vector; default: auto)
+  --bench           Measure the pure-Python vs numpy scoring crossover
 """
 
 if __name__ == '__main__':
     args = sys.argv[1:]
 
+    if '--bench' in args:
+        benchmark_scoring()
+        sys.exit(0)
+
     json_output = '--json' in args
     args = [a for a in args if a != '--json']
 
@@ -202,6 +723,26 @@ if __name__ == '__main__':
     journal_only = '--journal-only' in args
     args = [a for a in args if a != '--journal-only']
 
+    like = None
+    if '--like' in args:
+        idx = args.index('--like')
+        if idx + 1 < len(args):
+            like = args[idx + 1]
+            args = args[:idx] + args[idx + 2:]
+        else:
+            print('Error: --like requires a vault path or j:N')
+            sys.exit(1)
+
+    probe = None
+    if '--probe' in args:
+        idx = args.index('--probe')
+        if idx + 1 < len(args):
+            probe = int(args[idx + 1])
+            args = args[:idx] + args[idx + 2:]
+        else:
+            print('Error: --probe requires a number')
+            sys.exit(1)
+
     top_k = 5
     if '--top' in args:
         idx = args.index('--top')
@@ -212,13 +753,20 @@ if __name__ == '__main__':
             print('Error: --top requires a number')
             sys.exit(1)
 
-    if not args:
+    if like:
+        if stored_vector(like) is None:
+            print(f'Error: no stored vector for {like} — run vectorize.py first')
+            sys.exit(1)
+        query = f'like {like}'
+        results = similar_to(like, top_k=top_k, vault_only=vault_only,
+                             journal_only=journal_only, probe=probe)
+    elif not args:
         print(USAGE)
         sys.exit(1)
-
-    query = ' '.join(args)
-    results = vector_search(query, top_k=top_k,
-                            vault_only=vault_only, journal_only=journal_only)
+    else:
+        query = ' '.join(args)
+        results = vector_search(query, top_k=top_k, vault_only=vault_only,
+                                journal_only=journal_only, probe=probe)
 
     if json_output:
         print(json.dumps(results, indent=2))
@@ -228,6 +776,9 @@ if __name__ == '__main__':
         print()
         for i, r in enumerate(results, 1):
             print(f'  {i}. [{r["type"]}] {r["source"]} (score: {r["score"]:.4f})')
+            if r.get('chunk'):
+                c = r['chunk']
+                print(f'     lines {c["start_line"]}-{c["end_line"]}: {c["heading"] or "(preamble)"}')
             if r['summary']:
                 print(f'     {r["summary"][:120]}')
             print()
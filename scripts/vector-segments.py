@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""Append-only segmented vector storage for fast exhaustive search.
+
+vectors.db stays the source of truth. Alongside it, vectors are packed into
+immutable segment files under memory/vector-segments/:
+
+  main-NNNNNN.seg    One large, compacted segment (contiguous float32 matrix)
+  delta-NNNNNN.seg   Small append-only segments written on every update,
+                     carrying new/changed vectors plus tombstones for deletes
+  manifest.json      Which main and deltas are live, in order
+
+Searches memory-map the main segment and score it with one matrix product,
+then apply the deltas on top (latest write wins, tombstones hide rows). A
+merge compacts main + deltas into a new main; writers kick one off in a
+detached background process once MERGE_MAX_DELTAS deltas accumulate, so
+adding a journal entry never waits for a rebuild.
+
+Segment layout: 8-byte magic, uint32 header length, JSON header (dim, count,
+keys, tombstones) padded to a 64-byte boundary, then count * dim float32.
+Keys are vault paths ("memory/...") or journal ids ("j:N").
+
+The manifest also records db_seq: the value of vectors.db's vector_seq
+counter (bumped by triggers on every vault/journal vector write) that the
+store reflects. Search uses the store only while the two match.
+
+Dependencies: numpy (lazy-loaded, only for reading matrices).
+
+Usage:
+  python3 scripts/vector-segments.py stats      # Show segment state
+  python3 scripts/vector-segments.py merge      # Compact deltas into main
+  python3 scripts/vector-segments.py rebuild    # Rewrite main from vectors.db
+"""
+
+import fcntl
+import json
+import os
+import sqlite3
+import struct
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+# All paths relative to CWD (the agent's project root)
+VAULT_DIR = 'memory'
+
+MAGIC = b'AGVSEG1\n'
+ALIGN = 64
+MERGE_MAX_DELTAS = 8
+
+
+def _segment_dir():
+    return os.path.join(VAULT_DIR, 'vector-segments')
+
+
+def _manifest_path():
+    return os.path.join(_segment_dir(), 'manifest.json')
+
+
+def _vectors_db():
+    return os.path.join(VAULT_DIR, 'vectors.db')
+
+
+def _np():
+    """Lazy numpy import."""
+    try:
+        import numpy as np
+        return np
+    except ImportError:
+        sys.stderr.write(
+            'Error: numpy not installed.\n'
+            'Run: pip install sentence-transformers\n'
+        )
+        sys.exit(1)
+
+
+# ---------------------------------------------------------------------------
+# SQLite connections (shared pragmas in vault-db.py, loaded lazily)
+# ---------------------------------------------------------------------------
+
+def _db():
+    """Load scripts/vault-db.py as vault_db (see its docstring)."""
+    if 'vault_db' not in sys.modules:
+        from importlib import util
+        spec = util.spec_from_file_location(
+            'vault_db', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vault-db.py'))
+        spec.loader.exec_module(sys.modules.setdefault('vault_db', util.module_from_spec(spec)))
+    return sys.modules['vault_db']
+
+
+def _connect(path, readonly=False, timeout=10):
+    """Open vectors.db or journal.db in WAL mode with the shared pragmas."""
+    return _db().connect(path, readonly=readonly, timeout=timeout)
+
+
+# ---------------------------------------------------------------------------
+# Manifest (guarded by an flock so writers and merges don't interleave)
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def _locked(name='manifest.lock', blocking=True):
+    """Hold an exclusive flock on a lock file in the segment directory.
+
+    Yields True if the lock was acquired, False if non-blocking and busy.
+    """
+    os.makedirs(_segment_dir(), exist_ok=True)
+    fd = os.open(os.path.join(_segment_dir(), name), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+    finally:
+        os.close(fd)
+
+
+def read_manifest():
+    """Return the manifest dict, or None if no segment store exists."""
+    try:
+        with open(_manifest_path(), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_manifest(manifest):
+    tmp = _manifest_path() + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, _manifest_path())
+
+
+def db_seq(conn):
+    """vectors.db's vector_seq change counter (0 before it has one)."""
+    try:
+        row = conn.execute("SELECT value FROM vector_state WHERE key = 'vector_seq'").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return int(row[0]) if row else 0
+
+
+def _current_db_seq():
+    if not os.path.exists(_vectors_db()):
+        return 0
+    conn = _connect(_vectors_db(), readonly=True, timeout=5)
+    try:
+        return db_seq(conn)
+    finally:
+        conn.close()
+
+
+def _new_manifest(dim):
+    return {'version': 1, 'dim': dim, 'main': None, 'deltas': [], 'next_seq': 1}
+
+
+def _remove(names):
+    for name in names:
+        try:
+            os.remove(os.path.join(_segment_dir(), name))
+        except FileNotFoundError:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# Segment files
+# ---------------------------------------------------------------------------
+
+def _write_segment(name, keys, blobs, dim, tombstones=()):
+    """Write an immutable segment file atomically."""
+    header = json.dumps({
+        'dim': dim,
+        'count': len(keys),
+        'keys': list(keys),
+        'tombstones': list(tombstones),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }).encode('utf-8')
+    pad = (-(len(MAGIC) + 4 + len(header))) % ALIGN
+    header += b' ' * pad
+    path = os.path.join(_segment_dir(), name)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for blob in blobs:
+            if len(blob) != dim * 4:
+                raise ValueError(f'vector of {len(blob) // 4} dims in a {dim}-dim segment')
+            f.write(blob)
+    os.replace(tmp, path)
+
+
+def read_header(path):
+    """Return (header dict, data offset) for a segment file."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'not a vector segment: {path}')
+        (length,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(length).decode('utf-8'))
+    return header, len(MAGIC) + 4 + length
+
+
+def read_matrix(path, np):
+    """Return (header, float32 matrix) with the matrix memory-mapped."""
+    header, offset = read_header(path)
+    if header['count'] == 0:
+        return header, np.zeros((0, header['dim']), dtype=np.float32)
+    matrix = np.memmap(path, dtype=np.float32, mode='r', offset=offset,
+                       shape=(header['count'], header['dim']))
+    return header, matrix
+
+
+# ---------------------------------------------------------------------------
+# Writers
+# ---------------------------------------------------------------------------
+
+def write_main(keys, blobs, dim, model=None, seq=None):
+    """Replace the whole store with a single main segment.
+
+    model records which embedding model the vectors came from; search
+    ignores a store whose model is not the one vectors.db is on. seq is
+    the db_seq the vectors were read at (read now if not given).
+    """
+    with _locked():
+        manifest = read_manifest() or _new_manifest(dim)
+        name = f'main-{manifest["next_seq"]:06d}.seg'
+        _write_segment(name, keys, blobs, dim)
+        old = ([manifest['main']] if manifest['main'] else []) + manifest['deltas']
+        manifest.update({'dim': dim, 'main': name, 'deltas': [],
+                         'next_seq': manifest['next_seq'] + 1,
+                         'db_seq': _current_db_seq() if seq is None else seq})
+        if model:
+            manifest['model'] = model
+        _write_manifest(manifest)
+        _remove(old)
+
+
+def append_delta(upserts, deletes=(), dim=None):
+    """Append a delta segment of (key, blob) upserts and deleted keys.
+
+    Returns the number of live deltas, or 0 if nothing was written (empty
+    change, or no store yet — the next full build creates one).
+    """
+    upserts = list(upserts)
+    deletes = list(deletes)
+    if not upserts and not deletes:
+        return 0
+    with _locked():
+        manifest = read_manifest()
+        if manifest is None:
+            return 0
+        if dim is not None and dim != manifest['dim']:
+            raise ValueError(f'{dim}-dim vectors appended to a {manifest["dim"]}-dim store')
+        name = f'delta-{manifest["next_seq"]:06d}.seg'
+        _write_segment(name, [k for k, _ in upserts], [b for _, b in upserts],
+                       manifest['dim'], tombstones=deletes)
+        manifest['deltas'].append(name)
+        manifest['next_seq'] += 1
+        # The caller has committed these changes to vectors.db already
+        manifest['db_seq'] = _current_db_seq()
+        _write_manifest(manifest)
+        return len(manifest['deltas'])
+
+
+def maybe_merge_in_background(delta_count=None):
+    """Start a detached merge once enough deltas have piled up."""
+    if delta_count is None:
+        manifest = read_manifest()
+        delta_count = len(manifest['deltas']) if manifest else 0
+    if delta_count < MERGE_MAX_DELTAS:
+        return False
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), 'merge'],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    return True
+
+
+def rebuild_from_db(conn=None):
+    """Rewrite the main segment from vectors.db. Returns the vector count.
+
+    Keys are read up front; embeddings are streamed from the cursor straight
+    into the segment file, so the rebuild never holds the whole matrix. All
+    reads share one read transaction, so a concurrent writer cannot change
+    the rows between the key list and the embeddings.
+    """
+    own = conn is None
+    if own:
+        if not os.path.exists(_vectors_db()):
+            return 0
+        conn = _connect(_vectors_db(), readonly=True)
+    snapshot = not conn.in_transaction
+    if snapshot:
+        conn.execute('BEGIN')
+    try:
+        query = ("SELECT path AS key, embedding FROM vault_vectors "
+                 "UNION ALL SELECT 'j:' || journal_id, embedding FROM journal_vectors "
+                 "ORDER BY key")
+        keys = [r[0] for r in conn.execute(f'SELECT key FROM ({query})')]
+        if not keys:
+            return 0
+        first = conn.execute(f'SELECT embedding FROM ({query}) LIMIT 1').fetchone()[0]
+        blobs = (blob for _key, blob in conn.execute(query))
+        write_main(keys, blobs, len(first) // 4, model=_db().active_model(conn)[0],
+                   seq=db_seq(conn))
+        return len(keys)
+    finally:
+        if snapshot:
+            conn.rollback()  # read-only: just ends the snapshot
+        if own:
+            conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Readers
+# ---------------------------------------------------------------------------
+
+def live_parts(np, manifest=None):
+    """Load the live view as a list of (keys, matrix, row_mask) parts.
+
+    row_mask is None when every row of the part is live. Reads the current
+    manifest unless one is given. Returns None if there is no segment store.
+    """
+    if manifest is None:
+        manifest = read_manifest()
+    if manifest is None or (manifest['main'] is None and not manifest['deltas']):
+        return None
+    seg_dir = _segment_dir()
+    deltas = [read_matrix(os.path.join(seg_dir, d), np) for d in manifest['deltas']]
+
+    # Latest write per key across deltas: (delta index, row) or None for deletes
+    latest = {}
+    for di, (header, _matrix) in enumerate(deltas):
+        for key in header['tombstones']:
+            latest[key] = None
+        for row, key in enumerate(header['keys']):
+            latest[key] = (di, row)
+
+    parts = []
+    if manifest['main']:
+        header, matrix = read_matrix(os.path.join(seg_dir, manifest['main']), np)
+        mask = None
+        if latest:
+            mask = np.fromiter((k not in latest for k in header['keys']),
+                               dtype=bool, count=header['count'])
+        parts.append((header['keys'], matrix, mask))
+    for di, (header, matrix) in enumerate(deltas):
+        mask = np.fromiter((latest.get(k) == (di, row) for row, k in enumerate(header['keys'])),
+                           dtype=bool, count=header['count'])
+        parts.append((header['keys'], matrix, mask))
+    return parts
+
+
+def live_count(parts):
+    """Number of live vectors in a live_parts() view."""
+    return sum(len(keys) if mask is None else int(mask.sum()) for keys, _m, mask in parts)
+
+
+def score(query_vec, np, parts=None):
+    """Score every live vector against query_vec. Returns [(key, score)].
+
+    Returns None if there is no segment store.
+    """
+    if parts is None:
+        parts = live_parts(np)
+    if parts is None:
+        return None
+    query_vec = np.asarray(query_vec, dtype=np.float32)
+    scored = []
+    for keys, matrix, mask in parts:
+        if not len(keys):
+            continue
+        sims = matrix @ query_vec
+        if mask is None:
+            scored.extend(zip(keys, sims.tolist()))
+        else:
+            idx = np.nonzero(mask)[0]
+            scored.extend(zip((keys[i] for i in idx), sims[idx].tolist()))
+    return scored
+
+
+# ---------------------------------------------------------------------------
+# Merge
+# ---------------------------------------------------------------------------
+
+def merge():
+    """Compact main + current deltas into a new main segment.
+
+    Deltas appended while the merge runs are kept. Returns False if another
+    merge holds the lock, there is nothing to merge, or a rebuild replaced
+    the main segment while it ran (the merged result is then discarded).
+    """
+    np = _np()
+    with _locked('merge.lock', blocking=False) as acquired:
+        if not acquired:
+            return False
+        with _locked():
+            manifest = read_manifest()
+            if manifest is None or not manifest['deltas']:
+                return False
+            snapshot = dict(manifest, deltas=list(manifest['deltas']))
+            name = f'main-{manifest["next_seq"]:06d}.seg'
+            manifest['next_seq'] += 1
+            _write_manifest(manifest)
+
+        try:
+            parts = live_parts(np, manifest=snapshot)
+        except FileNotFoundError:
+            return False  # a rebuild removed the inputs already
+        keys, blobs = [], []
+        for part_keys, matrix, mask in parts:
+            for i, key in enumerate(part_keys):
+                if mask is None or mask[i]:
+                    keys.append(key)
+                    blobs.append(np.ascontiguousarray(matrix[i]).tobytes())
+        _write_segment(name, keys, blobs, snapshot['dim'])
+
+        with _locked():
+            manifest = read_manifest()
+            merged = set(snapshot['deltas'])
+            if (manifest is None or manifest['main'] != snapshot['main']
+                    or not merged.issubset(manifest['deltas'])):
+                # write_main ran meanwhile: its main is newer than our inputs
+                _remove([name])
+                return False
+            manifest['deltas'] = [d for d in manifest['deltas'] if d not in merged]
+            old_main = manifest['main']
+            manifest['main'] = name
+            _write_manifest(manifest)
+        _remove(([old_main] if old_main else []) + snapshot['deltas'])
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Stats
+# ---------------------------------------------------------------------------
+
+def show_stats():
+    """Print segment store statistics."""
+    manifest = read_manifest()
+    if manifest is None:
+        print('No segment store — run vectorize.py to create one')
+        return
+    seg_dir = _segment_dir()
+    main_count = 0
+    if manifest['main']:
+        main_count = read_header(os.path.join(seg_dir, manifest['main']))[0]['count']
+    delta_rows = delta_tombstones = 0
+    size = 0
+    for name in ([manifest['main']] if manifest['main'] else []) + manifest['deltas']:
+        path = os.path.join(seg_dir, name)
+        size += os.path.getsize(path)
+        if name != manifest['main']:
+            header = read_header(path)[0]
+            delta_rows += header['count']
+            delta_tombstones += len(header['tombstones'])
+    print('Vector segments:')
+    print(f'  Model:           {manifest.get("model", "(unrecorded)")}')
+    print(f'  Main segment:    {manifest["main"] or "(none)"} ({main_count} vectors)')
+    print(f'  Deltas:          {len(manifest["deltas"])} '
+          f'({delta_rows} vectors, {delta_tombstones} tombstones)')
+    print(f'  Merge threshold: {MERGE_MAX_DELTAS} deltas')
+    print(f'  Size on disk:    {size / 1024:.1f} KB')
+
+
+# ---------------------------------------------------------------------------
+# CLI entry point
+# ---------------------------------------------------------------------------
+
+USAGE = """\
+Usage: vector-segments.py <command>
+
+Commands:
+  stats      Show main/delta segment counts and size
+  merge      Compact deltas into a new main segment
+  rebuild    Rewrite the main segment from vectors.db
+"""
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if not args:
+        print(USAGE)
+        sys.exit(1)
+
+    cmd = args[0]
+    if cmd == 'stats':
+        show_stats()
+    elif cmd == 'merge':
+        t0 = time.time()
+        if merge():
+            print(f'Merged segments in {time.time() - t0:.2f}s')
+        else:
+            print('Nothing to merge (or a merge is already running)')
+    elif cmd == 'rebuild':
+        n = rebuild_from_db()
+        print(f'Rebuilt main segment: {n} vectors')
+    else:
+        print(f'Unknown command: {cmd}')
+        print(USAGE)
+        sys.exit(1)
@@ -4,6 +4,11 @@
 Embeds all markdown files from memory/ and all journal entries from journal.db,
 storing vectors in memory/vectors.db for semantic search.
 
+Vault files are split into heading-based chunks (vault_chunks), each with
+its own content hash and line range, so only edited sections are re-embedded
+and text past the model's ~256-token window is still covered. A file's
+vector (vault_vectors) is the normalized mean of its chunk vectors.
+
 Dependencies: sentence-transformers, numpy (lazy-loaded).
 Install:  pip install sentence-transformers
 
@@ -11,13 +16,21 @@ Usage:
   python3 scripts/vectorize.py                     # Full build (incremental by default)
   python3 scripts/vectorize.py --stats             # Show current state
   python3 scripts/vectorize.py --force             # Re-embed everything
+  python3 scripts/vectorize.py --max-cpu 25 --nice 10  # Gentle rebuild on a live host
   python3 scripts/vectorize.py --incremental       # Scan for changes only
+  python3 scripts/vectorize.py --watch             # Re-embed changes as they happen
   python3 scripts/vectorize.py update <path>       # Single vault file
   python3 scripts/vectorize.py update --journal <id>  # Single journal entry
+  python3 scripts/vectorize.py related [--top N]   # Nearest-neighbor `related` links
+  python3 scripts/vectorize.py topics              # Build/update the topic tree
+  python3 scripts/vectorize.py topics --show       # Print the top of the topic tree
+  python3 scripts/vectorize.py migrate <model>     # Switch embedding models online
   python3 scripts/vectorize.py --check-deps        # Test if deps are available
 """
 
 import hashlib
+import json
+import math
 import os
 import sqlite3
 import sys
@@ -25,8 +38,6 @@ import time
 
 # All paths relative to CWD (the agent's project root)
 VAULT_DIR = 'memory'
-MODEL_NAME = 'all-MiniLM-L6-v2'
-EMBEDDING_DIM = 384
 
 
 def _vault_dir():
@@ -41,6 +52,10 @@ def _journal_db():
     return os.path.join(_vault_dir(), 'journal.db')
 
 
+def _progress_file():
+    return os.path.join(_vault_dir(), 'meta', 'vectorize-progress.json')
+
+
 # ---------------------------------------------------------------------------
 # Dependency check
 # ---------------------------------------------------------------------------
@@ -85,17 +100,95 @@ def blob_to_vector(blob):
     return np.frombuffer(blob, dtype=np.float32)
 
 
+# ---------------------------------------------------------------------------
+# SQLite connections (shared pragmas in vault-db.py, loaded lazily)
+# ---------------------------------------------------------------------------
+
+def _db():
+    """Load scripts/vault-db.py as vault_db (see its docstring)."""
+    if 'vault_db' not in sys.modules:
+        from importlib import util
+        spec = util.spec_from_file_location(
+            'vault_db', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vault-db.py'))
+        spec.loader.exec_module(sys.modules.setdefault('vault_db', util.module_from_spec(spec)))
+    return sys.modules['vault_db']
+
+
+def _connect(path, readonly=False, timeout=10):
+    """Open vectors.db or journal.db in WAL mode with the shared pragmas."""
+    return _db().connect(path, readonly=readonly, timeout=timeout)
+
+
+# ---------------------------------------------------------------------------
+# Semantic index (sibling script, loaded lazily)
+# ---------------------------------------------------------------------------
+
+def _index():
+    """Load scripts/index-vault.py (shared per process, see vault-db.py)."""
+    return _db().load_sibling('index-vault.py')
+
+
+# ---------------------------------------------------------------------------
+# Segment store (sibling script, loaded lazily)
+# ---------------------------------------------------------------------------
+
+def _segments():
+    """Load scripts/vector-segments.py (shared per process, see vault-db.py)."""
+    return _db().load_sibling('vector-segments.py')
+
+
+def _sync_segments(conn, upserts, deletes, rebuild=False):
+    """Mirror vector changes into the segment store.
+
+    Appends a delta (and starts a background merge when deltas pile up), or
+    rewrites the main segment from vectors.db on rebuild or first use.
+    Failures are reported but never fail the vectorize run — search falls
+    back to vectors.db.
+    """
+    try:
+        segs = _segments()
+        if rebuild or segs.read_manifest() is None:
+            n = segs.rebuild_from_db(conn)
+            if n:
+                print(f'  Segment store rebuilt: {n} vectors')
+            return
+        deltas = segs.append_delta(upserts, deletes, dim=_db().active_model(conn)[1])
+        if deltas and segs.maybe_merge_in_background(deltas):
+            print(f'  Started background segment merge ({deltas} deltas)')
+    except Exception as e:
+        sys.stderr.write(f'[vectorize] segment store update failed: {e}\n')
+
+
 # ---------------------------------------------------------------------------
 # Model loading (lazy, cached)
 # ---------------------------------------------------------------------------
 
-_model_cache = None
+_model_cache = {}
+
+
+def active_model(conn=None):
+    """Return (model name, dim) that vectors.db is built with.
+
+    Read on every call rather than cached, so a long-running --watch picks
+    up a finished migration with its next batch.
+    """
+    if conn is not None:
+        return _db().active_model(conn)
+    vdb = _vectors_db()
+    if not os.path.exists(vdb):
+        return _db().DEFAULT_MODEL, _db().DEFAULT_DIM
+    conn = _connect(vdb, readonly=True)
+    try:
+        return _db().active_model(conn)
+    finally:
+        conn.close()
 
 
-def get_model():
-    """Load sentence-transformers model, caching for reuse."""
-    global _model_cache
-    if _model_cache is None:
+def get_model(model_name=None):
+    """Load a sentence-transformers model (default: the active one), caching for reuse."""
+    if model_name is None:
+        model_name = active_model()[0]
+    if model_name not in _model_cache:
         try:
             from sentence_transformers import SentenceTransformer
         except ImportError:
@@ -104,33 +197,245 @@ def get_model():
                 'Run: pip install sentence-transformers\n'
             )
             sys.exit(1)
-        _model_cache = SentenceTransformer(MODEL_NAME)
-    return _model_cache
+        _model_cache[model_name] = SentenceTransformer(model_name)
+    return _model_cache[model_name]
 
 
 # ---------------------------------------------------------------------------
 # Database setup
 # ---------------------------------------------------------------------------
 
-def init_db(conn):
-    """Create vector tables if they don't exist."""
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS vault_vectors (
+# Tables holding one model's vectors; a migration builds a '_next' copy of each
+VECTOR_TABLES = ('vault_vectors', 'vault_chunks', 'journal_vectors')
+SHADOW_SUFFIX = '_next'
+
+
+def _create_vector_tables(conn, suffix=''):
+    """Create the per-model vector tables, optionally under a suffix."""
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS vault_vectors{suffix} (
             path TEXT PRIMARY KEY,
             embedding BLOB NOT NULL,
             content_hash TEXT NOT NULL,
             updated_at TEXT NOT NULL
         )
     """)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS journal_vectors (
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS journal_vectors{suffix} (
             journal_id INTEGER PRIMARY KEY,
             embedding BLOB NOT NULL,
             content_hash TEXT NOT NULL,
             updated_at TEXT NOT NULL
         )
     """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS vault_chunks{suffix} (
+            path TEXT NOT NULL,
+            chunk_index INTEGER NOT NULL,
+            heading TEXT NOT NULL,
+            start_line INTEGER NOT NULL,
+            end_line INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            embedding BLOB NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (path, chunk_index)
+        )
+    """)
+
+
+def init_db(conn):
+    """Create vector tables if they don't exist."""
+    _create_vector_tables(conn)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS vault_related (
+            path TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            neighbors TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS vector_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+    _init_embedding_cache(conn)
+    _ensure_seq_triggers(conn)
+    conn.commit()
+
+
+# Searched vector tables; every write to them bumps vector_state.vector_seq,
+# which the segment store records to tell whether it is in sync
+SEQ_TABLES = ('vault_vectors', 'journal_vectors')
+_SEQ_EVENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def _ensure_seq_triggers(conn):
+    """Create the vector_seq triggers if any is missing (sqlite_master read otherwise)."""
+    names = [f'{t}_seq_{e.lower()}' for t in SEQ_TABLES for e in _SEQ_EVENTS]
+    found = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' "
+        f"AND name IN ({','.join('?' * len(names))})", names).fetchone()[0]
+    if found != len(names):
+        with _db().transaction(conn):
+            _create_seq_triggers(conn)
+
+
+def _create_seq_triggers(conn):
+    """Create the vector_seq counter and its triggers (no commit)."""
+    conn.execute("INSERT OR IGNORE INTO vector_state (key, value) VALUES ('vector_seq', '0')")
+    for table in SEQ_TABLES:
+        for event in _SEQ_EVENTS:
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_seq_{event.lower()}
+                AFTER {event} ON {table} BEGIN
+                    UPDATE vector_state SET value = value + 1 WHERE key = 'vector_seq';
+                END
+            """)
+
+
+def get_state(conn, key, default=None):
+    """Read a value from the vector_state key/value table."""
+    row = conn.execute('SELECT value FROM vector_state WHERE key = ?', (key,)).fetchone()
+    return json.loads(row[0]) if row else default
+
+
+def set_state(conn, key, value):
+    """Write a JSON-serializable value to the vector_state table (no commit)."""
+    conn.execute('INSERT OR REPLACE INTO vector_state (key, value) VALUES (?, ?)',
+                 (key, json.dumps(value)))
+
+
+# ---------------------------------------------------------------------------
+# Content-addressed embedding cache
+# ---------------------------------------------------------------------------
+
+# Unreferenced cache entries survive this long, so a file moved by deleting
+# one path and creating another still finds its vectors
+CACHE_GRACE_DAYS = 7
+
+
+def _init_embedding_cache(conn):
+    """Create the (model, content_hash) embedding cache and its refcount triggers.
+
+    Every vault chunk and journal vector row holds one reference to the cache
+    entry for its content hash. Triggers keep the counts (and the cached
+    vector) current, so no write path has to remember the cache. They name
+    the active model (and, on the shadow tables, a running migration's
+    target model); an open only checks that, and rewrites them when the
+    tables are new or the recorded model changed.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'embedding_cache'"
+    ).fetchone()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            model TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            embedding BLOB NOT NULL,
+            refs INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (model, content_hash)
+        )
+    """)
+    # INSERT OR REPLACE only fires delete triggers with this on
+    conn.execute('PRAGMA recursive_triggers = ON')
+    active = active_model(conn)[0]
+    _ensure_cache_triggers(conn, '', active)
+    migration = get_state(conn, 'migration')
+    if migration:
+        _ensure_cache_triggers(conn, SHADOW_SUFFIX, migration['model'])
+    if not exists:
+        # Seed from vectors stored before the cache existed
+        conn.execute("""
+            INSERT INTO embedding_cache (model, content_hash, embedding, refs, updated_at)
+            SELECT ?, content_hash, embedding, COUNT(*), MAX(updated_at) FROM (
+                SELECT content_hash, embedding, updated_at FROM vault_chunks
+                UNION ALL
+                SELECT content_hash, embedding, updated_at FROM journal_vectors
+            ) GROUP BY content_hash
+        """, (active,))
+
+
+def _ensure_cache_triggers(conn, suffix, model_name):
+    """Create the refcount triggers unless they already name model_name.
+
+    Reads sqlite_master only; the DDL runs in its own write transaction
+    when a trigger is missing or was made for another model.
+    """
+    quoted = "'" + model_name.replace("'", "''") + "'"
+    names = [f'{table}{suffix}_cache_{kind}'
+             for table in ('vault_chunks', 'journal_vectors') for kind in ('ref', 'unref')]
+    triggers = dict(conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+        f"AND name IN ({','.join('?' * len(names))})", names).fetchall())
+    if len(triggers) == len(names) and all(quoted in sql for sql in triggers.values()):
+        return
+    with _db().transaction(conn):
+        _create_cache_triggers(conn, suffix, model_name)
+
+
+def _create_cache_triggers(conn, suffix, model_name):
+    """(Re)create the refcount triggers on one set of vector tables (no commit)."""
+    model = model_name.replace("'", "''")
+    now = "strftime('%Y-%m-%dT%H:%M:%SZ', 'now')"
+    for table in (f'vault_chunks{suffix}', f'journal_vectors{suffix}'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {table}_cache_ref')
+        conn.execute(f'DROP TRIGGER IF EXISTS {table}_cache_unref')
+        conn.execute(f"""
+            CREATE TRIGGER {table}_cache_ref AFTER INSERT ON {table} BEGIN
+                INSERT INTO embedding_cache (model, content_hash, embedding, refs, updated_at)
+                VALUES ('{model}', NEW.content_hash, NEW.embedding, 1, {now})
+                ON CONFLICT (model, content_hash) DO UPDATE SET
+                    refs = refs + 1, embedding = excluded.embedding,
+                    updated_at = excluded.updated_at;
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER {table}_cache_unref AFTER DELETE ON {table} BEGIN
+                UPDATE embedding_cache SET refs = refs - 1, updated_at = {now}
+                WHERE model = '{model}' AND content_hash = OLD.content_hash;
+            END
+        """)
+
+
+def cached_embeddings(conn, hashes, model_name=None):
+    """Return {content_hash: embedding blob} for hashes already in the cache.
+
+    model_name defaults to the active model.
+    """
+    if model_name is None:
+        model_name = active_model(conn)[0]
+    hashes = list(set(hashes))
+    found = {}
+    for i in range(0, len(hashes), 500):
+        part = hashes[i:i + 500]
+        marks = ','.join('?' * len(part))
+        found.update(conn.execute(
+            f'SELECT content_hash, embedding FROM embedding_cache '
+            f'WHERE model = ? AND content_hash IN ({marks})',
+            [model_name] + part
+        ).fetchall())
+    return found
+
+
+def gc_embedding_cache(conn, grace_days=CACHE_GRACE_DAYS):
+    """Drop cache entries unreferenced for longer than grace_days, and entries
+    of models that are neither active nor being migrated to. Returns the count.
+    """
+    cutoff = time.strftime('%Y-%m-%dT%H:%M:%SZ',
+                           time.gmtime(time.time() - grace_days * 86400))
+    keep = [active_model(conn)[0]]
+    migration = get_state(conn, 'migration')
+    if migration:
+        keep.append(migration['model'])
+    cur = conn.execute(
+        f'DELETE FROM embedding_cache WHERE (refs <= 0 AND updated_at < ?) '
+        f'OR model NOT IN ({",".join("?" * len(keep))})', [cutoff] + keep
+    )
     conn.commit()
+    return cur.rowcount
 
 
 def content_hash(text):
@@ -142,160 +447,860 @@ def content_hash(text):
 # Vault file collection
 # ---------------------------------------------------------------------------
 
+def list_vault_paths():
+    """Sorted relative paths of the markdown files under memory/ (not read).
+
+    Same listing as index-vault.py's, so the generated TOC is left out.
+    """
+    return _index().vault_files()
+
+
+def iter_vault_files(paths=None):
+    """Yield (relative_path, text) for each non-empty markdown file under memory/.
+
+    Files are read one at a time, in sorted path order, so callers can
+    stream the vault and checkpoint by path. paths restricts the walk to
+    a list from list_vault_paths().
+    """
+    for rel in (list_vault_paths() if paths is None else paths):
+        try:
+            with open(rel, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+        except Exception:
+            continue
+        if text.strip():
+            yield rel, text
+
+
 def collect_vault_files():
     """Collect all markdown files under memory/ with their content.
 
     Returns dict of {relative_path: text}.
     """
-    vault = _vault_dir()
-    files = {}
-    for root, _dirs, filenames in os.walk(vault):
-        for fname in filenames:
-            if not fname.endswith('.md'):
-                continue
-            full = os.path.join(root, fname)
-            rel = full  # already relative to CWD
-            try:
-                with open(full, 'r', encoding='utf-8', errors='replace') as f:
-                    text = f.read()
-                if text.strip():
-                    files[rel] = text
-            except Exception:
-                pass
-    return files
+    return dict(iter_vault_files())
 
 
 # ---------------------------------------------------------------------------
 # Journal entry collection
 # ---------------------------------------------------------------------------
 
-def collect_journal_entries():
-    """Collect all journal entries from journal.db.
+def iter_journal_entries(batch_size=500, after_id=None, ids=None):
+    """Yield (journal_id, text) for journal entries, fetched in batches.
 
-    Returns dict of {journal_id: text}.
+    With after_id, only entries above that id; ids adds specific entries
+    at or below it (edited ones).
     """
     jdb = _journal_db()
     if not os.path.exists(jdb):
-        return {}
-    entries = {}
+        return
     try:
-        conn = sqlite3.connect(jdb, timeout=5)
-        rows = conn.execute(
-            'SELECT id, summary, context FROM journal'
-        ).fetchall()
-        conn.close()
-        for jid, summary, context in rows:
-            text = f'{summary or ""}\n{context or ""}'.strip()
-            if text:
-                entries[jid] = text
+        conn = _connect(jdb, readonly=True, timeout=5)
+    except Exception as e:
+        sys.stderr.write(f'[vectorize] journal read error: {e}\n')
+        return
+    try:
+        if ids:
+            ids = sorted(ids)
+            for i in range(0, len(ids), 500):
+                part = ids[i:i + 500]
+                rows = conn.execute(
+                    f'SELECT id, summary, context FROM journal '
+                    f'WHERE id IN ({",".join("?" * len(part))}) ORDER BY id', part
+                ).fetchall()
+                for jid, summary, context in rows:
+                    text = f'{summary or ""}\n{context or ""}'.strip()
+                    if text:
+                        yield jid, text
+        if after_id is None:
+            cur = conn.execute('SELECT id, summary, context FROM journal ORDER BY id')
+        else:
+            cur = conn.execute('SELECT id, summary, context FROM journal '
+                               'WHERE id > ? ORDER BY id', (after_id,))
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for jid, summary, context in rows:
+                text = f'{summary or ""}\n{context or ""}'.strip()
+                if text:
+                    yield jid, text
     except Exception as e:
         sys.stderr.write(f'[vectorize] journal read error: {e}\n')
-    return entries
+    finally:
+        conn.close()
+
+
+def collect_journal_entries():
+    """Collect all journal entries from journal.db.
+
+    Returns dict of {journal_id: text}.
+    """
+    return dict(iter_journal_entries())
 
 
 # ---------------------------------------------------------------------------
 # Embedding
 # ---------------------------------------------------------------------------
 
-def embed_texts(texts, batch_size=64):
-    """Embed a list of texts, return list of numpy vectors."""
-    model = get_model()
-    all_vecs = []
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        vecs = model.encode(batch, show_progress_bar=False, normalize_embeddings=True)
-        all_vecs.extend(vecs)
+# Embedding throughput counters for the current run (texts, seconds)
+_embed_stats = {'texts': 0, 'seconds': 0.0}
+
+_pool = None
+_pool_workers = None
+
+
+_worker_model = None
+
+
+def _init_embed_worker(threads, model_name):
+    """Process-pool initializer: pin CPU threads, then load this worker's model."""
+    global _worker_model
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_model = model_name
+    get_model(model_name)
+
+
+def _embed_batch(texts):
+    """Encode one batch in a pool worker."""
+    return get_model(_worker_model).encode(texts, show_progress_bar=False,
+                                           normalize_embeddings=True)
+
+
+def _get_pool(workers, model_name):
+    """Return a process pool of `workers` embedding processes, started lazily.
+
+    Uses spawn so no worker inherits a half-initialized torch runtime; each
+    gets cpu_count // workers threads.
+    """
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != (workers, model_name):
+        close_pool()
+        import multiprocessing
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        ctx = multiprocessing.get_context('spawn')
+        _pool = ctx.Pool(workers, initializer=_init_embed_worker,
+                         initargs=(threads, model_name))
+        _pool_workers = (workers, model_name)
+    return _pool
+
+
+def close_pool():
+    """Shut down the embedding process pool, if one was started."""
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.close()
+        _pool.join()
+        _pool = None
+        _pool_workers = None
+
+
+def embed_texts(texts, batch_size=64, workers=1, model_name=None):
+    """Embed a list of texts, return list of numpy vectors.
+
+    Texts are sorted by length before batching so each batch pads to a
+    similar length, then returned in input order. With workers > 1, batches
+    are spread over a process pool when there are enough of them.
+    model_name defaults to the active model.
+    """
+    t0 = time.time()
+    if model_name is None:
+        model_name = active_model()[0]
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    batches = [[texts[i] for i in order[j:j + batch_size]]
+               for j in range(0, len(order), batch_size)]
+    if workers > 1 and len(batches) > 1:
+        results = _get_pool(workers, model_name).map(_embed_batch, batches, chunksize=1)
+    else:
+        model = get_model(model_name)
+        results = [model.encode(b, show_progress_bar=False, normalize_embeddings=True)
+                   for b in batches]
+    all_vecs = [None] * len(texts)
+    pos = 0
+    for vecs in results:
+        for vec in vecs:
+            all_vecs[order[pos]] = vec
+            pos += 1
+    _embed_stats['texts'] += len(texts)
+    _embed_stats['seconds'] += time.time() - t0
     return all_vecs
 
 
+# ---------------------------------------------------------------------------
+# Heading-aware chunking
+# ---------------------------------------------------------------------------
+
+# all-MiniLM-L6-v2 truncates at 256 word pieces; ~180 words stays under it
+CHUNK_MAX_WORDS = 180
+
+
+def _split_long(lines, start_line, max_words):
+    """Pack paragraphs (blank-line separated) into pieces of <= max_words.
+
+    Returns list of (start_line, end_line, lines). A single paragraph longer
+    than max_words is cut on line boundaries.
+    """
+    pieces = []
+    cur, cur_start, cur_words = [], start_line, 0
+    for offset, line in enumerate(lines):
+        words = len(line.split())
+        boundary = not line.strip() and cur_words >= max_words // 2
+        if cur and (cur_words + words > max_words or boundary):
+            pieces.append((cur_start, cur_start + len(cur) - 1, cur))
+            cur, cur_start, cur_words = [], start_line + offset, 0
+        cur.append(line)
+        cur_words += words
+    if cur:
+        pieces.append((cur_start, cur_start + len(cur) - 1, cur))
+    return pieces
+
+
+def split_chunks(text, max_words=CHUNK_MAX_WORDS):
+    """Split markdown into heading-based chunks.
+
+    Each section (a heading and the lines up to the next heading) becomes a
+    chunk; sections over max_words are split further at paragraph breaks.
+    Chunk text is prefixed with its heading breadcrumb ("Title > Section")
+    so it embeds with its context.
+
+    Returns list of dicts: heading, start_line, end_line (1-based,
+    inclusive), text.
+    """
+    lines = text.split('\n')
+    sections = []  # (breadcrumb, start_line, lines)
+    stack = []
+    cur_start, cur_lines = 1, []
+    in_fence = False
+    for i, line in enumerate(lines, 1):
+        stripped = line.lstrip()
+        if stripped.startswith('```'):
+            in_fence = not in_fence
+        level = len(stripped) - len(stripped.lstrip('#'))
+        if (not in_fence and 1 <= level <= 6
+                and stripped[level:level + 1] in (' ', '')):
+            if cur_lines:
+                sections.append((' > '.join(h for _, h in stack), cur_start, cur_lines))
+            title = stripped[level:].strip()
+            stack = [(lvl, h) for lvl, h in stack if lvl < level] + [(level, title)]
+            cur_start, cur_lines = i, [line]
+            continue
+        cur_lines.append(line)
+    if cur_lines:
+        sections.append((' > '.join(h for _, h in stack), cur_start, cur_lines))
+
+    chunks = []
+    for heading, start, sec_lines in sections:
+        if not '\n'.join(sec_lines).strip():
+            continue
+        for s, e, piece in _split_long(sec_lines, start, max_words):
+            body = '\n'.join(piece).strip()
+            if not body:
+                continue
+            chunks.append({
+                'heading': heading,
+                'start_line': s,
+                'end_line': e,
+                'text': f'{heading}\n{body}' if heading else body,
+            })
+    return chunks
+
+
+def _mean_vector(blobs):
+    """Normalized mean of chunk vectors — the file-level embedding."""
+    np = _np()
+    mean = np.mean([blob_to_vector(b) for b in blobs], axis=0)
+    return mean / (np.linalg.norm(mean) + 1e-12)
+
+
+def _plan_vault_files(conn, files, force=False, workers=1, suffix='', model_name=None):
+    """Chunk and embed vault files without writing anything.
+
+    files is {path: (text, content_hash)}. Chunks whose content hash is
+    already stored for that file — or anywhere in the embedding cache —
+    reuse their embedding, so editing one section of a long note re-embeds
+    only that section and a moved note re-embeds nothing. All new chunks
+    across files are embedded in one batched call. force bypasses both.
+    suffix and model_name select a migration's shadow tables and target model.
+    Returns ({path: chunk dicts with 'hash' and 'blob'}, chunks embedded).
+    """
+    if model_name is None:
+        model_name = active_model(conn)[0]
+    plans = {}
+    pending = []
+    for path, (text, _h) in files.items():
+        chunks = split_chunks(text)
+        if not chunks:
+            chunks = [{'heading': '', 'start_line': 1,
+                       'end_line': text.count('\n') + 1, 'text': text}]
+        known = {}
+        if not force:
+            known = dict(conn.execute(
+                f'SELECT content_hash, embedding FROM vault_chunks{suffix} WHERE path = ?',
+                (path,)
+            ).fetchall())
+        for chunk in chunks:
+            chunk['hash'] = content_hash(chunk['text'])
+            chunk['blob'] = known.get(chunk['hash'])
+            if chunk['blob'] is None:
+                pending.append(chunk)
+        plans[path] = chunks
+
+    if pending and not force:
+        cached = cached_embeddings(conn, [c['hash'] for c in pending], model_name)
+        for chunk in pending:
+            chunk['blob'] = cached.get(chunk['hash'])
+        pending = [c for c in pending if c['blob'] is None]
+
+    if pending:
+        vecs = embed_texts([c['text'] for c in pending], workers=workers,
+                           model_name=model_name)
+        for chunk, vec in zip(pending, vecs):
+            chunk['blob'] = vector_to_blob(vec)
+    return plans, len(pending)
+
+
+def _store_vault_chunks(conn, plans, now, suffix=''):
+    """Replace the chunk rows of planned files. Returns {path: file vector blob}."""
+    file_blobs = {}
+    for path, chunks in plans.items():
+        conn.execute(f'DELETE FROM vault_chunks{suffix} WHERE path = ?', (path,))
+        conn.executemany(
+            f'INSERT INTO vault_chunks{suffix} (path, chunk_index, heading, start_line, '
+            f'end_line, content_hash, embedding, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            [(path, i, c['heading'], c['start_line'], c['end_line'], c['hash'],
+              c['blob'], now) for i, c in enumerate(chunks)]
+        )
+        file_blobs[path] = vector_to_blob(_mean_vector([c['blob'] for c in chunks]))
+    return file_blobs
+
+
 # ---------------------------------------------------------------------------
 # Full vectorize (with incremental change detection)
 # ---------------------------------------------------------------------------
 
-def vectorize(force=False):
+VECTORIZE_BATCH_SIZE = 64
+# Past this many changed vectors a run rewrites the segment store from
+# vectors.db instead of holding the changes in memory for one delta
+SEGMENT_DELTA_MAX = 2048
+
+
+def _batched(items, size):
+    """Yield lists of up to size items from an iterable."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _stored_hashes(conn, table, key_col, keys):
+    """Return {key: content_hash} for the given keys of a vector table."""
+    marks = ','.join('?' * len(keys))
+    return dict(conn.execute(
+        f'SELECT {key_col}, content_hash FROM {table} WHERE {key_col} IN ({marks})',
+        list(keys)
+    ).fetchall())
+
+
+def vectorize(force=False, batch_size=VECTORIZE_BATCH_SIZE, workers=1,
+              max_cpu=None, rate=None, nice=None, restart=False):
     """Full build: embed all vault files and journal entries.
 
     Incremental by default — only embeds changed content unless force=True.
+    Files and journal rows are streamed through fixed-size batches; each
+    batch is hashed, embedded and written in its own transaction, so peak
+    memory does not grow with the vault. workers > 1 embeds on a process
+    pool, with batches scaled up so every worker has work.
+
+    Builds are checkpointed after every batch: an interrupted build resumes
+    after the last finished file / journal entry on the next run (restart
+    discards the checkpoint). max_cpu (percent of wall time spent working),
+    rate (items per second) and nice lower the build's impact on a live
+    host. Progress is written to memory/meta/vectorize-progress.json.
+    """
+    if nice:
+        os.nice(nice)  # before the pool starts, so workers inherit it
+    batch_size *= max(1, workers)
+    _embed_stats.update(texts=0, seconds=0.0)
+    job = _BuildJob(max_cpu=max_cpu, rate=rate)
+    try:
+        _vectorize(force, batch_size, workers, job, restart)
+    except KeyboardInterrupt:
+        job.write_progress('interrupted')
+        print('\nInterrupted — run vectorize.py again to resume')
+        raise
+    finally:
+        close_pool()
+    if _embed_stats['texts']:
+        rate = _embed_stats['texts'] / max(_embed_stats['seconds'], 1e-9)
+        print(f'  Embedded {_embed_stats["texts"]} texts in {_embed_stats["seconds"]:.1f}s '
+              f'({rate:.0f} texts/s, {workers} worker{"s" if workers != 1 else ""})')
+
+
+BUILD_PROGRESS_INTERVAL = 1.0   # seconds between progress file writes
+
+
+class _BuildJob:
+    """Checkpoint, throttle and progress reporting for one full build.
+
+    The checkpoint lives in vector_state ('build') and records the last
+    vault path and journal id whose batch was written. Throttling sleeps
+    between batches: max_cpu keeps busy time under that share of wall time,
+    rate caps items per second.
+    """
+
+    def __init__(self, max_cpu=None, rate=None):
+        self.max_cpu = max_cpu
+        self.rate = rate
+        self.checkpoint = None
+        self.started = time.time()
+        self.phase = None
+        self.done = self.total = self.phase_done = 0
+        self.phase_started = self.mark = time.time()
+        self.last_write = 0.0
+
+    def begin(self, conn, force, restart=False):
+        """Load or create the checkpoint. Returns the effective force flag."""
+        build = get_state(conn, 'build')
+        # A forced build resumes as forced; a plain build cannot stand in for one
+        if build and not restart and (not force or build['force']):
+            self.checkpoint = build
+            print(f'Resuming build started {build["started_at"]}')
+        else:
+            self.checkpoint = {
+                'force': force,
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'vault_after': None, 'vault_done': False, 'journal_after': None,
+            }
+            set_state(conn, 'build', self.checkpoint)
+            conn.commit()
+        return self.checkpoint['force']
+
+    @property
+    def resumed(self):
+        return bool(self.checkpoint['vault_after'] or self.checkpoint['vault_done'])
+
+    def save(self, conn, **marks):
+        self.checkpoint.update(marks)
+        set_state(conn, 'build', self.checkpoint)
+        conn.commit()
+
+    def finish(self, conn):
+        conn.execute("DELETE FROM vector_state WHERE key = 'build'")
+        conn.commit()
+        self.write_progress('done')
+
+    def start_phase(self, phase, total, done=0):
+        self.phase, self.total, self.done = phase, total, done
+        self.phase_done = 0
+        self.phase_started = self.mark = time.time()
+        self.write_progress('running')
+
+    def advance(self, n):
+        """Count n finished items, update the progress file, then throttle."""
+        self.done += n
+        self.phase_done += n
+        busy = time.time() - self.mark
+        pause = 0.0
+        if self.max_cpu and self.max_cpu < 100:
+            pause = busy * (100.0 / self.max_cpu - 1)
+        if self.rate:
+            pause = max(pause, n / self.rate - busy)
+        if pause > 0:
+            time.sleep(pause)
+        self.mark = time.time()
+        if self.mark - self.last_write >= BUILD_PROGRESS_INTERVAL:
+            self.write_progress('running')
+
+    def write_progress(self, state):
+        elapsed = time.time() - self.phase_started
+        rate = self.phase_done / elapsed if elapsed > 0 else 0.0
+        remaining = max(0, self.total - self.done)
+        progress = {
+            'state': state,
+            'pid': os.getpid(),
+            'phase': self.phase,
+            'done': self.done,
+            'total': self.total,
+            'rate': round(rate, 2),
+            'eta_seconds': round(remaining / rate) if rate and state == 'running' else None,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.started)),
+            'updated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        }
+        path = _progress_file()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(progress, f, indent=2)
+            os.replace(tmp, path)
+        except OSError as e:
+            sys.stderr.write(f'[vectorize] could not write progress: {e}\n')
+        self.last_write = time.time()
+
+
+def read_progress():
+    """Return the last build's progress dict, or None."""
+    try:
+        with open(_progress_file()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class _SegmentChanges:
+    """Vector changes collected during a run, for one segment-store sync.
+
+    Falls back to a full segment rebuild once the change set grows past
+    SEGMENT_DELTA_MAX instead of holding it all in memory.
     """
-    conn = sqlite3.connect(_vectors_db(), timeout=10)
+
+    def __init__(self, rebuild=False):
+        self.upserts = []
+        self.deletes = []
+        self.rebuild = rebuild
+
+    def add(self, upserts=(), deletes=()):
+        if self.rebuild:
+            return
+        self.upserts.extend(upserts)
+        self.deletes.extend(deletes)
+        if len(self.upserts) + len(self.deletes) > SEGMENT_DELTA_MAX:
+            self.upserts, self.deletes, self.rebuild = [], [], True
+
+    def sync(self, conn):
+        if self.rebuild or self.upserts or self.deletes:
+            _sync_segments(conn, self.upserts, self.deletes, rebuild=self.rebuild)
+
+
+def _vectorize(force, batch_size, workers, job, restart=False):
+    conn = _connect(_vectors_db())
     init_db(conn)
     now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    force = job.begin(conn, force, restart)
+    # The interrupted run never synced its segment delta
+    changes = _SegmentChanges(rebuild=force or job.resumed)
+    _vault_pass(conn, now, force, batch_size, workers, changes, job)
+    _journal_pass(conn, now, force, batch_size, workers, changes, job)
+    dropped = gc_embedding_cache(conn)
+    if dropped:
+        print(f'  Dropped {dropped} unreferenced cached embeddings')
+    # Always sync on full runs: the first run has to create the store
+    _sync_segments(conn, changes.upserts, changes.deletes, rebuild=changes.rebuild)
+    job.finish(conn)
+    conn.close()
 
-    # --- Vault files ---
-    vault_files = collect_vault_files()
-    print(f'Found {len(vault_files)} vault markdown files')
-
-    existing_vault = {}
-    for row in conn.execute('SELECT path, content_hash FROM vault_vectors').fetchall():
-        existing_vault[row[0]] = row[1]
 
-    vault_to_embed = {}
-    for path, text in vault_files.items():
-        h = content_hash(text)
-        if force or path not in existing_vault or existing_vault[path] != h:
-            vault_to_embed[path] = (text, h)
+def _vault_pass(conn, now, force, batch_size, workers, changes, job):
+    """Stream every vault file through hash / embed / write batches."""
+    # Keys seen this run, kept in SQLite so deletion detection stays bounded
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS seen_paths (path TEXT PRIMARY KEY)')
+    conn.execute('DELETE FROM seen_paths')
+
+    # Stat manifest shared with index-vault.py: only files whose stat
+    # changed since either tool last looked are read to get their hash
+    manifest = _index().refresh_manifest()
+    pending = sorted(manifest)
+    if not force:
+        stored = dict(conn.execute('SELECT path, content_hash FROM vault_vectors').fetchall())
+        chunked = {r[0] for r in conn.execute('SELECT DISTINCT path FROM vault_chunks')}
+        unchanged = [p for p in pending
+                     if stored.get(p) == manifest[p] and p in chunked]
+        conn.executemany('INSERT OR IGNORE INTO seen_paths (path) VALUES (?)',
+                         [(p,) for p in unchanged])
+        unchanged = set(unchanged)
+        pending = [p for p in pending if p not in unchanged]
+    else:
+        unchanged = set()
+    # Only a forced build needs the checkpoint: an incremental one already
+    # skips what the interrupted run stored, via the manifest comparison
+    # above, and skipping by position would drop files edited since
+    after = job.checkpoint['vault_after'] if force else None
+    if force and job.checkpoint['vault_done']:
+        after = pending[-1] if pending else ''
+    if after is not None:
+        # Finished by the interrupted run: count them as seen, don't re-read.
+        # Files created or edited since then still get embedded.
+        stored = dict(conn.execute('SELECT path, content_hash FROM vault_vectors').fetchall())
+        done = [p for p in pending if p <= after and stored.get(p) == manifest[p]]
+        conn.executemany('INSERT OR IGNORE INTO seen_paths (path) VALUES (?)',
+                         [(p,) for p in done])
+        done_set = set(done)
+        pending = [p for p in pending if p not in done_set]
+        if done:
+            print(f'  Skipping {len(done)} vault files finished before the interruption')
+    else:
+        done = []
+    job.start_phase('vault', len(unchanged) + len(done) + len(pending),
+                    done=len(unchanged) + len(done))
+
+    n_files = n_updated = n_chunks = 0
+    for batch in _batched(iter_vault_files(pending), batch_size):
+        n_files += len(batch)
+        paths = [p for p, _ in batch]
+        conn.executemany('INSERT OR IGNORE INTO seen_paths (path) VALUES (?)',
+                         [(p,) for p in paths])
+        conn.commit()  # TEMP table only — no lock on vectors.db
+        existing = _stored_hashes(conn, 'vault_vectors', 'path', paths)
+        # Files vectorized before chunking existed have no chunk rows yet
+        marks = ','.join('?' * len(paths))
+        chunked = {r[0] for r in conn.execute(
+            f'SELECT DISTINCT path FROM vault_chunks WHERE path IN ({marks})', paths
+        ).fetchall()}
+
+        to_embed = {}
+        for path, text in batch:
+            h = content_hash(text)
+            if force or existing.get(path) != h or path not in chunked:
+                to_embed[path] = (text, h)
+        if to_embed:
+            # Embed outside the write transaction so readers and other
+            # writers only ever wait for the inserts
+            plans, n_embedded = _plan_vault_files(conn, to_embed, force=force, workers=workers)
+            with _db().transaction(conn):
+                file_blobs = _store_vault_chunks(conn, plans, now)
+                conn.executemany(
+                    'INSERT OR REPLACE INTO vault_vectors '
+                    '(path, embedding, content_hash, updated_at) VALUES (?, ?, ?, ?)',
+                    [(path, blob, to_embed[path][1], now) for path, blob in file_blobs.items()]
+                )
+            changes.add(upserts=file_blobs.items())
+            n_updated += len(to_embed)
+            n_chunks += n_embedded
+            print(f'  {n_files} files scanned, {n_updated} vault vectors updated '
+                  f'({n_chunks} chunks embedded)')
+        job.save(conn, vault_after=paths[-1])
+        job.advance(len(batch))
+    print(f'Found {n_files + len(done) + len(unchanged)} vault markdown files '
+          f'({len(unchanged)} unchanged, not read)')
 
     # Remove entries for deleted files
-    deleted_paths = set(existing_vault.keys()) - set(vault_files.keys())
+    deleted_paths = [r[0] for r in conn.execute(
+        'SELECT path FROM vault_vectors WHERE path NOT IN (SELECT path FROM seen_paths) '
+        'UNION SELECT path FROM vault_chunks WHERE path NOT IN (SELECT path FROM seen_paths)'
+    ).fetchall()]
     if deleted_paths:
-        conn.executemany('DELETE FROM vault_vectors WHERE path = ?',
-                         [(p,) for p in deleted_paths])
+        with _db().transaction(conn):
+            conn.executemany('DELETE FROM vault_vectors WHERE path = ?',
+                             [(p,) for p in deleted_paths])
+            conn.executemany('DELETE FROM vault_chunks WHERE path = ?',
+                             [(p,) for p in deleted_paths])
+        changes.add(deletes=deleted_paths)
         print(f'  Removed {len(deleted_paths)} deleted file vectors')
-
-    if vault_to_embed:
-        print(f'  Embedding {len(vault_to_embed)} vault files...')
-        paths = list(vault_to_embed.keys())
-        texts = [vault_to_embed[p][0] for p in paths]
-        hashes = [vault_to_embed[p][1] for p in paths]
-        vecs = embed_texts(texts)
-        for path, vec, h in zip(paths, vecs, hashes):
-            conn.execute(
-                'INSERT OR REPLACE INTO vault_vectors '
-                '(path, embedding, content_hash, updated_at) VALUES (?, ?, ?, ?)',
-                (path, vector_to_blob(vec), h, now)
-            )
-        conn.commit()
-        print(f'  Done: {len(vault_to_embed)} vault vectors updated')
+    job.save(conn, vault_after=None, vault_done=True)
+    if n_updated:
+        print(f'  Done: {n_updated} vault vectors updated ({n_chunks} chunks embedded)')
     else:
         print('  All vault vectors up to date')
 
-    # --- Journal entries ---
-    journal_entries = collect_journal_entries()
-    print(f'Found {len(journal_entries)} journal entries')
 
-    existing_journal = {}
-    for row in conn.execute('SELECT journal_id, content_hash FROM journal_vectors').fetchall():
-        existing_journal[row[0]] = row[1]
+def _journal_marks():
+    """Return (max journal id, max change-log seq) from journal.db.
 
-    journal_to_embed = {}
-    for jid, text in journal_entries.items():
-        h = content_hash(text)
-        if force or jid not in existing_journal or existing_journal[jid] != h:
-            journal_to_embed[jid] = (text, h)
+    The seq is None when journal.db predates the journal_changes log
+    (run `journal.py init` to add it), and both are None without a journal.
+    """
+    jdb = _journal_db()
+    if not os.path.exists(jdb):
+        return None, None
+    jconn = _connect(jdb, readonly=True, timeout=5)
+    try:
+        max_id = jconn.execute('SELECT COALESCE(MAX(id), 0) FROM journal').fetchone()[0]
+        try:
+            max_seq = jconn.execute(
+                'SELECT COALESCE(MAX(seq), 0) FROM journal_changes').fetchone()[0]
+        except sqlite3.OperationalError:
+            max_seq = None
+        return max_id, max_seq
+    except sqlite3.Error as e:
+        sys.stderr.write(f'[vectorize] journal read error: {e}\n')
+        return None, None
+    finally:
+        jconn.close()
+
+
+def _journal_ids(upto):
+    """Journal entry ids at or below upto, for resuming a full pass."""
+    jconn = _connect(_journal_db(), readonly=True, timeout=5)
+    try:
+        return [r[0] for r in jconn.execute('SELECT id FROM journal WHERE id <= ?', (upto,))]
+    finally:
+        jconn.close()
+
+
+def _journal_count(after_id=None):
+    """Number of journal rows above after_id (progress totals)."""
+    jdb = _journal_db()
+    if not os.path.exists(jdb):
+        return 0
+    jconn = _connect(jdb, readonly=True, timeout=5)
+    try:
+        return jconn.execute('SELECT COUNT(*) FROM journal WHERE id > ?',
+                             (after_id or 0,)).fetchone()[0]
+    except sqlite3.Error:
+        return 0
+    finally:
+        jconn.close()
+
+
+def _changed_journal_ids(after_seq):
+    """Entry ids edited or deleted since change-log seq after_seq."""
+    jconn = _connect(_journal_db(), readonly=True, timeout=5)
+    try:
+        return {r[0] for r in jconn.execute(
+            'SELECT DISTINCT id FROM journal_changes WHERE seq > ?', (after_seq,))}
+    finally:
+        jconn.close()
+
+
+def _journal_pass(conn, now, force, batch_size, workers, changes, job=None):
+    """Bring journal vectors up to date.
+
+    The journal is append-only, so after a first full pass only entries
+    above the stored id watermark are read, plus entries the journal's
+    change log says were edited or deleted since the stored log position.
+    A full hash-compare pass runs on --force, when journal.db has no change
+    log, or when the journal shrank (rebuilt from a dump); with a build
+    job, a full pass resumes after the job's checkpointed journal id. Ids
+    at or below it that the change log shows were edited or deleted since
+    the pass started are read again; without a change log the finished
+    range is re-read and only entries whose stored hash still matches are
+    left alone.
+    """
+    max_id, max_seq = _journal_marks()
+    watermark = get_state(conn, 'journal_watermark')
+    change_mark = get_state(conn, 'journal_change_seq')
+    incremental = (not force and max_seq is not None
+                   and watermark is not None and change_mark is not None
+                   and max_id >= watermark and max_seq >= change_mark)
+    if max_id is not None and max_seq is None:
+        print('  journal.db has no change log — run journal.py init for '
+              'incremental journal updates')
+
+    skipped = 0
+    verified_upto = None  # force: ids up to here keep vectors whose hash matches
+    if incremental:
+        edited = _changed_journal_ids(change_mark)
+        earlier = {j for j in edited if j <= watermark}
+        entries = iter_journal_entries(after_id=watermark, ids=earlier)
+        total = _journal_count(watermark) + len(earlier)
+    else:
+        edited = set()
+        conn.execute('CREATE TEMP TABLE IF NOT EXISTS seen_journal '
+                     '(journal_id INTEGER PRIMARY KEY)')
+        conn.execute('DELETE FROM seen_journal')
+        after = job.checkpoint['journal_after'] if job else None
+        start_seq = job.checkpoint.get('journal_seq') if job else None
+        if job and after is None:
+            job.save(conn, journal_seq=max_seq)
+        if after is not None and start_seq is not None and (max_seq or 0) >= start_seq:
+            # Changed since the pass started: read again, and let the
+            # deletion check below catch the ones that are gone
+            redo = {j for j in _changed_journal_ids(start_seq) if j <= after}
+            done = [j for j in _journal_ids(after) if j not in redo]
+            conn.executemany('INSERT OR IGNORE INTO seen_journal (journal_id) VALUES (?)',
+                             [(j,) for j in done])
+            skipped = len(done)
+            print(f'  Skipping {skipped} journal entries finished before the interruption')
+            entries = iter_journal_entries(after_id=after, ids=redo)
+            total = skipped + _journal_count(after) + len(redo)
+        else:
+            if after is not None:
+                print('  No journal change log: re-checking entries finished before '
+                      'the interruption by hash')
+                verified_upto = after
+            entries = iter_journal_entries()
+            total = _journal_count()
+    if job:
+        job.start_phase('journal', total, done=skipped)
+
+    n_entries = n_updated = 0
+    seen_edited = set()
+    for batch in _batched(entries, batch_size):
+        n_entries += len(batch)
+        jids = [j for j, _ in batch]
+        if incremental:
+            seen_edited.update(j for j in jids if j in edited)
+        else:
+            conn.executemany('INSERT OR IGNORE INTO seen_journal (journal_id) VALUES (?)',
+                             [(j,) for j in jids])
+            conn.commit()
+        existing = _stored_hashes(conn, 'journal_vectors', 'journal_id', jids)
+
+        to_embed = []
+        for jid, text in batch:
+            h = content_hash(text)
+            if existing.get(jid) != h or (
+                    force and (verified_upto is None or jid > verified_upto)):
+                to_embed.append((jid, text, h))
+        if to_embed:
+            cached = {} if force else cached_embeddings(conn, [h for _, _, h in to_embed])
+            misses = [(text, h) for _, text, h in to_embed if h not in cached]
+            if misses:
+                vecs = embed_texts([text for text, _ in misses], workers=workers)
+                cached.update((h, vector_to_blob(vec)) for (_, h), vec in zip(misses, vecs))
+            blobs = [cached[h] for _, _, h in to_embed]
+            with _db().transaction(conn):
+                conn.executemany(
+                    'INSERT OR REPLACE INTO journal_vectors '
+                    '(journal_id, embedding, content_hash, updated_at) VALUES (?, ?, ?, ?)',
+                    [(jid, blob, h, now) for (jid, _, h), blob in zip(to_embed, blobs)]
+                )
+            changes.add(upserts=[(f'j:{jid}', blob) for (jid, _, _), blob in zip(to_embed, blobs)])
+            n_updated += len(to_embed)
+            print(f'  {n_entries} entries scanned, {n_updated} journal vectors updated')
+        if job:
+            if not incremental:
+                # Re-read ids come first; never move the checkpoint back
+                job.save(conn, journal_after=max(jids[-1], job.checkpoint['journal_after'] or 0))
+            job.advance(len(batch))
+    if incremental:
+        print(f'Checked {n_entries} new or edited journal entries (watermark j:{watermark})')
+    else:
+        print(f'Found {n_entries + skipped} journal entries')
 
-    deleted_jids = set(existing_journal.keys()) - set(journal_entries.keys())
+    if incremental:
+        # Edited ids that no longer exist (or are now empty) were deleted
+        gone = list(edited - seen_edited)
+        deleted_jids = sorted(_stored_hashes(conn, 'journal_vectors', 'journal_id', gone)) if gone else []
+    else:
+        deleted_jids = [r[0] for r in conn.execute(
+            'SELECT journal_id FROM journal_vectors '
+            'WHERE journal_id NOT IN (SELECT journal_id FROM seen_journal)'
+        ).fetchall()]
     if deleted_jids:
         conn.executemany('DELETE FROM journal_vectors WHERE journal_id = ?',
                          [(j,) for j in deleted_jids])
+        changes.add(deletes=[f'j:{j}' for j in deleted_jids])
         print(f'  Removed {len(deleted_jids)} deleted journal vectors')
 
-    if journal_to_embed:
-        print(f'  Embedding {len(journal_to_embed)} journal entries...')
-        jids = list(journal_to_embed.keys())
-        texts = [journal_to_embed[j][0] for j in jids]
-        hashes = [journal_to_embed[j][1] for j in jids]
-        vecs = embed_texts(texts)
-        for jid, vec, h in zip(jids, vecs, hashes):
-            conn.execute(
-                'INSERT OR REPLACE INTO journal_vectors '
-                '(journal_id, embedding, content_hash, updated_at) VALUES (?, ?, ?, ?)',
-                (jid, vector_to_blob(vec), h, now)
-            )
-        conn.commit()
-        print(f'  Done: {len(journal_to_embed)} journal vectors updated')
+    if max_id is not None:
+        set_state(conn, 'journal_watermark', max_id)
+        set_state(conn, 'journal_change_seq', max_seq)
+    conn.commit()
+    if n_updated:
+        print(f'  Done: {n_updated} journal vectors updated')
     else:
         print('  All journal vectors up to date')
+    return n_updated
 
+
+def sync_journal():
+    """Bring journal vectors up to date without touching the vault."""
+    conn = _connect(_vectors_db())
+    init_db(conn)
+    now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    changes = _SegmentChanges()
+    _journal_pass(conn, now, False, VECTORIZE_BATCH_SIZE, 1, changes)
+    changes.sync(conn)
     conn.close()
 
 
@@ -314,25 +1319,22 @@ def incremental_scan():
         vectorize()
         return
 
-    db_mtime = os.path.getmtime(vdb)
+    db_mtime = _db().db_mtime(vdb)
 
     # Quick check: anything changed since last vectorize?
     memory_changed = False
-    vault = _vault_dir()
-    for root, _dirs, files in os.walk(vault):
-        for f in files:
-            if f.endswith('.md'):
-                fpath = os.path.join(root, f)
-                if os.path.getmtime(fpath) > db_mtime:
-                    memory_changed = True
-                    break
-        if memory_changed:
-            break
+    for fpath in list_vault_paths():
+        try:
+            if os.path.getmtime(fpath) > db_mtime:
+                memory_changed = True
+                break
+        except OSError:
+            continue
 
     jdb = _journal_db()
     journal_changed = (
         os.path.exists(jdb)
-        and os.path.getmtime(jdb) > db_mtime
+        and _db().db_mtime(jdb) > db_mtime
     )
 
     if not memory_changed and not journal_changed:
@@ -343,57 +1345,346 @@ def incremental_scan():
     vectorize(force=False)
 
 
+# ---------------------------------------------------------------------------
+# Watch mode (inotify, polling fallback)
+# ---------------------------------------------------------------------------
+
+WATCH_DEBOUNCE = 1.0        # seconds of quiet before a batch is embedded
+WATCH_MAX_DELAY = 10.0      # flush anyway once a change has waited this long
+WATCH_POLL_INTERVAL = 2.0   # stat-scan interval when inotify is unavailable
+WATCH_RETRY_DELAY = 5.0     # wait after a failed flush (locked db, unreadable file)
+WATCH_MAX_RETRIES = 5       # then drop the batch; the next edit queues it again
+
+# inotify(7) constants
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_ISDIR = 0x40000000
+_IN_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+            | _IN_CREATE | _IN_DELETE)
+
+
+class _InotifyWatcher:
+    """Recursive inotify watch on the vault via libc (Linux only).
+
+    poll() returns the set of changed .md paths, or None after a queue
+    overflow, when the caller must rescan everything. A directory moved or
+    deleted out of the vault is reported as its path plus os.sep, since
+    the files it held can no longer be listed.
+    """
+
+    def __init__(self, root):
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._dirs = {}
+        for dirpath, _dirs, _files in os.walk(root):
+            self._add(dirpath)
+
+    def _add(self, dirpath):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), _IN_MASK)
+        if wd >= 0:
+            self._dirs[wd] = dirpath
+
+    def poll(self, timeout):
+        import select
+        import struct
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return set()
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = struct.unpack_from('iIII', data, offset)
+            name = data[offset + 16:offset + 16 + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += 16 + length
+            if mask & _IN_Q_OVERFLOW:
+                return None
+            path = os.path.join(self._dirs.get(wd, ''), name)
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    # Files may land before the watch exists — pick them up now
+                    for dirpath, _dirs, files in os.walk(path):
+                        self._add(dirpath)
+                        changed.update(os.path.join(dirpath, f) for f in files
+                                       if f.endswith('.md'))
+                elif mask & (_IN_MOVED_FROM | _IN_DELETE):
+                    self._remove_tree(path)
+                    changed.add(path + os.sep)
+                continue
+            if name.endswith('.md'):
+                changed.add(path)
+        return changed
+
+    def _remove_tree(self, dirpath):
+        # A moved directory keeps its watches and would report stale paths
+        prefix = dirpath + os.sep
+        for wd, path in list(self._dirs.items()):
+            if path == dirpath or path.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._dirs[wd]
+
+    def close(self):
+        os.close(self._fd)
+
+
+class _PollingWatcher:
+    """Stat-only fallback: diff (mtime_ns, size) snapshots of the vault."""
+
+    def __init__(self, root, interval=WATCH_POLL_INTERVAL):
+        self._root = root
+        self._interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for dirpath, _dirs, files in os.walk(self._root):
+            for fname in files:
+                if fname.endswith('.md'):
+                    path = os.path.join(dirpath, fname)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def poll(self, timeout):
+        time.sleep(max(timeout, self._interval))
+        current = self._scan()
+        changed = {p for p, sig in current.items() if self._snapshot.get(p) != sig}
+        changed.update(set(self._snapshot) - set(current))
+        self._snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def _indexed_under(dirs):
+    """Vault paths with stored vectors below any of dirs (each ending in os.sep)."""
+    vdb = _vectors_db()
+    if not os.path.exists(vdb):
+        return set()
+    found = set()
+    conn = _connect(vdb, readonly=True, timeout=5)
+    try:
+        for d in dirs:
+            for table in ('vault_vectors', 'vault_chunks'):
+                found.update(r[0] for r in conn.execute(
+                    f'SELECT DISTINCT path FROM {table} WHERE substr(path, 1, ?) = ?',
+                    (len(d), d)))
+    except sqlite3.Error as e:
+        sys.stderr.write(f'[watch] could not list vectors under {sorted(dirs)}: {e}\n')
+    finally:
+        conn.close()
+    return found
+
+
+def _watch_flush(label, fn, *args):
+    """Run one watch flush; report a failure instead of ending the watch."""
+    try:
+        fn(*args)
+        return True
+    except Exception as e:
+        sys.stderr.write(f'[watch] {label} failed ({type(e).__name__}: {e})\n')
+        return False
+
+
+def _journal_version(jconn):
+    """PRAGMA data_version changes whenever another connection commits."""
+    try:
+        return jconn.execute('PRAGMA data_version').fetchone()[0]
+    except sqlite3.Error:
+        return None
+
+
+def watch(debounce=WATCH_DEBOUNCE, poll_interval=WATCH_POLL_INTERVAL, use_inotify=True):
+    """Keep vectors fresh: re-embed vault edits and new journal entries as they happen.
+
+    Vault changes are debounced and embedded as one batch; journal commits
+    are noticed through journal.db's data_version. The model stays loaded
+    between batches. A failed flush (file deleted mid-read, permissions,
+    a locked database) is logged and retried after WATCH_RETRY_DELAY; a
+    vault batch is dropped after WATCH_MAX_RETRIES failures. Runs until
+    interrupted.
+    """
+    vault = _vault_dir()
+    if not os.path.isdir(vault):
+        print(f'No vault directory: {vault}')
+        return
+    get_model()
+    incremental_scan()
+
+    watcher = None
+    if use_inotify and sys.platform.startswith('linux'):
+        try:
+            watcher = _InotifyWatcher(vault)
+            mode = 'inotify'
+        except (OSError, AttributeError) as e:
+            sys.stderr.write(f'[vectorize] inotify unavailable ({e}), polling instead\n')
+    if watcher is None:
+        watcher = _PollingWatcher(vault, poll_interval)
+        mode = f'polling every {poll_interval:g}s'
+    print(f'Watching {vault}/ ({mode}); Ctrl-C to stop')
+
+    jconn = None
+    if os.path.exists(_journal_db()):
+        jconn = _connect(_journal_db(), readonly=True, timeout=5)
+    jversion = _journal_version(jconn) if jconn else None
+    pending = set()
+    first_change = last_change = 0.0
+    rescan = False
+    failures = 0
+    retry_at = 0.0
+    try:
+        while True:
+            changed = watcher.poll(debounce / 2)
+            now = time.time()
+            if changed is None:
+                print('[watch] event queue overflowed — rescanning')
+                pending.clear()
+                rescan = True
+                changed = set()
+            if rescan and now >= retry_at:
+                rescan = not _watch_flush('rescan', vectorize)
+                if rescan:
+                    retry_at = now + WATCH_RETRY_DELAY
+                continue
+            gone = {p for p in changed if p.endswith(os.sep)}
+            if gone:
+                changed = (changed - gone) | _indexed_under(gone)
+            changed.discard(_index().TOC_FILE)  # rewritten by index-vault.py scan
+            if changed:
+                if not pending:
+                    first_change = now
+                pending |= changed
+                last_change = now
+            if pending and now >= retry_at and (now - last_change >= debounce
+                                                or now - first_change >= WATCH_MAX_DELAY):
+                batch = sorted(pending)
+                pending.clear()
+                print(f'[watch] {len(batch)} changed file(s)')
+                if _watch_flush('vault update', update_vault_files, batch):
+                    failures = 0
+                elif failures + 1 < WATCH_MAX_RETRIES:
+                    failures += 1
+                    pending.update(batch)
+                    retry_at = now + WATCH_RETRY_DELAY
+                else:
+                    failures = 0
+                    sys.stderr.write(f'[watch] giving up on {len(batch)} file(s) '
+                                     f'after {WATCH_MAX_RETRIES} attempts\n')
+
+            if jconn is None and os.path.exists(_journal_db()):
+                jconn = _connect(_journal_db(), readonly=True, timeout=5)
+            if jconn is not None:
+                version = _journal_version(jconn)
+                if version != jversion and now >= retry_at:
+                    print('[watch] journal changed')
+                    if _watch_flush('journal sync', sync_journal):
+                        jversion = version
+                    else:
+                        retry_at = now + WATCH_RETRY_DELAY
+    except KeyboardInterrupt:
+        print('\nStopped watching')
+    finally:
+        watcher.close()
+        if jconn is not None:
+            jconn.close()
+
+
 # ---------------------------------------------------------------------------
 # Targeted update: single vault file
 # ---------------------------------------------------------------------------
 
 def update_vault_file(rel_path):
     """Re-vectorize a single vault file by path."""
+    update_vault_files([rel_path])
+
+
+def update_vault_files(rel_paths):
+    """Re-vectorize several vault files in one transaction and segment delta.
+
+    Missing, unreadable and empty files have their vectors removed (as a
+    full vectorize() run would); unchanged files are skipped.
+    """
     vdb = _vectors_db()
-    conn = sqlite3.connect(vdb, timeout=10)
+    conn = _connect(vdb)
     init_db(conn)
     now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    changes = _SegmentChanges()
+    to_embed = {}
+    removed = []
+
+    for rel_path in rel_paths:
+        # Load existing hash (files without chunk rows predate chunking)
+        row = conn.execute(
+            'SELECT content_hash FROM vault_vectors WHERE path = ?', (rel_path,)
+        ).fetchone()
+        existing_hash = row[0] if row else None
+        has_chunks = conn.execute(
+            'SELECT 1 FROM vault_chunks WHERE path = ? LIMIT 1', (rel_path,)
+        ).fetchone() is not None
+
+        if not os.path.exists(rel_path):
+            # File deleted — remove vector
+            if existing_hash or has_chunks:
+                removed.append(rel_path)
+                print(f'Removed vector for deleted file: {rel_path}')
+            else:
+                print(f'File not found and no existing vector: {rel_path}')
+            continue
 
-    # Load existing hash
-    row = conn.execute(
-        'SELECT content_hash FROM vault_vectors WHERE path = ?', (rel_path,)
-    ).fetchone()
-    existing_hash = row[0] if row else None
+        try:
+            with open(rel_path, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+        except OSError as e:
+            sys.stderr.write(f'[vectorize] cannot read {rel_path}: {e.strerror}\n')
+            text = ''
+
+        if not text.strip():
+            if existing_hash or has_chunks:
+                removed.append(rel_path)
+                print(f'Removed vector for empty or unreadable file: {rel_path}')
+            else:
+                print(f'Skipping empty file: {rel_path}')
+            continue
 
-    if not os.path.exists(rel_path):
-        # File deleted — remove vector
-        if existing_hash:
-            conn.execute('DELETE FROM vault_vectors WHERE path = ?', (rel_path,))
-            conn.commit()
-            print(f'Removed vector for deleted file: {rel_path}')
+        h = content_hash(text)
+        if existing_hash == h and has_chunks:
+            print(f'No change: {rel_path}')
+            continue
+        to_embed[rel_path] = (text, h)
+
+    plans, n_embedded = _plan_vault_files(conn, to_embed) if to_embed else ({}, 0)
+    with _db().transaction(conn):
+        conn.executemany('DELETE FROM vault_vectors WHERE path = ?', [(p,) for p in removed])
+        conn.executemany('DELETE FROM vault_chunks WHERE path = ?', [(p,) for p in removed])
+        file_blobs = _store_vault_chunks(conn, plans, now)
+        conn.executemany(
+            'INSERT OR REPLACE INTO vault_vectors '
+            '(path, embedding, content_hash, updated_at) VALUES (?, ?, ?, ?)',
+            [(path, blob, to_embed[path][1], now) for path, blob in file_blobs.items()]
+        )
+    changes.add(upserts=file_blobs.items(), deletes=removed)
+    if to_embed:
+        if len(to_embed) == 1:
+            print(f'Updated vector: {next(iter(to_embed))} ({n_embedded} chunk(s) re-embedded)')
         else:
-            print(f'File not found and no existing vector: {rel_path}')
-        conn.close()
-        return
-
-    with open(rel_path, 'r', encoding='utf-8', errors='replace') as f:
-        text = f.read()
-
-    if not text.strip():
-        print(f'Skipping empty file: {rel_path}')
-        conn.close()
-        return
-
-    h = content_hash(text)
-    if existing_hash == h:
-        print(f'No change: {rel_path}')
-        conn.close()
-        return
-
-    vec = embed_texts([text])[0]
-    conn.execute(
-        'INSERT OR REPLACE INTO vault_vectors '
-        '(path, embedding, content_hash, updated_at) VALUES (?, ?, ?, ?)',
-        (rel_path, vector_to_blob(vec), h, now)
-    )
-    conn.commit()
+            print(f'Updated {len(to_embed)} vectors ({n_embedded} chunk(s) re-embedded)')
+    changes.sync(conn)
     conn.close()
-    print(f'Updated vector: {rel_path}')
 
 
 # ---------------------------------------------------------------------------
@@ -408,30 +1699,27 @@ def update_journal_entry(journal_id):
         return
 
     # Fetch entry text
-    jconn = sqlite3.connect(jdb, timeout=5)
+    jconn = _connect(jdb, readonly=True, timeout=5)
     row = jconn.execute(
         'SELECT id, summary, context FROM journal WHERE id = ?', (journal_id,)
     ).fetchone()
     jconn.close()
 
     vdb = _vectors_db()
-    conn = sqlite3.connect(vdb, timeout=10)
+    conn = _connect(vdb)
     init_db(conn)
     now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
 
-    if not row:
-        # Entry deleted — remove vector
-        conn.execute('DELETE FROM journal_vectors WHERE journal_id = ?', (journal_id,))
-        conn.commit()
-        conn.close()
-        print(f'Removed vector for deleted journal entry: j:{journal_id}')
-        return
-
-    jid, summary, context = row
-    text = f'{summary or ""}\n{context or ""}'.strip()
+    text = f'{row[1] or ""}\n{row[2] or ""}'.strip() if row else ''
     if not text:
-        print(f'Skipping empty journal entry: j:{journal_id}')
+        # Entry deleted or emptied — remove vector
+        cur = conn.execute('DELETE FROM journal_vectors WHERE journal_id = ?', (journal_id,))
+        conn.commit()
+        if cur.rowcount:
+            _sync_segments(conn, [], [f'j:{journal_id}'])
         conn.close()
+        print(f'Removed vector for {"deleted" if not row else "empty"} journal entry: '
+              f'j:{journal_id}')
         return
 
     # Check existing hash
@@ -446,21 +1734,824 @@ def update_journal_entry(journal_id):
         conn.close()
         return
 
-    vec = embed_texts([text])[0]
+    blob = cached_embeddings(conn, [h]).get(h) or vector_to_blob(embed_texts([text])[0])
     conn.execute(
         'INSERT OR REPLACE INTO journal_vectors '
         '(journal_id, embedding, content_hash, updated_at) VALUES (?, ?, ?, ?)',
-        (journal_id, vector_to_blob(vec), h, now)
+        (journal_id, blob, h, now)
     )
     conn.commit()
+    _sync_segments(conn, [(f'j:{journal_id}', blob)], [])
     conn.close()
     print(f'Updated vector: j:{journal_id}')
 
 
+# ---------------------------------------------------------------------------
+# Related files: top-N nearest neighbors from stored vectors
+# ---------------------------------------------------------------------------
+
+RELATED_TOP_N = 5
+RELATED_BLOCK_SIZE = 512
+
+
+def _top_neighbors(scores, paths, top_n, exclude_idx):
+    """Pick the top_n (path, score) pairs from a 1-D score row."""
+    np = _np()
+    scores = scores.copy()
+    scores[exclude_idx] = -np.inf
+    k = min(top_n, len(paths) - 1)
+    if k <= 0:
+        return []
+    idx = np.argpartition(-scores, k - 1)[:k]
+    idx = idx[np.argsort(-scores[idx])]
+    return [(paths[j], round(float(scores[j]), 4)) for j in idx]
+
+
+def compute_related(top_n=RELATED_TOP_N, force=False, block_size=RELATED_BLOCK_SIZE):
+    """Compute each vault file's nearest neighbors from stored embeddings.
+
+    Similarities are computed as blocked matrix products (block_size query
+    rows against the full matrix at a time), so peak memory is bounded by
+    block_size * N floats and the heavy lifting runs in multi-threaded BLAS.
+
+    Only rows whose vectors changed since the last run are recomputed in
+    full. Unchanged rows are recomputed only if one of their cached
+    neighbors changed or was deleted; otherwise changed vectors are merged
+    into their cached neighbor lists.
+
+    Returns dict of {path: [(neighbor_path, score), ...]}.
+    """
+    np = _np()
+    conn = _connect(_vectors_db())
+    init_db(conn)
+    now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+    rows = conn.execute(
+        'SELECT path, embedding, content_hash FROM vault_vectors ORDER BY path'
+    ).fetchall()
+    if not rows:
+        conn.execute('DELETE FROM vault_related')
+        conn.commit()
+        conn.close()
+        return {}
+
+    paths = [r[0] for r in rows]
+    hashes = {r[0]: r[2] for r in rows}
+    pos = {p: i for i, p in enumerate(paths)}
+    matrix = np.vstack([blob_to_vector(r[1]) for r in rows])
+
+    cached = {}
+    for path, h, neighbors in conn.execute(
+        'SELECT path, content_hash, neighbors FROM vault_related'
+    ).fetchall():
+        cached[path] = (h, [tuple(n) for n in json.loads(neighbors)])
+
+    removed = set(cached) - set(pos)
+    if force:
+        changed = set(paths)
+    else:
+        changed = {p for p in paths if p not in cached or cached[p][0] != hashes[p]}
+    touched = changed | removed
+    expected = min(top_n, len(paths) - 1)
+    dirty = set(changed)
+    for path in paths:
+        if path not in cached:
+            continue
+        neighbors = cached[path][1]
+        if len(neighbors) != expected or any(n[0] in touched for n in neighbors):
+            dirty.add(path)
+
+    result = {p: cached[p][1] for p in paths if p not in dirty}
+
+    if dirty:
+        dirty_idx = np.array(sorted(pos[p] for p in dirty))
+        clean_idx = np.array(sorted(pos[p] for p in result), dtype=int)
+        # Running top_n changed rows (score, row index) per clean row; only
+        # top_n x clean entries are held whatever the number of changes
+        merge_clean = bool(len(clean_idx) and top_n > 0 and changed)
+        if merge_clean:
+            best = np.full((top_n, len(clean_idx)), -np.inf, dtype=np.float32)
+            best_src = np.full((top_n, len(clean_idx)), -1, dtype=np.int64)
+            is_changed = np.zeros(len(paths), dtype=bool)
+            is_changed[[pos[p] for p in changed]] = True
+
+        for start in range(0, len(dirty_idx), block_size):
+            block = dirty_idx[start:start + block_size]
+            sims = matrix[block] @ matrix.T
+            for row, i in zip(sims, block):
+                result[paths[i]] = _top_neighbors(row, paths, top_n, i)
+            if merge_clean:
+                from_changed = is_changed[block]
+                if not from_changed.any():
+                    continue
+                scores = np.vstack([best, sims[from_changed][:, clean_idx]])
+                src = np.vstack([best_src, np.broadcast_to(
+                    block[from_changed][:, None], (int(from_changed.sum()), len(clean_idx)))])
+                top = np.argpartition(-scores, top_n - 1, axis=0)[:top_n]
+                best = np.take_along_axis(scores, top, axis=0)
+                best_src = np.take_along_axis(src, top, axis=0)
+
+        # Merge changed vectors into unchanged rows' cached lists
+        if merge_clean:
+            for col, j in enumerate(clean_idx):
+                found = best_src[:, col] >= 0
+                if not found.any():
+                    continue
+                merged = result[paths[j]] + [
+                    (paths[i], round(float(sc), 4))
+                    for i, sc in zip(best_src[found, col], best[found, col])
+                ]
+                merged.sort(key=lambda n: -n[1])
+                result[paths[j]] = merged[:top_n]
+
+    if removed:
+        conn.executemany('DELETE FROM vault_related WHERE path = ?',
+                         [(p,) for p in removed])
+    conn.executemany(
+        'INSERT OR REPLACE INTO vault_related '
+        '(path, content_hash, neighbors, updated_at) VALUES (?, ?, ?, ?)',
+        [(p, hashes[p], json.dumps(result[p]), now) for p in paths]
+    )
+    conn.commit()
+    conn.close()
+
+    print(f'Related: {len(dirty)} of {len(paths)} rows recomputed '
+          f'({len(changed)} changed, {len(removed)} removed)')
+    return result
+
+
+def write_related(related):
+    """Write neighbor paths into the semantic index as each entry's `related`.
+
+    Only files that already have an index entry are updated — the index
+    skill owns summaries and keywords, this only fills in the graph. The
+    JSON export is refreshed afterwards.
+    """
+    conn = _index().open_existing()
+    if conn is None:
+        print('No semantic index yet — run /agency:index first')
+        return 0
+    updated = _index().set_related(
+        conn, {path: [n[0] for n in neighbors] for path, neighbors in related.items()})
+    _index().export_json(conn)
+    conn.close()
+
+    missing = len(related) - updated
+    print(f'Wrote related links for {updated} index entries')
+    if missing:
+        print(f'  {missing} vectorized file(s) have no index entry yet')
+    return updated
+
+
+# ---------------------------------------------------------------------------
+# Topic tree: hierarchical clustering of vault vectors
+# ---------------------------------------------------------------------------
+
+TOPIC_BRANCHING = 8
+TOPIC_LEAF_SIZE = 32
+TOPIC_MAX_DEPTH = 6
+TOPIC_REBUILD_FRACTION = 0.25
+TOPIC_LABEL_TERMS = 3
+
+_LABEL_STOPWORDS = {
+    'the', 'a', 'an', 'and', 'or', 'of', 'to', 'in', 'for', 'on', 'with',
+    'is', 'are', 'was', 'be', 'by', 'at', 'as', 'from', 'it', 'this', 'that',
+    'notes', 'note', 'md',
+}
+
+
+def _init_topic_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS topic_nodes (
+            id INTEGER PRIMARY KEY,
+            parent_id INTEGER,
+            depth INTEGER NOT NULL,
+            centroid BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            label TEXT NOT NULL DEFAULT ''
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS topic_members (
+            path TEXT PRIMARY KEY,
+            node_id INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            terms TEXT NOT NULL
+        )
+    """)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_topic_members_node ON topic_members(node_id)')
+    conn.commit()
+
+
+def _kmeans(vecs, k, iters=15, seed=0):
+    """Spherical k-means (cosine) with k-means++ seeding. Returns labels."""
+    np = _np()
+    rng = np.random.default_rng(seed)
+    n = len(vecs)
+    k = min(k, n)
+    centers = [vecs[rng.integers(n)]]
+    dist = np.clip(1 - vecs @ centers[0], 0, None)
+    for _ in range(1, k):
+        total = dist.sum()
+        idx = rng.choice(n, p=dist / total) if total > 0 else rng.integers(n)
+        centers.append(vecs[idx])
+        dist = np.minimum(dist, np.clip(1 - vecs @ vecs[idx], 0, None))
+    centers = np.vstack(centers)
+    labels = np.argmax(vecs @ centers.T, axis=1)
+    for _ in range(iters):
+        new_centers = centers.copy()
+        for j in range(k):
+            members = vecs[labels == j]
+            if len(members):
+                new_centers[j] = members.mean(axis=0)
+        new_centers /= np.linalg.norm(new_centers, axis=1, keepdims=True) + 1e-12
+        new_labels = np.argmax(vecs @ new_centers.T, axis=1)
+        centers = new_centers
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+    return labels
+
+
+def _label_terms(path, index_entries):
+    """Candidate label terms for one file: index keywords, else title words."""
+    entry = index_entries.get(path)
+    if entry and entry.get('keywords'):
+        return sorted({k.lower() for k in entry['keywords'] if k})
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            title = f.readline()
+    except OSError:
+        title = ''
+    words = title.lower().replace('#', ' ').split()
+    return sorted({w.strip('.,:;()[]"\'') for w in words
+                   if len(w) > 2 and w not in _LABEL_STOPWORDS})
+
+
+def _load_index_entries():
+    return _index().load_index()['entries']
+
+
+def _build_subtree(conn, matrix, paths, idxs, parent_id, depth, branching, leaf_size):
+    """Insert a node for idxs and recurse. Returns {path: leaf_node_id}."""
+    np = _np()
+    centroid = matrix[idxs].mean(axis=0)
+    centroid /= np.linalg.norm(centroid) + 1e-12
+    cur = conn.execute(
+        'INSERT INTO topic_nodes (parent_id, depth, centroid, size) VALUES (?, ?, ?, ?)',
+        (parent_id, depth, vector_to_blob(centroid), len(idxs))
+    )
+    node_id = cur.lastrowid
+
+    labels = None
+    if len(idxs) > leaf_size and depth < TOPIC_MAX_DEPTH:
+        labels = _kmeans(matrix[idxs], branching, seed=depth)
+        if len(set(labels.tolist())) < 2:
+            labels = None
+    if labels is None:
+        return {paths[i]: node_id for i in idxs}
+
+    assignment = {}
+    for j in sorted(set(labels.tolist())):
+        child = idxs[labels == j]
+        assignment.update(_build_subtree(conn, matrix, paths, child, node_id,
+                                         depth + 1, branching, leaf_size))
+    return assignment
+
+
+def _refresh_topic_nodes(conn, matrix, pos, relabel=None):
+    """Recompute sizes and centroids bottom-up; relabel nodes (all if None)."""
+    np = _np()
+    nodes = conn.execute('SELECT id, parent_id FROM topic_nodes').fetchall()
+    parent = {nid: pid for nid, pid in nodes}
+    members = {}
+    terms = {}
+    for path, node_id, t in conn.execute(
+        'SELECT path, node_id, terms FROM topic_members'
+    ).fetchall():
+        members.setdefault(node_id, []).append(path)
+        terms[path] = json.loads(t)
+
+    # Descendant paths per node (walk each leaf's ancestor chain)
+    under = {nid: [] for nid in parent}
+    for node_id, node_paths in members.items():
+        nid = node_id
+        while nid is not None:
+            under[nid].extend(node_paths)
+            nid = parent.get(nid)
+
+    # Drop emptied nodes
+    empty = [nid for nid, p in under.items() if not p]
+    if empty:
+        conn.executemany('DELETE FROM topic_nodes WHERE id = ?', [(n,) for n in empty])
+
+    doc_freq = {}
+    for t in terms.values():
+        for term in t:
+            doc_freq[term] = doc_freq.get(term, 0) + 1
+    total = max(len(terms), 1)
+
+    updates = []
+    for nid, node_paths in under.items():
+        if not node_paths:
+            continue
+        centroid = matrix[[pos[p] for p in node_paths]].mean(axis=0)
+        centroid /= np.linalg.norm(centroid) + 1e-12
+        label = None
+        if relabel is None or nid in relabel:
+            tf = {}
+            for p in node_paths:
+                for term in terms.get(p, []):
+                    tf[term] = tf.get(term, 0) + 1
+            scored = sorted(
+                tf.items(),
+                key=lambda x: (-(x[1] * math.log(1 + total / doc_freq[x[0]])), x[0])
+            )
+            label = ', '.join(t for t, _ in scored[:TOPIC_LABEL_TERMS])
+        updates.append((vector_to_blob(centroid), len(node_paths), label, nid))
+    conn.executemany(
+        'UPDATE topic_nodes SET centroid = ?, size = ?, label = COALESCE(?, label) '
+        'WHERE id = ?', updates
+    )
+
+
+def _route_to_leaf(children, centroids, vec):
+    """Greedy descent from the root to the nearest leaf."""
+    np = _np()
+    nid = children[None][0]
+    while children.get(nid):
+        kids = children[nid]
+        nid = kids[int(np.argmax([float(np.dot(centroids[k], vec)) for k in kids]))]
+    return nid
+
+
+def build_topics(force=False, branching=TOPIC_BRANCHING, leaf_size=TOPIC_LEAF_SIZE):
+    """Build or incrementally update the topic tree over vault vectors.
+
+    A full build recursively splits the vault with spherical k-means into
+    `branching` clusters until nodes hold at most `leaf_size` files, storing
+    each node's centroid and a keyword label in vectors.db.
+
+    Incremental runs route new or changed vectors down to their nearest
+    leaf, drop deleted ones, re-split leaves that grew past twice leaf_size,
+    and relabel only the touched branches. If more than a quarter of the
+    vault changed, the tree is rebuilt.
+    """
+    np = _np()
+    conn = _connect(_vectors_db())
+    init_db(conn)
+    _init_topic_tables(conn)
+
+    rows = conn.execute(
+        'SELECT path, embedding, content_hash FROM vault_vectors ORDER BY path'
+    ).fetchall()
+    if not rows:
+        conn.execute('DELETE FROM topic_nodes')
+        conn.execute('DELETE FROM topic_members')
+        conn.commit()
+        conn.close()
+        print('No vault vectors — run vectorize.py first')
+        return
+
+    paths = [r[0] for r in rows]
+    hashes = {r[0]: r[2] for r in rows}
+    pos = {p: i for i, p in enumerate(paths)}
+    matrix = np.vstack([blob_to_vector(r[1]) for r in rows])
+    index_entries = _load_index_entries()
+
+    existing = dict(conn.execute(
+        'SELECT path, content_hash FROM topic_members'
+    ).fetchall())
+    changed = [p for p in paths if existing.get(p) != hashes[p]]
+    removed = [p for p in existing if p not in pos]
+    has_tree = conn.execute('SELECT COUNT(*) FROM topic_nodes').fetchone()[0] > 0
+
+    rebuild = (
+        force or not has_tree
+        or len(changed) + len(removed) > TOPIC_REBUILD_FRACTION * len(paths)
+    )
+
+    if rebuild:
+        conn.execute('DELETE FROM topic_nodes')
+        conn.execute('DELETE FROM topic_members')
+        assignment = _build_subtree(conn, matrix, paths, np.arange(len(paths)),
+                                    None, 0, branching, leaf_size)
+        conn.executemany(
+            'INSERT INTO topic_members (path, node_id, content_hash, terms) '
+            'VALUES (?, ?, ?, ?)',
+            [(p, nid, hashes[p], json.dumps(_label_terms(p, index_entries)))
+             for p, nid in assignment.items()]
+        )
+        _refresh_topic_nodes(conn, matrix, pos)
+        conn.commit()
+        n_nodes = conn.execute('SELECT COUNT(*) FROM topic_nodes').fetchone()[0]
+        conn.close()
+        print(f'Topic tree built: {len(paths)} files in {n_nodes} nodes')
+        return
+
+    if not changed and not removed:
+        conn.close()
+        print('Topic tree up to date')
+        return
+
+    nodes = conn.execute('SELECT id, parent_id, centroid FROM topic_nodes').fetchall()
+    children = {}
+    parent = {}
+    centroids = {}
+    for nid, pid, blob in nodes:
+        children.setdefault(pid, []).append(nid)
+        parent[nid] = pid
+        centroids[nid] = blob_to_vector(blob)
+
+    touched_leaves = set()
+    if removed:
+        for nid, in conn.execute(
+            f'SELECT DISTINCT node_id FROM topic_members WHERE path IN '
+            f'({",".join("?" * len(removed))})', removed
+        ).fetchall():
+            touched_leaves.add(nid)
+        conn.executemany('DELETE FROM topic_members WHERE path = ?',
+                         [(p,) for p in removed])
+
+    inserts = []
+    for p in changed:
+        leaf = _route_to_leaf(children, centroids, matrix[pos[p]])
+        touched_leaves.add(leaf)
+        inserts.append((p, leaf, hashes[p], json.dumps(_label_terms(p, index_entries))))
+    conn.executemany(
+        'INSERT OR REPLACE INTO topic_members (path, node_id, content_hash, terms) '
+        'VALUES (?, ?, ?, ?)', inserts
+    )
+
+    # Re-split leaves that outgrew their budget
+    depth_of = dict(conn.execute('SELECT id, depth FROM topic_nodes').fetchall())
+    for leaf in list(touched_leaves):
+        leaf_paths = [r[0] for r in conn.execute(
+            'SELECT path FROM topic_members WHERE node_id = ?', (leaf,)
+        ).fetchall()]
+        if len(leaf_paths) <= 2 * leaf_size or depth_of.get(leaf, 0) >= TOPIC_MAX_DEPTH:
+            continue
+        idxs = np.array([pos[p] for p in leaf_paths])
+        labels = _kmeans(matrix[idxs], branching, seed=depth_of[leaf] + 1)
+        for j in sorted(set(labels.tolist())):
+            sub = idxs[labels == j]
+            sub_assign = _build_subtree(conn, matrix, paths, sub, leaf,
+                                        depth_of[leaf] + 1, branching, leaf_size)
+            conn.executemany('UPDATE topic_members SET node_id = ? WHERE path = ?',
+                             [(nid, p) for p, nid in sub_assign.items()])
+            touched_leaves.update(sub_assign.values())
+
+    relabel = set()
+    for nid in touched_leaves:
+        while nid is not None:
+            relabel.add(nid)
+            nid = parent.get(nid)
+    relabel.update(
+        r[0] for r in conn.execute(
+            'SELECT id FROM topic_nodes WHERE label = ?', ('',)
+        ).fetchall()
+    )
+    _refresh_topic_nodes(conn, matrix, pos, relabel=relabel)
+    conn.commit()
+    conn.close()
+    print(f'Topic tree updated: {len(changed)} routed, {len(removed)} removed, '
+          f'{len(relabel)} node(s) relabeled')
+
+
+def show_topics(max_depth=2, examples=3):
+    """Print the top of the topic tree: label, size and example files."""
+    vdb = _vectors_db()
+    if not os.path.exists(vdb):
+        print('No vectors.db found — run vectorize.py first')
+        return
+    conn = _connect(vdb, readonly=True, timeout=5)
+    try:
+        nodes = conn.execute(
+            'SELECT id, parent_id, depth, size, label FROM topic_nodes ORDER BY id'
+        ).fetchall()
+    except sqlite3.OperationalError:
+        nodes = []
+    if not nodes:
+        conn.close()
+        print('No topic tree — run: vectorize.py topics')
+        return
+
+    children = {}
+    for nid, pid, _depth, _size, _label in nodes:
+        children.setdefault(pid, []).append(nid)
+    info = {n[0]: n for n in nodes}
+
+    def sample(nid):
+        # Nearest leaf descendant's members stand in for the node
+        while children.get(nid):
+            nid = max(children[nid], key=lambda c: info[c][3])
+        return [r[0] for r in conn.execute(
+            'SELECT path FROM topic_members WHERE node_id = ? ORDER BY path LIMIT ?',
+            (nid, examples)
+        ).fetchall()]
+
+    def walk(nid):
+        _id, _pid, depth, size, label = info[nid]
+        print(f'{"  " * depth}[{size}] {label or "(unlabeled)"}')
+        kids = sorted(children.get(nid, []), key=lambda c: -info[c][3])
+        if depth >= max_depth or not kids:
+            for p in sample(nid):
+                print(f'{"  " * (depth + 1)}- {p}')
+            return
+        for kid in kids:
+            walk(kid)
+
+    for root in children.get(None, []):
+        walk(root)
+    conn.close()
+
+# ---------------------------------------------------------------------------
+# Online model migration (shadow tables, atomic switch)
+# ---------------------------------------------------------------------------
+
+MIGRATE_RATE = 20.0     # texts embedded per second while migrating
+MIGRATE_BATCH = 16      # vault files / journal entries per step
+MIGRATE_MAX_STALLS = 5  # steps in a row without progress before giving up
+
+# Tables built from the active model's vectors, cleared on a switch
+_DERIVED_TABLES = ('vault_related', 'topic_members', 'topic_nodes', 'query_vectors')
+
+
+def _shadow_gaps(conn, limit=None):
+    """Live rows whose shadow copy is missing or stale.
+
+    Returns (vault [(path, content_hash)], journal [(journal_id, content_hash)]).
+    """
+    s = SHADOW_SUFFIX
+    tail = f' LIMIT {int(limit)}' if limit else ''
+    vault = conn.execute(
+        f'SELECT v.path, v.content_hash FROM vault_vectors v '
+        f'LEFT JOIN vault_vectors{s} n ON n.path = v.path AND n.content_hash = v.content_hash '
+        f'WHERE n.path IS NULL ORDER BY v.path{tail}'
+    ).fetchall()
+    journal = conn.execute(
+        f'SELECT v.journal_id, v.content_hash FROM journal_vectors v '
+        f'LEFT JOIN journal_vectors{s} n '
+        f'ON n.journal_id = v.journal_id AND n.content_hash = v.content_hash '
+        f'WHERE n.journal_id IS NULL ORDER BY v.journal_id{tail}'
+    ).fetchall()
+    return vault, journal
+
+
+def _prune_shadow(conn):
+    """Drop shadow rows whose live row has since been deleted."""
+    s = SHADOW_SUFFIX
+    conn.execute(f'DELETE FROM vault_vectors{s} WHERE path NOT IN (SELECT path FROM vault_vectors)')
+    conn.execute(f'DELETE FROM vault_chunks{s} WHERE path NOT IN (SELECT path FROM vault_vectors)')
+    conn.execute(f'DELETE FROM journal_vectors{s} '
+                 f'WHERE journal_id NOT IN (SELECT journal_id FROM journal_vectors)')
+
+
+def _migration_progress(conn):
+    """Return (vectors with an up-to-date shadow copy, live vectors)."""
+    total = (conn.execute('SELECT COUNT(*) FROM vault_vectors').fetchone()[0]
+             + conn.execute('SELECT COUNT(*) FROM journal_vectors').fetchone()[0])
+    vault, journal = _shadow_gaps(conn)
+    return total - len(vault) - len(journal), total
+
+
+def _migrate_step(conn, target):
+    """Embed one batch of stale items into the shadow tables with the target model.
+
+    Items whose live vector no longer matches the source (file edited or
+    deleted, journal entry changed) are brought up to date in the live
+    tables first and picked up by a later step. Returns (texts embedded,
+    items handled).
+    """
+    now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    s = SHADOW_SUFFIX
+    vault, journal = _shadow_gaps(conn, limit=MIGRATE_BATCH)
+    n_texts = 0
+
+    to_embed, stale = {}, []
+    for path, h in vault:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+        except OSError:
+            text = ''
+        if text.strip() and content_hash(text) == h:
+            to_embed[path] = (text, h)
+        else:
+            stale.append(path)
+    if stale:
+        update_vault_files(stale)
+    if to_embed:
+        plans, n = _plan_vault_files(conn, to_embed, suffix=s, model_name=target)
+        with _db().transaction(conn):
+            file_blobs = _store_vault_chunks(conn, plans, now, suffix=s)
+            conn.executemany(
+                f'INSERT OR REPLACE INTO vault_vectors{s} '
+                f'(path, embedding, content_hash, updated_at) VALUES (?, ?, ?, ?)',
+                [(path, blob, to_embed[path][1], now) for path, blob in file_blobs.items()]
+            )
+        n_texts += n
+
+    if journal:
+        live = dict(journal)
+        texts = dict(iter_journal_entries(ids=list(live)))
+        entries = [(jid, texts[jid], h) for jid, h in live.items()
+                   if jid in texts and content_hash(texts[jid]) == h]
+        for jid in live:
+            if jid not in texts or content_hash(texts[jid]) != live[jid]:
+                update_journal_entry(jid)
+        cached = cached_embeddings(conn, [h for _, _, h in entries], target)
+        misses = [(text, h) for _, text, h in entries if h not in cached]
+        if misses:
+            vecs = embed_texts([text for text, _ in misses], model_name=target)
+            cached.update((h, vector_to_blob(vec)) for (_, h), vec in zip(misses, vecs))
+            n_texts += len(misses)
+        with _db().transaction(conn):
+            conn.executemany(
+                f'INSERT OR REPLACE INTO journal_vectors{s} '
+                f'(journal_id, embedding, content_hash, updated_at) VALUES (?, ?, ?, ?)',
+                [(jid, cached[h], h, now) for jid, _, h in entries]
+            )
+    return n_texts, len(vault) + len(journal)
+
+
+def _switch_model(conn, target, dim):
+    """Atomically replace the live vector tables with the shadow tables.
+
+    Runs in one IMMEDIATE transaction after a final coverage check, so
+    readers see either the old model's tables or the new ones, never a mix.
+    Returns False if writes since the last step left gaps.
+    """
+    s = SHADOW_SUFFIX
+    with _db().transaction(conn):
+        _prune_shadow(conn)
+        vault, journal = _shadow_gaps(conn, limit=1)
+        if vault or journal:
+            return False
+        for base in VECTOR_TABLES:
+            conn.execute(f'DROP TABLE {base}')
+            conn.execute(f'ALTER TABLE {base}{s} RENAME TO {base}')
+        for base in ('vault_chunks', 'journal_vectors'):
+            conn.execute(f'DROP TRIGGER IF EXISTS {base}{s}_cache_ref')
+            conn.execute(f'DROP TRIGGER IF EXISTS {base}{s}_cache_unref')
+        set_state(conn, 'model', {'name': target, 'dim': dim})
+        conn.execute("DELETE FROM vector_state WHERE key = 'migration'")
+        _create_cache_triggers(conn, '', target)
+        # The swapped-in tables never fired the live tables' triggers
+        _create_seq_triggers(conn)
+        conn.execute("UPDATE vector_state SET value = value + 1 WHERE key = 'vector_seq'")
+        for table in _DERIVED_TABLES:
+            try:
+                conn.execute(f'DELETE FROM {table}')
+            except sqlite3.OperationalError:
+                pass
+    gc_embedding_cache(conn)
+    _sync_segments(conn, [], [], rebuild=True)
+    return True
+
+
+def cancel_migration():
+    """Abandon a running migration and drop its shadow tables."""
+    conn = _connect(_vectors_db())
+    init_db(conn)
+    migration = get_state(conn, 'migration')
+    with _db().transaction(conn):
+        for base in VECTOR_TABLES:
+            conn.execute(f'DROP TABLE IF EXISTS {base}{SHADOW_SUFFIX}')
+        conn.execute("DELETE FROM vector_state WHERE key = 'migration'")
+    gc_embedding_cache(conn)
+    conn.close()
+    if migration:
+        print(f'Cancelled migration to {migration["model"]}')
+    else:
+        print('No migration in progress')
+
+
+def migration_status():
+    """Print the active model and any migration's coverage."""
+    conn = _connect(_vectors_db(), readonly=True)
+    name, dim = active_model(conn)
+    print(f'Active model: {name} ({dim} dims)')
+    migration = get_state(conn, 'migration')
+    if migration:
+        done, total = _migration_progress(conn)
+        print(f'Migrating to: {migration["model"]} ({migration["dim"]} dims), '
+              f'{done}/{total} vectors re-embedded, started {migration["started_at"]}')
+    conn.close()
+
+
+def migrate(target, rate=MIGRATE_RATE):
+    """Re-embed the store with another model while search keeps serving.
+
+    New vectors go to shadow tables (vault_vectors_next etc.) at up to
+    `rate` texts per second; vector search keeps using the live tables and
+    the old model throughout. Once every live vector has a current shadow
+    copy the tables are swapped in one transaction and the active model
+    recorded in vector_state. Interrupted runs resume where they stopped.
+    Returns True once the target model is active.
+    """
+    conn = _connect(_vectors_db())
+    init_db(conn)
+    migration = get_state(conn, 'migration')
+    if migration and migration['model'] != target:
+        print(f'Migration to {migration["model"]} is in progress — '
+              f'run: vectorize.py migrate --cancel')
+        conn.close()
+        return False
+    if not migration:
+        if active_model(conn)[0] == target:
+            print(f'Already on {target}')
+            conn.close()
+            return True
+        dim = get_model(target).get_sentence_embedding_dimension()
+        migration = {'model': target, 'dim': dim,
+                     'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}
+        with _db().transaction(conn):
+            _create_vector_tables(conn, SHADOW_SUFFIX)
+            set_state(conn, 'migration', migration)
+        init_db(conn)  # adds the cache triggers for the shadow tables
+        print(f'Started migration {active_model(conn)[0]} -> {target}')
+    else:
+        get_model(target)
+        print(f'Resuming migration to {target}')
+
+    stalls = 0
+    last_done = None
+    try:
+        while True:
+            if get_state(conn, 'migration') is None:
+                print('Migration was cancelled')
+                return False
+            t0 = time.time()
+            n_texts, n_items = _migrate_step(conn, target)
+            if n_items == 0:
+                if _switch_model(conn, target, migration['dim']):
+                    print(f'Switched to {target}')
+                    return True
+                continue
+            done, total = _migration_progress(conn)
+            print(f'  {done}/{total} vectors on {target}')
+            # A step that only refreshed stale live rows shows progress on the
+            # next one; repeated steps without any mean an item is stuck
+            if n_texts == 0 and done == last_done:
+                stalls += 1
+                if stalls >= MIGRATE_MAX_STALLS:
+                    print(f'Migration stalled: {total - done} vector(s) cannot be '
+                          f're-embedded — run again to retry, or migrate --cancel')
+                    return False
+                time.sleep(stalls)
+            else:
+                stalls = 0
+            last_done = done
+            # Throttle: spend at least n_texts / rate seconds per step
+            time.sleep(max(0.0, n_texts / rate - (time.time() - t0)))
+    except KeyboardInterrupt:
+        print('\nPaused — run the same command to resume')
+        return False
+    finally:
+        conn.close()
+
+
+def migrate_in_background(target, rate=MIGRATE_RATE):
+    """Start a detached migration process logging to memory/meta/migration.log."""
+    import subprocess
+    log_path = os.path.join(_vault_dir(), 'meta', 'migration.log')
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, 'a') as log:
+        proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), 'migrate', target, '--rate', str(rate)],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    print(f'Migration to {target} running in background (pid {proc.pid}, log {log_path})')
+
+
 # ---------------------------------------------------------------------------
 # Stats
 # ---------------------------------------------------------------------------
 
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # exists, owned by someone else
+    return True
+
+
+def _describe_progress(progress):
+    """One-line summary of a progress file for --stats."""
+    where = f'{progress["phase"]} {progress["done"]}/{progress["total"]}'
+    if progress['state'] == 'done':
+        return f'finished {progress["updated_at"]}'
+    if progress['state'] == 'running' and _pid_alive(progress['pid']):
+        eta = progress.get('eta_seconds')
+        eta = f', ETA {eta // 60}m{eta % 60:02d}s' if eta is not None else ''
+        return f'running (pid {progress["pid"]}), {where} at {progress["rate"]:.1f}/s{eta}'
+    return f'interrupted at {where} — run vectorize.py to resume'
+
+
 def show_stats():
     """Print vector database statistics."""
     vdb = _vectors_db()
@@ -468,9 +2559,26 @@ def show_stats():
         print('No vectors.db found — run vectorize.py first')
         return
 
-    conn = sqlite3.connect(vdb, timeout=5)
+    conn = _connect(vdb, readonly=True, timeout=5)
     vault_count = conn.execute('SELECT COUNT(*) FROM vault_vectors').fetchone()[0]
     journal_count = conn.execute('SELECT COUNT(*) FROM journal_vectors').fetchone()[0]
+    try:
+        chunk_count = conn.execute('SELECT COUNT(*) FROM vault_chunks').fetchone()[0]
+    except sqlite3.OperationalError:
+        chunk_count = 0
+    try:
+        cache_count, cache_unref = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(refs <= 0), 0) FROM embedding_cache'
+        ).fetchone()
+    except sqlite3.OperationalError:
+        cache_count = cache_unref = 0
+    try:
+        watermark = get_state(conn, 'journal_watermark')
+        migration = get_state(conn, 'migration')
+    except sqlite3.OperationalError:
+        watermark = migration = None
+    model_name, model_dim = active_model(conn)
+    migration_done = _migration_progress(conn)[0] if migration else 0
 
     vault_latest = conn.execute(
         'SELECT updated_at FROM vault_vectors ORDER BY updated_at DESC LIMIT 1'
@@ -484,14 +2592,32 @@ def show_stats():
 
     print(f'vectors.db stats:')
     print(f'  Vault vectors:   {vault_count}')
+    print(f'  Vault chunks:    {chunk_count}')
     print(f'  Journal vectors: {journal_count}')
     print(f'  Total vectors:   {vault_count + journal_count}')
+    print(f'  Cached vectors:  {cache_count} ({cache_unref} unreferenced)')
     print(f'  DB size:         {db_size / 1024:.1f} KB')
-    print(f'  Embedding dim:   {EMBEDDING_DIM}')
+    print(f'  Model:           {model_name} ({model_dim} dims)')
+    if migration:
+        print(f'  Migrating to:    {migration["model"]} '
+              f'({migration_done}/{vault_count + journal_count} re-embedded)')
     if vault_latest:
         print(f'  Vault updated:   {vault_latest[0]}')
     if journal_latest:
         print(f'  Journal updated: {journal_latest[0]}')
+    if watermark is not None:
+        print(f'  Journal mark:    j:{watermark}')
+    progress = read_progress()
+    if progress:
+        print(f'  Build:           {_describe_progress(progress)}')
+
+    try:
+        manifest = _segments().read_manifest()
+    except Exception:
+        manifest = None
+    if manifest:
+        print(f'  Segments:        main + {len(manifest["deltas"])} delta(s) '
+              f'(vector-segments.py stats for details)')
 
 
 # ---------------------------------------------------------------------------
@@ -505,11 +2631,29 @@ Commands:
   (default)                  Full build (incremental by default)
   update <path>              Re-vectorize a single vault file
   update --journal <id>      Re-vectorize a single journal entry
+  related [--top N]          Compute nearest-neighbor `related` links into
+                             semantic-index.json (add --force to recompute all)
+  topics [--force]           Build or incrementally update the topic tree
+  topics --show [--depth N]  Print topic labels and sizes down to depth N
+  migrate <model> [--rate N] [--background]
+                             Re-embed everything with another model into
+                             shadow tables, then switch atomically; search
+                             keeps serving the old model until then
+  migrate --status | --cancel
 
 Options:
   --stats                    Show vector database statistics
   --force                    Re-embed everything (ignore content hashes)
+  --workers N                Embed on N processes (full builds; 0 = one per core)
+  --max-cpu PCT              Sleep between batches so a build works at most
+                             PCT% of the time
+  --rate N                   Embed at most N files/entries per second
+  --nice N                   Lower the build's CPU priority by N
+  --restart                  Discard an interrupted build's checkpoint
   --incremental              Scan for changes only (mtime heuristic)
+  --watch [--poll]           Stay running and re-embed vault edits and new
+                             journal entries within seconds (--poll forces
+                             stat polling instead of inotify)
   --check-deps               Test if dependencies are available
 """
 
@@ -542,12 +2686,95 @@ if __name__ == '__main__':
             sys.exit(1)
         sys.exit(0)
 
+    # related subcommand
+    if args and args[0] == 'related':
+        top_n = RELATED_TOP_N
+        if '--top' in args:
+            idx = args.index('--top')
+            if idx + 1 >= len(args):
+                print('Usage: vectorize.py related [--top N] [--force]')
+                sys.exit(1)
+            top_n = int(args[idx + 1])
+        t0 = time.time()
+        related = compute_related(top_n=top_n, force='--force' in args)
+        write_related(related)
+        print(f'\nTotal time: {time.time() - t0:.1f}s')
+        sys.exit(0)
+
+    # topics subcommand
+    if args and args[0] == 'topics':
+        if '--show' in args:
+            depth = 2
+            if '--depth' in args:
+                idx = args.index('--depth')
+                if idx + 1 >= len(args):
+                    print('Usage: vectorize.py topics --show [--depth N]')
+                    sys.exit(1)
+                depth = int(args[idx + 1])
+            show_topics(max_depth=depth)
+        else:
+            t0 = time.time()
+            build_topics(force='--force' in args)
+            print(f'Total time: {time.time() - t0:.1f}s')
+        sys.exit(0)
+
+    # migrate subcommand
+    if args and args[0] == 'migrate':
+        if '--status' in args:
+            migration_status()
+        elif '--cancel' in args:
+            cancel_migration()
+        elif len(args) >= 2 and not args[1].startswith('--'):
+            rate = MIGRATE_RATE
+            if '--rate' in args:
+                idx = args.index('--rate')
+                if idx + 1 >= len(args):
+                    print('Usage: vectorize.py migrate <model> [--rate N] [--background]')
+                    sys.exit(1)
+                rate = float(args[idx + 1])
+            if '--background' in args:
+                migrate_in_background(args[1], rate=rate)
+            else:
+                sys.exit(0 if migrate(args[1], rate=rate) else 1)
+        else:
+            print('Usage: vectorize.py migrate <model> [--rate N] [--background]')
+            print('       vectorize.py migrate --status | --cancel')
+            sys.exit(1)
+        sys.exit(0)
+
+    workers = 1
+    if '--workers' in args:
+        idx = args.index('--workers')
+        if idx + 1 >= len(args):
+            print('Usage: vectorize.py [--force] --workers N')
+            sys.exit(1)
+        workers = int(args[idx + 1]) or (os.cpu_count() or 1)
+        del args[idx:idx + 2]
+
+    if '--watch' in args:
+        watch(use_inotify='--poll' not in args)
+        sys.exit(0)
+
+    throttle = {}
+    for opt, key, cast in (('--max-cpu', 'max_cpu', float), ('--rate', 'rate', float),
+                           ('--nice', 'nice', int)):
+        if opt in args:
+            idx = args.index(opt)
+            if idx + 1 >= len(args):
+                print(f'Usage: vectorize.py [--force] {opt} N')
+                sys.exit(1)
+            throttle[key] = cast(args[idx + 1])
+            del args[idx:idx + 2]
+    restart = '--restart' in args
+    if restart:
+        args.remove('--restart')
+
     force = '--force' in args
     incremental = '--incremental' in args
 
     if not args or force:
         t0 = time.time()
-        vectorize(force=force)
+        vectorize(force=force, workers=workers, restart=restart, **throttle)
         elapsed = time.time() - t0
         print(f'\nTotal time: {elapsed:.1f}s')
         show_stats()